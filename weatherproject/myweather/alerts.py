@@ -0,0 +1,195 @@
+from dataclasses import dataclass
+from datetime import datetime
+from functools import reduce
+
+import numpy as np
+from django.conf import settings
+
+INFO = "info"
+WARNING = "warning"
+SEVERE = "severe"
+
+SEVERITY_ORDER = {INFO: 0, WARNING: 1, SEVERE: 2}
+
+_COMPARISONS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+
+@dataclass(frozen=True)
+class Condition:
+    """
+    A threshold on one hourly variable.
+
+    ``per_hours`` turns the variable into its change over that many hours
+    (e.g. pressure falling by more than 3 hPa in 3 hours is
+    ``Condition("pressure_msl", "<", -3, per_hours=3)``).
+    """
+
+    variable: str
+    op: str
+    threshold: float
+    per_hours: int = 0
+
+    def mask(self, frame):
+        values = frame[self.variable]
+        if self.per_hours:
+            change = np.full(values.shape, np.nan, dtype=values.dtype)
+            change[..., self.per_hours:] = values[..., self.per_hours:] - values[..., :-self.per_hours]
+            values = change
+        return _COMPARISONS[self.op](values, self.threshold)
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """An alert raised for every hour in which all of its conditions hold."""
+
+    name: str
+    message: str
+    conditions: tuple
+    severity: str = WARNING
+
+    def mask(self, frame):
+        return reduce(np.logical_and, (condition.mask(frame) for condition in self.conditions))
+
+
+@dataclass(frozen=True)
+class Alert:
+    rule: str
+    message: str
+    severity: str
+    start: datetime
+    end: datetime
+    hours: int
+
+    @property
+    def window(self):
+        """The alert's time window formatted for display."""
+        if self.start.date() == self.end.date():
+            return f"{self.start:%d.%m %H:%M}–{self.end:%H:%M}"
+        return f"{self.start:%d.%m %H:%M} – {self.end:%d.%m %H:%M}"
+
+
+DEFAULT_RULES = (
+    AlertRule(
+        "rain", "It's likely to rain. Don't forget your umbrella!",
+        (Condition("precipitation_probability", ">", 50), Condition("rain", ">", 0.2)),
+    ),
+    AlertRule(
+        "heavy_rain", "Heavy rain expected. Avoid flood-prone areas!",
+        (Condition("precipitation_probability", ">", 70), Condition("rain", ">", 4)),
+        severity=SEVERE,
+    ),
+    AlertRule("wind", "Strong winds expected. Stay safe!", (Condition("windgusts_10m", ">", 40),)),
+    AlertRule("storm", "Storm-force gusts expected. Stay indoors!", (Condition("windgusts_10m", ">", 75),), severity=SEVERE),
+    AlertRule("heat", "High temperatures expected. Stay hydrated!", (Condition("temperature_2m", ">", 30),)),
+    AlertRule("freeze", "Freezing temperatures expected. Dress warmly!", (Condition("temperature_2m", "<", 0),)),
+    AlertRule("uv", "Very high UV index. Use sun protection!", (Condition("uv_index", ">=", 8),), severity=INFO),
+    AlertRule(
+        "pressure_drop", "Pressure is falling fast. Unsettled weather ahead!",
+        (Condition("pressure_msl", "<", -3, per_hours=3),), severity=INFO,
+    ),
+)
+
+
+def rules_from_settings():
+    """
+    Returns the rules in ``settings.WEATHER_ALERT_RULES``, or ``DEFAULT_RULES``.
+
+    Each rule is a dict with ``name``, ``message``, optional ``severity`` and
+    ``conditions`` as ``(variable, op, threshold[, per_hours])`` tuples.
+    """
+    configured = getattr(settings, "WEATHER_ALERT_RULES", None)
+    if configured is None:
+        return DEFAULT_RULES
+    return tuple(
+        AlertRule(
+            rule["name"], rule["message"],
+            tuple(Condition(*condition) for condition in rule["conditions"]),
+            severity=rule.get("severity", WARNING),
+        )
+        for rule in configured
+    )
+
+
+def _windows(mask):
+    """Returns the start and stop indices of the runs of True in ``mask``."""
+    edges = np.diff(np.r_[np.int8(0), mask.view(np.int8), np.int8(0)])
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _alerts(rule, frame, mask):
+    starts, stops = _windows(mask)
+    ends = frame.time[stops - 1] + np.timedelta64(1, "h")
+    return [
+        Alert(rule.name, rule.message, rule.severity, start, end, hours)
+        for start, end, hours in zip(frame.time[starts].tolist(), ends.tolist(), (stops - starts).tolist())
+    ]
+
+
+def _by_severity(alerts):
+    alerts.sort(key=lambda alert: (-SEVERITY_ORDER[alert.severity], alert.start))
+    return alerts
+
+
+def evaluate(frame, rules=DEFAULT_RULES):
+    """
+    Returns every alert triggered anywhere in the forecast horizon.
+
+    Each rule is evaluated as one array mask over all hours; consecutive
+    matching hours are merged into a single alert window. Alerts are ordered
+    by severity, then start time.
+    """
+    alerts = []
+    for rule in rules:
+        alerts.extend(_alerts(rule, frame, rule.mask(frame)))
+    return _by_severity(alerts)
+
+
+def evaluate_many(frames, rules=DEFAULT_RULES):
+    """
+    Evaluates ``rules`` for many forecasts in one batch pass.
+
+    ``frames`` maps a name (e.g. a city) to its ``ForecastFrame``. Frames of
+    the same length are stacked so every condition is a single 2-D
+    comparison for the whole group.
+    """
+    results = {name: [] for name in frames}
+    groups = {}
+    for name, frame in frames.items():
+        groups.setdefault(len(frame), []).append(name)
+
+    for names in groups.values():
+        stacked = _StackedFrames([frames[name] for name in names])
+        for rule in rules:
+            masks = rule.mask(stacked)
+            for row in np.flatnonzero(masks.any(axis=1)):
+                name = names[row]
+                results[name].extend(_alerts(rule, frames[name], masks[row]))
+
+    return {name: _by_severity(alerts) for name, alerts in results.items()}
+
+
+class _StackedFrames:
+    """2-D (forecast x hour) view over frames of equal length, for ``evaluate_many``."""
+
+    def __init__(self, frames):
+        self._frames = frames
+        self._columns = {}
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            self._columns[name] = np.stack([frame[name] for frame in self._frames])
+        return self._columns[name]
+
+
+def summarize(alerts):
+    """Groups alerts by rule for display: one entry per rule with all of its windows."""
+    grouped = {}
+    for alert in alerts:
+        entry = grouped.setdefault(alert.rule, {"message": alert.message, "severity": alert.severity, "windows": []})
+        entry["windows"].append(alert.window)
+    return list(grouped.values())
@@ -1,5 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 class MyweatherConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myweather'
+
+    def ready(self):
+        # Build the city index once per process instead of on the first request.
+        from .catalogue import get_catalogue
+        get_catalogue()
+
+        # With a pre-forking server (e.g. gunicorn --preload) this runs once
+        # in the master, so every forked worker starts warm.
+        if getattr(settings, 'WEATHER_WARM_UP', False):
+            from .startup import warm_up
+            warm_up()
+
+        from .prefetch import prefetch_settings, serving_process
+        if prefetch_settings()["IN_PROCESS"] and serving_process():
+            from django.core.signals import request_started
+            from .prefetch import start_in_background
+            request_started.connect(start_in_background, dispatch_uid="myweather.prefetch")
@@ -0,0 +1,400 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SETTINGS = {
+    "BACKEND": "memory",  # "memory" or "django"
+    "TTL": 600,  # seconds a forecast is served as fresh
+    "STALE_TTL": 3600,  # extra seconds a forecast may be served while it is refreshed
+    "MAX_ENTRIES": 512,  # LRU bound for the in-process backend
+    "CACHE_ALIAS": "default",  # Django cache used by the "django" backend
+    "KEY_PREFIX": "myweather:forecast",
+}
+
+DEFAULT_PAGE_CACHE_SETTINGS = {
+    "BACKEND": "memory",  # "memory" or "django"
+    "MAX_ENTRIES": 256,  # LRU bound for the in-process backend
+    "CACHE_ALIAS": "default",
+    "KEY_PREFIX": "myweather:page",
+}
+
+
+def _split_variables(value):
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(sorted(v.strip() for v in value if v.strip()))
+
+
+def forecast_key(params):
+    """Builds the normalized cache key for a set of Open-Meteo request parameters."""
+    return (
+        round(float(params["latitude"]), 4),
+        round(float(params["longitude"]), 4),
+        _split_variables(params.get("hourly")),
+        _split_variables(params.get("daily")),
+        params.get("start_date"),
+        params.get("end_date"),
+        params.get("timezone"),
+    )
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    value: object
+    fetched_at: float
+
+
+class MemoryBackend:
+    """
+    Thread-safe, size-bounded LRU store living in the worker process.
+
+    Holds at most ``max_entries`` entries and, when ``max_bytes`` is set,
+    at most that many bytes as measured by ``sizeof(entry)``.
+    """
+
+    def __init__(self, max_entries, timeout, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof if max_bytes else None
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.fetched_at > self.timeout:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            if self.sizeof:
+                self.size += self.sizeof(entry)
+            while len(self._entries) > self.max_entries or self._over_budget():
+                self._remove(next(iter(self._entries)))
+
+    def _over_budget(self):
+        # The newest entry is kept even when it alone exceeds max_bytes.
+        return self.sizeof is not None and self.size > self.max_bytes and len(self._entries) > 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        if self.sizeof:
+            self.size -= self.sizeof(entry)
+
+    async def aget(self, key):
+        # Lookups only hold the lock for a dict access, so they run on the event loop.
+        return self.get(key)
+
+    async def aset(self, key, entry):
+        self.set(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """Stores entries in one of the caches configured in ``settings.CACHES``."""
+
+    def __init__(self, alias, timeout, key_prefix):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _cache_key(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def get(self, key):
+        return self.cache.get(self._cache_key(key))
+
+    def set(self, key, entry):
+        self.cache.set(self._cache_key(key), entry, self.timeout)
+
+    async def aget(self, key):
+        return await self.cache.aget(self._cache_key(key))
+
+    async def aset(self, key, entry):
+        await self.cache.aset(self._cache_key(key), entry, self.timeout)
+
+    def clear(self):
+        # The alias is shared with sessions and other apps, and Django caches cannot delete by prefix.
+        raise NotImplementedError(
+            f"Entries in the shared cache {self.alias!r} cannot be cleared; they expire after {self.timeout} seconds."
+        )
+
+
+def build_backend(options, timeout, sizeof=None):
+    """
+    Builds the store described by a cache settings dict (``BACKEND`` and its options).
+
+    ``sizeof(entry)`` measures entries for an optional ``MAX_BYTES`` bound of the memory backend.
+    """
+    if options["BACKEND"] == "django":
+        return DjangoCacheBackend(options["CACHE_ALIAS"], timeout, options["KEY_PREFIX"])
+    if options["BACKEND"] == "memory":
+        return MemoryBackend(options["MAX_ENTRIES"], timeout, options.get("MAX_BYTES"), sizeof)
+    raise ValueError(f"Unknown cache backend: {options['BACKEND']!r}")
+
+
+class ForecastCache:
+    """
+    TTL cache for upstream forecasts with stale-while-revalidate.
+
+    Fresh entries are returned directly. Entries past their TTL but within
+    the stale window are returned as well, while a single background thread
+    refreshes them. Anything older is fetched synchronously.
+    """
+
+    def __init__(self, backend, ttl, stale_ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refreshing = set()
+        self._inflight = {}  # (event loop, key) -> task fetching that key
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "refreshes": 0, "refresh_errors": 0}
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_CACHE_SETTINGS, **getattr(settings, "WEATHER_FORECAST_CACHE", {})}
+        backend = build_backend(options, options["TTL"] + options["STALE_TTL"])
+        return cls(backend, options["TTL"], options["STALE_TTL"])
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get_entry(self, params, fetch):
+        """Returns the ``CacheEntry`` for ``params``, calling ``fetch(params)`` when needed."""
+        return self.lookup(params, fetch)[0]
+
+    def lookup(self, params, fetch):
+        """``get_entry`` that also says how the entry was found: ``(entry, "hit" | "stale" | "miss")``."""
+        key = forecast_key(params)
+        entry = self.backend.get(key)
+        if entry is not None:
+            age = time.time() - entry.fetched_at
+            if age <= self.ttl:
+                self._count("hits")
+                return entry, "hit"
+            if age <= self.ttl + self.stale_ttl:
+                self._count("stale")
+                self._refresh_in_background(key, params, fetch)
+                return entry, "stale"
+
+        self._count("misses")
+        return self._store(key, fetch(params)), "miss"
+
+    async def aget_entry(self, params, fetch):
+        """
+        Async ``get_entry``: ``fetch(params)`` is awaited when needed.
+
+        Concurrent misses of one key share a single fetch, and stale entries
+        are refreshed in a task on the running event loop.
+        """
+        key = forecast_key(params)
+        entry = await self.backend.aget(key)
+        if entry is not None:
+            age = time.time() - entry.fetched_at
+            if age <= self.ttl:
+                self._count("hits")
+                return entry
+            if age <= self.ttl + self.stale_ttl:
+                self._count("stale")
+                self._arefresh_in_background(key, params, fetch)
+                return entry
+
+        self._count("misses")
+        return await self._afetch_once(key, params, fetch)
+
+    def get_entries(self, params_list, fetch_many):
+        """
+        Returns the ``CacheEntry`` for every item of ``params_list``, in order.
+
+        All misses are fetched with a single ``fetch_many(missing_params)``
+        call, which returns their values in order. Stale entries are
+        refreshed in the background, one location at a time.
+        """
+        entries = [None] * len(params_list)
+        missing = []
+        now = time.time()
+        for index, params in enumerate(params_list):
+            key = forecast_key(params)
+            entry = self.backend.get(key)
+            age = now - entry.fetched_at if entry is not None else None
+            if entry is not None and age <= self.ttl:
+                self._count("hits")
+                entries[index] = entry
+            elif entry is not None and age <= self.ttl + self.stale_ttl:
+                self._count("stale")
+                self._refresh_in_background(key, params, lambda p: fetch_many([p])[0])
+                entries[index] = entry
+            else:
+                self._count("misses")
+                missing.append(index)
+
+        if missing:
+            values = fetch_many([params_list[index] for index in missing])
+            for index, value in zip(missing, values):
+                entries[index] = self._store(forecast_key(params_list[index]), value)
+        return entries
+
+    def refresh(self, params, fetch):
+        """Fetches ``params`` now and stores the result regardless of the cached entry's age."""
+        entry = self._store(forecast_key(params), fetch(params))
+        self._count("refreshes")
+        return entry
+
+    def _entry(self, value):
+        # Fetchers may return a CacheEntry to report when the value was really fetched.
+        return value if isinstance(value, CacheEntry) else CacheEntry(value=value, fetched_at=time.time())
+
+    def _store(self, key, value):
+        entry = self._entry(value)
+        self.backend.set(key, entry)
+        return entry
+
+    async def _astore(self, key, params, fetch):
+        entry = self._entry(await fetch(params))
+        await self.backend.aset(key, entry)
+        return entry
+
+    async def _afetch_once(self, key, params, fetch):
+        flight = (asyncio.get_running_loop(), key)
+        task = self._inflight.get(flight)
+        if task is None:
+            task = self._inflight[flight] = asyncio.ensure_future(self._astore(key, params, fetch))
+            task.add_done_callback(lambda _: self._inflight.pop(flight, None))
+        # Shielded: a client hanging up must not cancel the fetch others are waiting for.
+        return await asyncio.shield(task)
+
+    def _arefresh_in_background(self, key, params, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._astore(key, params, fetch)
+                self._count("refreshes")
+            except Exception:
+                self._count("refresh_errors")
+                logger.warning("Background forecast refresh failed for %s", key, exc_info=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.ensure_future(refresh())
+        self._tasks.add(task)  # the loop only keeps weak references to tasks
+        task.add_done_callback(self._tasks.discard)
+
+    def _refresh_in_background(self, key, params, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, fetch(params))
+                self._count("refreshes")
+            except Exception:
+                self._count("refresh_errors")
+                logger.warning("Background forecast refresh failed for %s", key, exc_info=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="forecast-refresh", daemon=True).start()
+
+    def stats(self):
+        """Returns the hit/miss/stale counters together with the hit ratio."""
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"] + counters["stale"]
+        counters["hit_ratio"] = (counters["hits"] + counters["stale"]) / lookups if lookups else 0.0
+        return counters
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+_forecast_cache = None
+_forecast_cache_lock = threading.Lock()
+
+
+def get_forecast_cache():
+    """Returns the process-wide forecast cache, building it from settings on first use."""
+    global _forecast_cache
+    if _forecast_cache is None:
+        with _forecast_cache_lock:
+            if _forecast_cache is None:
+                _forecast_cache = ForecastCache.from_settings()
+    return _forecast_cache
+
+
+_page_cache = None
+
+
+def get_page_cache():
+    """
+    Returns the process-wide store for rendered forecast pages.
+
+    Pages are keyed on the forecast's fetch time, so they live exactly as
+    long as the forecast they were rendered from.
+    """
+    global _page_cache
+    if _page_cache is None:
+        forecast_cache = get_forecast_cache()
+        with _forecast_cache_lock:
+            if _page_cache is None:
+                options = {**DEFAULT_PAGE_CACHE_SETTINGS, **getattr(settings, "WEATHER_PAGE_CACHE", {})}
+                _page_cache = build_backend(options, forecast_cache.ttl + forecast_cache.stale_ttl)
+    return _page_cache
+
+
+def _settings_changed(setting, **kwargs):
+    # Rebuilt from the new settings on next use, e.g. inside override_settings.
+    global _forecast_cache, _page_cache
+    if setting in ("WEATHER_FORECAST_CACHE", "WEATHER_PAGE_CACHE"):
+        with _forecast_cache_lock:
+            _forecast_cache = _page_cache = None
+
+
+setting_changed.connect(_settings_changed)
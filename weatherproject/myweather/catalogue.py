@@ -0,0 +1,248 @@
+import bisect
+import csv
+import heapq
+import json
+import math
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+
+from .utils import cities as DEFAULT_CITIES
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+@dataclass(frozen=True)
+class City:
+    name: str
+    latitude: float
+    longitude: float
+    country: str = ""
+    population: int = 0
+
+
+def normalize(name):
+    """Case- and accent-insensitive search key ("Zürich " -> "zurich")."""
+    decomposed = unicodedata.normalize("NFKD", name.strip())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def _trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def _unit_vectors(latitudes, longitudes):
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def load_cities(path):
+    """
+    Reads cities from a data file.
+
+    ``.json`` files hold a list of ``{"name", "latitude", "longitude"}``
+    objects, ``.csv`` files have a header with at least those columns and
+    any other extension is read as a tab-separated GeoNames dump
+    (e.g. ``cities500.txt``).
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with path.open(encoding="utf-8") as f:
+            return [City(**row) for row in json.load(f)]
+    if path.suffix == ".csv":
+        with path.open(encoding="utf-8", newline="") as f:
+            return [
+                City(row["name"], float(row["latitude"]), float(row["longitude"]),
+                     row.get("country", ""), int(row.get("population") or 0))
+                for row in csv.DictReader(f)
+            ]
+    result = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            result.append(City(fields[1], float(fields[4]), float(fields[5]), fields[8], int(fields[14] or 0)))
+    return result
+
+
+class _KDTree:
+    """Static k-d tree over 3-D points, stored implicitly in one index array."""
+
+    LEAF_SIZE = 16
+
+    def __init__(self, points):
+        self.points = points
+        self.order = np.arange(len(points))
+        self.splits = {}  # node id -> split coordinate; children of n are 2n and 2n + 1
+        self._build(1, 0, len(points), 0)
+
+    def _build(self, node, lo, hi, depth):
+        if hi - lo <= self.LEAF_SIZE:
+            return
+        axis = depth % 3
+        mid = (lo + hi) // 2
+        segment = self.order[lo:hi]
+        partitioned = np.argpartition(self.points[segment, axis], mid - lo)
+        self.order[lo:hi] = segment[partitioned]
+        self.splits[node] = self.points[self.order[mid], axis]
+        self._build(2 * node, lo, mid, depth + 1)
+        self._build(2 * node + 1, mid, hi, depth + 1)
+
+    def query(self, point, k):
+        """Returns up to ``k`` (squared distance, index) pairs, nearest first."""
+        heap = []  # max-heap of (-distance, index)
+
+        def visit(node, lo, hi, depth):
+            if hi - lo <= self.LEAF_SIZE:
+                indices = self.order[lo:hi]
+                distances = ((self.points[indices] - point) ** 2).sum(axis=1)
+                for distance, index in zip(distances.tolist(), indices.tolist()):
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-distance, index))
+                    elif distance < -heap[0][0]:
+                        heapq.heapreplace(heap, (-distance, index))
+                return
+            axis = depth % 3
+            mid = (lo + hi) // 2
+            offset = point[axis] - self.splits[node]
+            left, right = (2 * node, lo, mid), (2 * node + 1, mid, hi)
+            near, far = (right, left) if offset >= 0 else (left, right)
+            visit(*near, depth + 1)
+            if len(heap) < k or offset * offset < -heap[0][0]:
+                visit(*far, depth + 1)
+
+        if len(self.points):
+            visit(1, 0, len(self.points), 0)
+        return sorted((-distance, index) for distance, index in heap)
+
+
+class CityCatalogue:
+    """
+    Immutable, pre-sorted index of cities.
+
+    Names are normalized once at construction. Exact lookups are a dict
+    access, prefix searches a binary search over the sorted keys, substring
+    searches intersect trigram posting lists and nearest-city queries walk a
+    k-d tree of unit vectors.
+    """
+
+    def __init__(self, cities):
+        # Places without a name have no forecast URL, so they are left out.
+        ordered = sorted((c for c in cities if c.name.strip()), key=lambda c: (normalize(c.name), -c.population))
+        self.cities = tuple(ordered)
+        self._keys = [normalize(c.name) for c in ordered]
+        self._by_key = {}
+        for city, key in zip(ordered, self._keys):
+            # With duplicate names the most populous place wins.
+            self._by_key.setdefault(key, city)
+
+        postings = {}
+        for position, key in enumerate(self._keys):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, array("I")).append(position)
+        self._postings = postings
+
+        self._tree = _KDTree(_unit_vectors(
+            np.fromiter((c.latitude for c in ordered), dtype=float, count=len(ordered)),
+            np.fromiter((c.longitude for c in ordered), dtype=float, count=len(ordered)),
+        ))
+
+    def __len__(self):
+        return len(self.cities)
+
+    def __iter__(self):
+        return iter(self.cities)
+
+    def get(self, name):
+        """Returns the city called ``name`` (case- and accent-insensitive), or None."""
+        return self._by_key.get(normalize(name or ""))
+
+    def prefix_search(self, query, limit=20):
+        """Returns up to ``limit`` cities whose name starts with ``query``, in name order."""
+        key = normalize(query)
+        start = bisect.bisect_left(self._keys, key)
+        result = []
+        for position in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[position].startswith(key):
+                break
+            result.append(self.cities[position])
+        return result
+
+    def search(self, query, limit=20):
+        """
+        Returns up to ``limit`` cities whose name contains ``query``.
+
+        Prefix matches come first, the remaining substring matches follow in
+        name order.
+        """
+        key = normalize(query)
+        if not key:
+            return list(self.cities[:limit])
+        result = self.prefix_search(query, limit)
+        if len(result) >= limit:
+            return result
+
+        if len(key) < 3:
+            candidates = range(len(self._keys))
+        else:
+            lists = sorted((self._postings.get(gram, ()) for gram in _trigrams(key)), key=len)
+            if not lists[0]:
+                return result
+            candidates = set(lists[0])
+            for posting in lists[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return result
+            candidates = sorted(candidates)
+
+        for position in candidates:
+            candidate = self._keys[position]
+            if key in candidate and not candidate.startswith(key):
+                result.append(self.cities[position])
+                if len(result) >= limit:
+                    break
+        return result
+
+    def nearest(self, latitude, longitude, k=1):
+        """Returns the ``k`` closest cities as (city, distance in km) pairs."""
+        point = _unit_vectors([latitude], [longitude])[0]
+        return [
+            (self.cities[index], 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(distance) / 2)))
+            for distance, index in self._tree.query(point, k)
+        ]
+
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+
+
+def get_catalogue():
+    """Returns the process-wide catalogue, loading ``WEATHER_CITY_DATA`` on first use."""
+    global _catalogue
+    if _catalogue is None:
+        with _catalogue_lock:
+            if _catalogue is None:
+                path = getattr(settings, "WEATHER_CITY_DATA", None)
+                if path:
+                    cities = load_cities(path)
+                else:
+                    cities = [City(c["name"], c["latitude"], c["longitude"]) for c in DEFAULT_CITIES]
+                _catalogue = CityCatalogue(cities)
+    return _catalogue
+
+
+def _settings_changed(setting, **kwargs):
+    # Reloaded on next use, e.g. inside override_settings.
+    global _catalogue
+    if setting == "WEATHER_CITY_DATA":
+        with _catalogue_lock:
+            _catalogue = None
+
+
+setting_changed.connect(_settings_changed)
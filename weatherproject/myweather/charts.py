@@ -0,0 +1,497 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+from . import metrics
+from .downsample import reduce_series
+from .svg_charts import render_svg
+
+logger = logging.getLogger(__name__)
+
+CHART_TYPES = ("temperature", "rain", "cloud", "wind")
+
+# Axis labels of the variables an overlay chart can compare
+VARIABLE_LABELS = {
+    "temperature_2m": "Temperature (°C)",
+    "cloudcover": "Cloud Cover (%)",
+    "rain": "Rain (mm)",
+    "precipitation_probability": "Rain Probability (%)",
+    "windspeed_10m": "Wind Speed (km/h)",
+    "windgusts_10m": "Wind Gust (km/h)",
+    "pressure_msl": "Pressure (hPa)",
+    "uv_index": "UV Index",
+}
+
+# Hourly variables plotted by each chart type
+CHART_COLUMNS = {
+    "temperature": ("temperature_2m",),
+    "rain": ("rain", "precipitation_probability"),
+    "cloud": ("cloudcover",),
+    "wind": ("windspeed_10m", "gust_excess"),
+}
+
+DEFAULT_CHART_STORE_SETTINGS = {
+    # "file" (one directory shared by the workers of a host), "django" (one of
+    # CACHES, shared across hosts with e.g. Redis) or "memory" (one process only)
+    "BACKEND": "file",
+    "DIRECTORY": None,  # directory of the file backend; None is myweather-charts in the temp directory
+    "MAX_BYTES": 64 * 1024 * 1024,  # bound of the file and in-process backends
+    # Seconds an image should outlive the pages linking to it; the file backend
+    # warns when MAX_BYTES forces it to delete younger images. None is the
+    # forecast cache TTL + STALE_TTL
+    "MIN_AGE": None,
+    "CACHE_ALIAS": "default",
+    "KEY_PREFIX": "myweather:chart",
+    "TIMEOUT": 24 * 3600,  # entry lifetime for the django backend
+}
+
+DEFAULT_RENDER_QUEUE_SETTINGS = {
+    "WORKERS": 4,  # threads rendering pages for async views
+    "MAX_PENDING": 32,  # renders queued or running before new ones are refused
+    "RETRY_AFTER": 5,  # seconds, sent with the 503 of a refused render
+}
+
+RENDER_MODES = ("serial", "thread", "process")
+
+# File extension and content type of the images each chart backend produces
+CHART_BACKENDS = {"matplotlib": "png", "svg": "svg"}
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def hour_interval_for(selected_days):
+    """Returns the spacing of the hour ticks for a forecast horizon (also the bar width of long horizons)."""
+    if selected_days <= 2:
+        return 1
+    if selected_days <= 5:
+        return 2
+    if selected_days <= 7:
+        return 4
+    if selected_days <= 10:
+        return 6
+    if selected_days <= 16:
+        return 12
+    return 24
+
+
+def chart_series(kind, frame, hour_interval, downsample=True):
+    """
+    Collects the arrays of a ``ForecastFrame`` a chart of type ``kind`` is drawn from,
+    reduced to the chart's resolution unless ``downsample`` is False.
+    """
+    series = {
+        "kind": kind,
+        "time": frame.time,
+        "columns": {name: frame[name] for name in CHART_COLUMNS[kind]},
+        "hour_interval": hour_interval,
+        "sunrise": frame.sunrise,
+        "sunset": frame.sunset,
+    }
+    return reduce_series(series) if downsample else series
+
+
+def overlay_series(variable, time, columns, hour_interval):
+    """
+    Collects one variable of several forecasts for a single overlay chart.
+
+    ``columns`` maps a label (e.g. a city) to that forecast's values on the
+    shared ``time`` axis. Night shading is left out, since the forecasts
+    can be in different time zones.
+    """
+    empty = np.array([], dtype="datetime64[m]")
+    return reduce_series({
+        "kind": "overlay",
+        "time": time,
+        "columns": columns,
+        "hour_interval": hour_interval,
+        "sunrise": empty,
+        "sunset": empty,
+        "label": VARIABLE_LABELS.get(variable, variable),
+    })
+
+
+def chart_key(series, backend="matplotlib"):
+    """Returns the file name of the chart drawn from ``series``: a content hash plus extension."""
+    header = (
+        f"{backend}:{series['kind']}:{series['hour_interval']}:{series.get('label', '')}:"
+        f"{series.get('marker_every', 1)}:{series.get('bar_hours', 1)}"
+    )
+    digest = hashlib.sha256(header.encode("utf-8"))
+    for name in ("time", "sunrise", "sunset"):
+        digest.update(np.ascontiguousarray(series[name]).tobytes())
+    for name, column in sorted(series["columns"].items()):
+        digest.update(name.encode("utf-8"))
+        digest.update(np.ascontiguousarray(column).tobytes())
+    return f"{digest.hexdigest()[:32]}.{CHART_BACKENDS[backend]}"
+
+
+def render_chart(series, pool_size=0, backend="matplotlib"):
+    """
+    Draws the chart described by ``series`` and returns the image bytes.
+
+    The ``svg`` backend writes SVG directly; the ``matplotlib`` backend
+    renders a PNG, on a reused figure from this process's ``FigurePool``
+    when ``pool_size`` is set.
+    """
+    with metrics.stage(f"render_{series['kind']}"):
+        if backend == "svg":
+            image = render_svg(series)
+        else:
+            # Matplotlib is only imported once the first PNG chart is needed.
+            from .mpl_charts import render_png
+            image = render_png(series, pool_size)
+    if metrics.enabled():
+        metrics.RENDERED_CHARTS.inc(1, backend, series["kind"])
+        metrics.RENDERED_BYTES.inc(len(image), backend, series["kind"])
+    return image
+
+
+def _warm_worker():
+    """Initializes a render process so its first real chart does not pay for setup."""
+    from .startup import warm_up
+    warm_up()
+
+
+class ChartRenderer:
+    """
+    Renders several charts at once.
+
+    ``serial`` draws them one after another in the calling thread, ``thread``
+    uses a thread pool (safe because charts never touch pyplot) and
+    ``process`` uses a pool of pre-warmed worker processes. With a
+    ``pool_size`` every thread or process draws on reused figures.
+    """
+
+    def __init__(self, mode="serial", workers=4, pool_size=0, backend="matplotlib"):
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown chart render mode: {mode!r}")
+        if backend not in CHART_BACKENDS:
+            raise ValueError(f"Unknown chart backend: {backend!r}")
+        self.mode = mode
+        self.backend = backend
+        self.workers = workers
+        self.pool_size = pool_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            mode=getattr(settings, "WEATHER_CHART_RENDERING", "serial"),
+            workers=getattr(settings, "WEATHER_CHART_WORKERS", 4),
+            pool_size=getattr(settings, "WEATHER_CHART_FIGURE_POOL", 0),
+            backend=getattr(settings, "WEATHER_CHART_BACKEND", "matplotlib"),
+        )
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "thread":
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="chart-render")
+                else:
+                    self._executor = ProcessPoolExecutor(
+                        self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_warm_worker,
+                    )
+            return self._executor
+
+    def render_many(self, series_list):
+        """Returns the PNG bytes for every series, in order."""
+        render = partial(render_chart, pool_size=self.pool_size, backend=self.backend)
+        # SVG charts take well under a millisecond; dispatching them costs more.
+        if self.mode == "serial" or self.backend == "svg" or len(series_list) < 2:
+            return [render(series) for series in series_list]
+        return list(self.executor.map(render, series_list))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+class RenderQueueFull(Exception):
+    """Raised instead of queueing a render while the render queue is full."""
+
+
+class RenderQueue:
+    """
+    Bounded pool running CPU-bound rendering off the event loop for async views.
+
+    At most ``max_pending`` jobs are queued or running at once; beyond that
+    ``run`` raises ``RenderQueueFull`` at once, so a burst of requests gets
+    a quick refusal instead of an ever longer wait.
+    """
+
+    def __init__(self, workers=4, max_pending=32, retry_after=5):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_RENDER_QUEUE_SETTINGS, **getattr(settings, "WEATHER_RENDER_QUEUE", {})}
+        return cls(options["WORKERS"], options["MAX_PENDING"], options["RETRY_AFTER"])
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="page-render")
+            return self._executor
+
+    async def run(self, function, *args):
+        """Returns ``function(*args)``, called in a render thread with the caller's context variables."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                metrics.count(metrics.RENDER_REJECTED)
+                raise RenderQueueFull(f"{self.pending} renders pending.")
+            self.pending += 1
+        # Released when the job ends or is cancelled, not when the caller stops waiting.
+        future = self.executor.submit(contextvars.copy_context().run, function, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+class ChartStore:
+    """
+    Bounded store of rendered chart images keyed by their file name.
+
+    The in-process backend evicts the least recently used images once their
+    total size exceeds ``max_bytes``; only the process that rendered a chart
+    can serve it. The file backend writes every image to ``directory``, so
+    all workers of a host serve every chart URL; after every write it
+    measures the directory and deletes the oldest images until they fit
+    ``max_bytes``, warning when that includes images younger than
+    ``min_age`` seconds. The django backend keeps them in one of
+    ``settings.CACHES`` so every worker can serve every chart URL.
+    """
+
+    def __init__(self, max_bytes=None, cache_alias=None, key_prefix="myweather:chart", timeout=None,
+                 directory=None, min_age=0):
+        self.max_bytes = max_bytes
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self.directory = Path(directory) if directory else None
+        self.min_age = min_age
+        self.size = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.size = sum(size for _, size, _ in self._files())
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_CHART_STORE_SETTINGS, **getattr(settings, "WEATHER_CHART_STORE", {})}
+        if options["BACKEND"] == "django":
+            return cls(cache_alias=options["CACHE_ALIAS"], key_prefix=options["KEY_PREFIX"], timeout=options["TIMEOUT"])
+        if options["BACKEND"] == "file":
+            min_age = options["MIN_AGE"]
+            if min_age is None:
+                from .cache import DEFAULT_CACHE_SETTINGS
+
+                forecast_options = {**DEFAULT_CACHE_SETTINGS, **getattr(settings, "WEATHER_FORECAST_CACHE", {})}
+                min_age = forecast_options["TTL"] + forecast_options["STALE_TTL"]
+            directory = options["DIRECTORY"] or Path(tempfile.gettempdir()) / "myweather-charts"
+            return cls(max_bytes=options["MAX_BYTES"], directory=directory, min_age=min_age)
+        if options["BACKEND"] == "memory":
+            return cls(max_bytes=options["MAX_BYTES"])
+        raise ValueError(f"Unknown chart store backend: {options['BACKEND']!r}")
+
+    def _files(self):
+        """Yields ``(path, size, mtime)`` of every stored image of the file backend."""
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith("."):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:  # deleted by another worker
+                        continue
+                    yield Path(entry.path), stat.st_size, stat.st_mtime
+
+    def _prune(self, keep=None):
+        """
+        Measures the file backend's directory, which every worker writes to,
+        and deletes the oldest images except ``keep`` until it fits ``max_bytes``.
+        """
+        files = list(self._files())
+        size = sum(file_size for _, file_size, _ in files)
+        if size > self.max_bytes:
+            young = time.time() - self.min_age
+            deleted_young = 0
+            for path, file_size, mtime in sorted(files, key=lambda file: file[2]):
+                if size <= self.max_bytes:
+                    break
+                if path.name == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                size -= file_size
+                deleted_young += mtime > young
+            if deleted_young:
+                logger.warning(
+                    "Deleted %d chart images younger than %d seconds to stay within %d bytes; "
+                    "pages linking to them may show broken images. Raise MAX_BYTES.",
+                    deleted_young, self.min_age, self.max_bytes,
+                )
+        self.size = size
+
+    def get(self, key):
+        if self.cache_alias:
+            return caches[self.cache_alias].get(f"{self.key_prefix}:{key}")
+        if self.directory:
+            try:
+                return (self.directory / key).read_bytes()
+            except FileNotFoundError:
+                return None
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        if self.cache_alias:
+            caches[self.cache_alias].set(f"{self.key_prefix}:{key}", image, self.timeout)
+            return
+        if self.directory:
+            # Written under a temporary name and renamed, so readers never see half an image.
+            partial_path = self.directory / f".{key}.{os.getpid()}.{threading.get_ident()}"
+            partial_path.write_bytes(image)
+            os.replace(partial_path, self.directory / key)
+            with self._lock:
+                self._prune(keep=key)
+            return
+        with self._lock:
+            previous = self._images.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._images[key] = image
+            self.size += len(image)
+            while self.size > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __contains__(self, key):
+        if self.directory:
+            return (self.directory / key).exists()
+        return self.get(key) is not None
+
+    def clear(self):
+        if self.cache_alias:
+            # The alias is shared with sessions and other apps, and Django caches cannot delete by prefix.
+            raise NotImplementedError(
+                f"Charts in the shared cache {self.cache_alias!r} cannot be cleared; they expire after "
+                f"{self.timeout} seconds."
+            )
+        with self._lock:
+            if self.directory:
+                for path, _, _ in list(self._files()):
+                    path.unlink(missing_ok=True)
+            self._images.clear()
+            self.size = 0
+
+    def get_or_render_many(self, series_list, renderer=None):
+        """Returns the keys for ``series_list``, rendering the missing charts together."""
+        renderer = renderer or get_chart_renderer()
+        with metrics.stage("charts"):
+            keys = [chart_key(series, renderer.backend) for series in series_list]
+            missing = [(key, series) for key, series in zip(keys, series_list) if key not in self]
+            if metrics.enabled():
+                metrics.CACHE_LOOKUPS.inc(len(keys) - len(missing), "chart", "hit")
+                metrics.CACHE_LOOKUPS.inc(len(missing), "chart", "miss")
+            if missing:
+                images = renderer.render_many([series for _, series in missing])
+                for (key, _), image in zip(missing, images):
+                    self.put(key, image)
+        return keys
+
+
+_chart_store = None
+_chart_store_lock = threading.Lock()
+
+
+def get_chart_store():
+    """Returns the process-wide chart store, building it from settings on first use."""
+    global _chart_store
+    if _chart_store is None:
+        with _chart_store_lock:
+            if _chart_store is None:
+                _chart_store = ChartStore.from_settings()
+    return _chart_store
+
+
+_chart_renderer = None
+
+
+def get_chart_renderer():
+    """Returns the process-wide chart renderer configured by ``WEATHER_CHART_RENDERING``."""
+    global _chart_renderer
+    if _chart_renderer is None:
+        with _chart_store_lock:
+            if _chart_renderer is None:
+                _chart_renderer = ChartRenderer.from_settings()
+    return _chart_renderer
+
+
+_render_queue = None
+
+
+def get_render_queue():
+    """Returns the process-wide render queue of the async views, configured by ``WEATHER_RENDER_QUEUE``."""
+    global _render_queue
+    if _render_queue is None:
+        with _chart_store_lock:
+            if _render_queue is None:
+                _render_queue = RenderQueue.from_settings()
+    return _render_queue
+
+
+RENDERER_SETTINGS = ("WEATHER_CHART_RENDERING", "WEATHER_CHART_WORKERS", "WEATHER_CHART_FIGURE_POOL", "WEATHER_CHART_BACKEND")
+
+
+def _settings_changed(setting, **kwargs):
+    # Rebuilt from the new settings on next use, e.g. inside override_settings.
+    global _chart_store, _chart_renderer, _render_queue
+    with _chart_store_lock:
+        if setting in ("WEATHER_CHART_STORE", "WEATHER_FORECAST_CACHE"):
+            _chart_store = None
+        if setting in RENDERER_SETTINGS and _chart_renderer is not None:
+            _chart_renderer.shutdown()
+            _chart_renderer = None
+        if setting == "WEATHER_RENDER_QUEUE" and _render_queue is not None:
+            _render_queue.shutdown()
+            _render_queue = None
+
+
+setting_changed.connect(_settings_changed)
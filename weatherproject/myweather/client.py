@@ -0,0 +1,384 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # optional: AsyncForecastClient then runs ForecastClient in threads
+    httpx = None
+
+from . import metrics
+from .frame import HOURLY_VARIABLES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLIENT_SETTINGS = {
+    "BASE_URL": "https://api.open-meteo.com/v1/forecast",
+    "CONNECT_TIMEOUT": 3.05,
+    "READ_TIMEOUT": 10,
+    "RETRIES": 2,  # extra attempts after the first one
+    "BACKOFF_BASE": 0.25,  # seconds, doubled on every retry
+    "BACKOFF_MAX": 4,
+    "POOL_CONNECTIONS": 4,
+    "POOL_MAXSIZE": 16,
+    "BULK_SIZE": 25,  # locations per request in fetch_many
+    "BREAKER_FAILURES": 5,  # consecutive failures that open the circuit
+    "BREAKER_RESET": 30,  # seconds before a trial request is let through
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DAILY_VARIABLES = ("sunrise", "sunset")
+
+
+def forecast_params(latitude, longitude, selected_days, now=None, timezone="auto"):
+    """
+    Builds the Open-Meteo query for a location and forecast horizon.
+
+    Times are local to the location by default; pass ``timezone="GMT"`` to
+    get forecasts of different locations on one time axis.
+    """
+    now = now or datetime.utcnow()
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "current_weather": "true",
+        "hourly": ",".join(HOURLY_VARIABLES),
+        "daily": ",".join(DAILY_VARIABLES),
+        "start_date": now.strftime("%Y-%m-%d"),
+        "end_date": (now + timedelta(days=selected_days)).strftime("%Y-%m-%d"),
+        "timezone": timezone,
+    }
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling Open-Meteo while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failed calls in a row the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds. The first call after that
+    is let through as a trial: success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Returns True when a call may go to the upstream."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release(self):
+        """Ends a call that neither succeeded nor failed, so a half-open circuit lets the next trial through."""
+        with self._lock:
+            self._trial_running = False
+
+
+class ForecastClient:
+    """
+    HTTP client for the Open-Meteo forecast API.
+
+    A single ``requests.Session`` keeps connections alive between requests.
+    Every call is bounded by connect/read timeouts, transient failures are
+    retried with jittered exponential backoff and a circuit breaker fails
+    fast while the upstream is down.
+    """
+
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=10, retries=2,
+                 backoff_base=0.25, backoff_max=4, pool_connections=4, pool_maxsize=16,
+                 breaker=None, bulk_size=25):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bulk_size = bulk_size
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULT_CLIENT_SETTINGS, **getattr(settings, "WEATHER_FORECAST_CLIENT", {})}
+        return cls(
+            base_url=options["BASE_URL"],
+            connect_timeout=options["CONNECT_TIMEOUT"],
+            read_timeout=options["READ_TIMEOUT"],
+            retries=options["RETRIES"],
+            backoff_base=options["BACKOFF_BASE"],
+            backoff_max=options["BACKOFF_MAX"],
+            pool_connections=options["POOL_CONNECTIONS"],
+            pool_maxsize=options["POOL_MAXSIZE"],
+            breaker=CircuitBreaker(options["BREAKER_FAILURES"], options["BREAKER_RESET"]),
+            bulk_size=options["BULK_SIZE"],
+        )
+
+    def _backoff(self, attempt):
+        # "Full jitter": sleep a random time up to the exponential ceiling.
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def get(self, params):
+        """Sends one forecast request, retrying transient failures, and returns the response."""
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                metrics.count(metrics.UPSTREAM_ERRORS, 1, "circuit_open")
+                raise CircuitOpenError("Open-Meteo is unavailable, not retrying until the circuit closes.")
+            metrics.count(metrics.UPSTREAM_REQUESTS)
+            try:
+                with metrics.stage("upstream"):
+                    response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+                if response.status_code in RETRY_STATUSES:
+                    response.raise_for_status()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.HTTPError) as exc:
+                metrics.count(metrics.UPSTREAM_ERRORS, 1, type(exc).__name__)
+                self.breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.info("Open-Meteo request failed (%s), retrying in %.2fs", exc, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except requests.exceptions.RequestException as exc:
+                # Not worth retrying (e.g. a broken chunked body), but still a failed call.
+                metrics.count(metrics.UPSTREAM_ERRORS, 1, type(exc).__name__)
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            response.raise_for_status()
+            return response
+
+    def fetch(self, params):
+        """Returns the decoded JSON forecast for ``params``."""
+        return self.get(params).json()
+
+    def fetch_many(self, params_list):
+        """
+        Returns the decoded forecasts for many locations, in the order of ``params_list``.
+
+        Locations whose other parameters are identical are requested together,
+        ``bulk_size`` at a time, as comma-separated coordinate lists; so the
+        number of upstream calls grows with the number of chunks, not cities.
+        """
+        results = [None] * len(params_list)
+        groups = {}
+        for index, params in enumerate(params_list):
+            shared = tuple(sorted((k, str(v)) for k, v in params.items() if k not in ("latitude", "longitude")))
+            groups.setdefault(shared, []).append(index)
+
+        for shared, indices in groups.items():
+            for offset in range(0, len(indices), self.bulk_size):
+                chunk = indices[offset:offset + self.bulk_size]
+                params = dict(shared)
+                params["latitude"] = ",".join(str(params_list[i]["latitude"]) for i in chunk)
+                params["longitude"] = ",".join(str(params_list[i]["longitude"]) for i in chunk)
+                data = self.fetch(params)
+                # A single location comes back as an object, several as a list.
+                forecasts = data if isinstance(data, list) else [data]
+                if len(forecasts) != len(chunk):
+                    raise ValueError(f"Expected {len(chunk)} forecasts, got {len(forecasts)}.")
+                for index, forecast in zip(chunk, forecasts):
+                    results[index] = forecast
+        return results
+
+    def close(self):
+        self.session.close()
+
+
+def _raise_for_status(response):
+    # Same error as requests' raise_for_status, so both clients fail alike.
+    if response.status_code >= 400:
+        side = "Client" if response.status_code < 500 else "Server"
+        raise requests.exceptions.HTTPError(
+            f"{response.status_code} {side} Error: {response.reason_phrase} for url: {response.url}"
+        )
+
+
+class AsyncForecastClient:
+    """
+    Non-blocking counterpart of ``ForecastClient`` for async views.
+
+    With httpx installed, requests are sent from the event loop over a
+    pooled ``httpx.AsyncClient`` (one per loop), with the timeouts, retries,
+    backoff and circuit breaker of ``sync_client``; transport errors are
+    raised as the ``requests`` exceptions ``ForecastClient`` raises, and any
+    other httpx error as a ``requests.exceptions.RequestException``. Without
+    httpx, or when ``sync_client`` is a stand-in, each call runs
+    ``sync_client`` in a worker thread.
+    """
+
+    def __init__(self, sync_client, pool_maxsize=16):
+        self.sync_client = sync_client
+        self.pool_maxsize = pool_maxsize
+        self.native = httpx is not None and isinstance(sync_client, ForecastClient)
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _http(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            connect_timeout, read_timeout = self.sync_client.timeout
+            client = self._clients[loop] = httpx.AsyncClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_maxsize),
+            )
+        return client
+
+    async def _send(self, params):
+        try:
+            return await self._http().get(self.sync_client.base_url, params=params)
+        except httpx.TimeoutException as exc:
+            raise requests.exceptions.Timeout(str(exc)) from exc
+        except httpx.TransportError as exc:
+            raise requests.exceptions.ConnectionError(str(exc)) from exc
+        except httpx.HTTPError as exc:
+            raise requests.exceptions.RequestException(str(exc)) from exc
+
+    async def get(self, params):
+        """Sends one forecast request, retrying transient failures, and returns the httpx response."""
+        client = self.sync_client
+        attempt = 0
+        while True:
+            if not client.breaker.allow():
+                metrics.count(metrics.UPSTREAM_ERRORS, 1, "circuit_open")
+                raise CircuitOpenError("Open-Meteo is unavailable, not retrying until the circuit closes.")
+            metrics.count(metrics.UPSTREAM_REQUESTS)
+            try:
+                with metrics.stage("upstream"):
+                    response = await self._send(params)
+                if response.status_code in RETRY_STATUSES:
+                    _raise_for_status(response)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.HTTPError) as exc:
+                metrics.count(metrics.UPSTREAM_ERRORS, 1, type(exc).__name__)
+                client.breaker.record_failure()
+                if attempt >= client.retries:
+                    raise
+                delay = client._backoff(attempt)
+                logger.info("Open-Meteo request failed (%s), retrying in %.2fs", exc, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except requests.exceptions.RequestException as exc:
+                metrics.count(metrics.UPSTREAM_ERRORS, 1, type(exc).__name__)
+                client.breaker.record_failure()
+                raise
+            except BaseException:
+                # Includes the task being cancelled while it waits for Open-Meteo.
+                client.breaker.release()
+                raise
+
+            client.breaker.record_success()
+            _raise_for_status(response)
+            return response
+
+    async def fetch(self, params):
+        """Returns the decoded JSON forecast for ``params``."""
+        if not self.native:
+            return await sync_to_async(self.sync_client.fetch, thread_sensitive=False)(params)
+        return (await self.get(params)).json()
+
+
+_forecast_client = None
+_async_forecast_client = None
+_forecast_client_lock = threading.Lock()
+
+
+def get_forecast_client():
+    """Returns the process-wide forecast client, building it from settings on first use."""
+    global _forecast_client
+    if _forecast_client is None:
+        with _forecast_client_lock:
+            if _forecast_client is None:
+                _forecast_client = ForecastClient.from_settings()
+    return _forecast_client
+
+
+def set_forecast_client(client):
+    """Replaces the process-wide forecast client (e.g. with a replaying stub) and returns the previous one."""
+    global _forecast_client
+    with _forecast_client_lock:
+        previous, _forecast_client = _forecast_client, client
+    return previous
+
+
+def get_async_forecast_client():
+    """Returns the process-wide ``AsyncForecastClient``, wrapping the current forecast client."""
+    global _async_forecast_client
+    sync_client = get_forecast_client()
+    client = _async_forecast_client
+    if client is None or client.sync_client is not sync_client:
+        options = {**DEFAULT_CLIENT_SETTINGS, **getattr(settings, "WEATHER_FORECAST_CLIENT", {})}
+        client = _async_forecast_client = AsyncForecastClient(sync_client, options["POOL_MAXSIZE"])
+    return client
+
+
+def _settings_changed(setting, **kwargs):
+    # Rebuilt from the new settings on next use, e.g. inside override_settings.
+    global _forecast_client
+    if setting == "WEATHER_FORECAST_CLIENT":
+        with _forecast_client_lock:
+            _forecast_client = None
+
+
+setting_changed.connect(_settings_changed)
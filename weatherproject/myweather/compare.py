@@ -0,0 +1,122 @@
+"""
+Side-by-side forecasts for several cities.
+
+Forecasts are requested in GMT so every city shares one time axis, missing
+ones are fetched together through ``ForecastClient.fetch_many`` (one
+upstream call per chunk of cities) and the result is aligned into one
+column per city and variable.
+"""
+import numpy as np
+
+from .alerts import evaluate_many, rules_from_settings, summarize
+from .cache import get_forecast_cache
+from .charts import get_chart_store, hour_interval_for, overlay_series
+from .client import forecast_params, get_forecast_client
+from .frame import ForecastFrame, json_column
+from .snapshots import fetch_through_store
+
+DEFAULT_VARIABLES = ("temperature_2m", "rain", "windgusts_10m")
+
+
+def _fetch_frames(params_list):
+    return [ForecastFrame.from_response(data) for data in get_forecast_client().fetch_many(params_list)]
+
+
+def fetch_forecast_frames(params_list):
+    """Returns ``CacheEntry`` objects for many forecasts: fresh snapshots, the rest requested in bulk."""
+    return fetch_through_store(params_list, _fetch_frames)
+
+
+def align(frames, variables):
+    """
+    Puts ``frames`` (``{name: ForecastFrame}``) on their combined hourly axis.
+
+    Returns the time axis and ``{name: {variable: column}}``; hours a
+    forecast does not cover are NaN. Frames that already share the axis are
+    used as they are, without copying.
+    """
+    frames = dict(frames)
+    if not frames:
+        return np.array([], dtype="datetime64[m]"), {}
+    first = next(iter(frames.values())).time
+    if all(np.array_equal(frame.time, first) for frame in frames.values()):
+        return first, {name: {v: frame[v] for v in variables} for name, frame in frames.items()}
+
+    time = np.unique(np.concatenate([frame.time for frame in frames.values()]))
+    aligned = {}
+    for name, frame in frames.items():
+        positions = np.searchsorted(time, frame.time)
+        columns = {}
+        for variable in variables:
+            column = np.full(len(time), np.nan, dtype=np.float32)
+            column[positions] = frame[variable]
+            columns[variable] = column
+        aligned[name] = columns
+    return time, aligned
+
+
+def _summary(frame):
+    def stat(function, name):
+        column = frame[name]
+        return round(float(function(column)), 1) if np.isfinite(column).any() else None
+
+    return {
+        "temperature_min": stat(np.nanmin, "temperature_2m"),
+        "temperature_max": stat(np.nanmax, "temperature_2m"),
+        "rain_total": stat(np.nansum, "rain"),
+        "gust_max": stat(np.nanmax, "windgusts_10m"),
+    }
+
+
+def compare(cities, days, variables=DEFAULT_VARIABLES, chart_variable="temperature_2m"):
+    """
+    Builds the comparison of ``cities`` over ``days`` days.
+
+    Returns a dict with the shared ``time`` axis, one entry per city with its
+    aligned ``series``, summary and alerts, and the chart store key of an
+    overlay chart of ``chart_variable`` (None when no chart is requested).
+    """
+    params_list = [forecast_params(city.latitude, city.longitude, days, timezone="GMT") for city in cities]
+    entries = get_forecast_cache().get_entries(params_list, fetch_forecast_frames)
+    frames = {city.name: entry.value for city, entry in zip(cities, entries)}
+
+    wanted = tuple(dict.fromkeys((*variables, chart_variable) if chart_variable else variables))
+    time, aligned = align(frames, wanted)
+    alerts = evaluate_many(frames, rules_from_settings())
+
+    chart = None
+    if chart_variable and frames:
+        series = overlay_series(
+            chart_variable, time, {name: columns[chart_variable] for name, columns in aligned.items()},
+            hour_interval_for(days),
+        )
+        chart = get_chart_store().get_or_render_many([series])[0]
+
+    return {
+        "days": days,
+        "time": time,
+        "chart": chart,
+        "cities": [
+            {
+                "name": city.name,
+                "latitude": city.latitude,
+                "longitude": city.longitude,
+                "series": {variable: aligned[city.name][variable] for variable in variables},
+                "summary": _summary(frames[city.name]),
+                "alerts": summarize(alerts[city.name]),
+            }
+            for city in cities
+        ],
+    }
+
+
+def comparison_json(comparison):
+    """Converts a ``compare`` result into JSON-ready data (ISO times, NaN as null)."""
+    return {
+        "days": comparison["days"],
+        "time": np.datetime_as_string(comparison["time"], unit="m").tolist(),
+        "cities": [
+            {**city, "series": {name: json_column(column) for name, column in city["series"].items()}}
+            for city in comparison["cities"]
+        ],
+    }
@@ -0,0 +1,124 @@
+"""
+Reduction of chart series to what the chart images can show.
+
+Charts are a fixed ~1300 px wide whatever the forecast horizon, so plotting
+every hourly point of a long forecast only adds render time. ``reduce_series``
+sits between the ``ForecastFrame`` columns and the chart backends:
+
+- charts with bars (rain, wind) aggregate ``hour_interval``-hour buckets, so
+  there is one bar per hour tick: rain is summed, everything else takes the
+  bucket maximum;
+- line charts keep at most one point every ``LINE_SPACING_PX`` pixels,
+  picked with Largest-Triangle-Three-Buckets so peaks and troughs survive;
+- markers are drawn on every ``marker_every``-th point only, keeping them
+  at least ``MARKER_SPACING_PX`` apart.
+
+Short horizons (one point per hour tick and enough room for every marker)
+come out unchanged.
+"""
+import math
+
+import numpy as np
+
+from .svg_charts import PLOT_WIDTH
+
+LINE_SPACING_PX = 8
+MARKER_SPACING_PX = 16
+MAX_LINE_POINTS = PLOT_WIDTH // LINE_SPACING_PX
+
+# Chart types drawn with bars, whose columns are aggregated per hour tick
+BAR_CHARTS = ("rain", "wind")
+
+# Bucket aggregate of a column; columns not listed take the maximum
+AGGREGATES = {"rain": "sum"}
+
+# Stacked bars: the bucket maximum of the stack's top, minus the base bar
+STACKED_ON = {"gust_excess": "windspeed_10m"}
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Returns the indices of ``threshold`` points of ``(x, y)`` chosen with
+    Largest-Triangle-Three-Buckets: the first and last point, and from each
+    bucket in between the point spanning the largest triangle with the
+    previously chosen point and the next bucket's average.
+    """
+    n = len(y)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if threshold >= n or threshold < 3 or not np.isfinite(y).all():
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _bucket_reduce(column, starts, how):
+    if how == "sum":
+        return np.add.reduceat(np.nan_to_num(column), starts)
+    if how == "mean":
+        counts = np.add.reduceat(np.isfinite(column).astype(np.float32), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (np.add.reduceat(np.nan_to_num(column), starts) / counts).astype(column.dtype)
+    return np.fmax.reduceat(column, starts)
+
+
+def aggregate(time, columns, hours, default="max"):
+    """
+    Aggregates hourly ``columns`` into buckets of ``hours`` hours.
+
+    Each bucket is placed at the middle of the hours it covers. Returns the
+    new time axis and columns.
+    """
+    n = len(time)
+    starts = np.arange(0, n, hours)
+    counts = np.diff(np.r_[starts, n])
+    bucket_time = time[starts] + ((counts - 1) * 30).astype("timedelta64[m]")
+    reduced = {}
+    for name, column in columns.items():
+        if name in STACKED_ON:
+            continue
+        reduced[name] = _bucket_reduce(column, starts, AGGREGATES.get(name, default))
+    for name, base in STACKED_ON.items():
+        if name in columns:
+            top = _bucket_reduce(np.fmax(columns[base], columns[base] + columns[name]), starts, "max")
+            reduced[name] = np.maximum(top - reduced[base], 0)
+    return bucket_time, {name: reduced[name] for name in columns}
+
+
+def marker_every(points, width=PLOT_WIDTH):
+    """Returns the marker step keeping markers on ``points`` points at least ``MARKER_SPACING_PX`` apart."""
+    if points < 2:
+        return 1
+    return max(1, math.ceil(MARKER_SPACING_PX / (width / (points - 1))))
+
+
+def reduce_series(series):
+    """Returns ``series`` reduced to the chart's resolution, with ``marker_every`` and ``bar_hours`` set."""
+    time, columns = series["time"], series["columns"]
+    bar_hours = 1
+    if series["kind"] in BAR_CHARTS:
+        bar_hours = series["hour_interval"]
+        if bar_hours > 1:
+            time, columns = aggregate(time, columns, bar_hours)
+    elif len(time) > MAX_LINE_POINTS:
+        if series["kind"] == "overlay":
+            # Several lines share one axis, so they are averaged rather than picked apart.
+            time, columns = aggregate(time, columns, math.ceil(len(time) / MAX_LINE_POINTS), default="mean")
+        elif len(columns) == 1:
+            ((name, column),) = columns.items()
+            minutes = time.astype("datetime64[m]").astype(np.int64)
+            indices = lttb_indices(minutes, column, MAX_LINE_POINTS)
+            time, columns = time[indices], {name: column[indices]}
+    return {**series, "time": time, "columns": columns, "marker_every": marker_every(len(time)), "bar_hours": bar_hours}
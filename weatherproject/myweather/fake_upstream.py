@@ -0,0 +1,220 @@
+"""
+A small stand-in for the Open-Meteo forecast API.
+
+It serves deterministic, synthetic forecasts on ``/v1/forecast`` (for one
+or, with comma-separated coordinates, many locations) so the
+client, caches and benchmarks can be exercised without network access.
+Latency and error responses can be injected to test timeouts, retries
+and the circuit breaker.
+"""
+import json
+import math
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+
+
+def _hourly_value(name, rng, hour, lat):
+    daily_wave = math.sin((hour - 9) / 24 * 2 * math.pi)
+    if name == "temperature_2m":
+        return round(20 - abs(lat) / 4 + 6 * daily_wave + rng.uniform(-1, 1), 1)
+    if name == "cloudcover":
+        return rng.randint(0, 100)
+    if name == "rain":
+        return round(max(0.0, rng.gauss(0, 0.6)), 1)
+    if name == "precipitation_probability":
+        return rng.randint(0, 100)
+    if name == "windspeed_10m":
+        return round(rng.uniform(2, 30), 1)
+    if name == "windgusts_10m":
+        return round(rng.uniform(10, 60), 1)
+    if name == "pressure_msl":
+        return round(1013 + 8 * math.sin(hour / 60) + rng.uniform(-1, 1), 1)
+    if name == "uv_index":
+        return round(max(0.0, 7 * daily_wave), 2)
+    if name == "weathercode":
+        return rng.choice([0, 1, 2, 3, 45, 61, 80, 95])
+    return round(rng.uniform(0, 10), 1)
+
+
+def build_forecast_payload(params):
+    """Returns an Open-Meteo style JSON document for a single location."""
+    lat = float(params.get("latitude", 0))
+    lon = float(params.get("longitude", 0))
+    start = date.fromisoformat(params.get("start_date") or date.today().isoformat())
+    end = date.fromisoformat(params.get("end_date") or (start + timedelta(days=6)).isoformat())
+    hourly_names = [v for v in (params.get("hourly") or "").split(",") if v]
+    daily_names = [v for v in (params.get("daily") or "").split(",") if v]
+    rng = random.Random(f"{lat:.4f},{lon:.4f},{start}")
+
+    days = (end - start).days + 1
+    first = datetime.combine(start, datetime.min.time())
+    times = [first + timedelta(hours=h) for h in range(days * 24)]
+    hourly = {"time": [t.strftime("%Y-%m-%dT%H:%M") for t in times]}
+    for name in hourly_names:
+        hourly[name] = [_hourly_value(name, rng, h, lat) for h in range(len(times))]
+
+    day_starts = [first + timedelta(days=d) for d in range(days)]
+    daily = {"time": [d.strftime("%Y-%m-%d") for d in day_starts]}
+    if "sunrise" in daily_names:
+        daily["sunrise"] = [(d + timedelta(hours=6, minutes=rng.randint(0, 59))).strftime("%Y-%m-%dT%H:%M") for d in day_starts]
+    if "sunset" in daily_names:
+        daily["sunset"] = [(d + timedelta(hours=18, minutes=rng.randint(0, 59))).strftime("%Y-%m-%dT%H:%M") for d in day_starts]
+
+    payload = {
+        "latitude": lat,
+        "longitude": lon,
+        "generationtime_ms": 0.5,
+        "utc_offset_seconds": 0,
+        "timezone": "GMT",
+        "timezone_abbreviation": "GMT",
+        "elevation": 50.0,
+        "hourly": hourly,
+        "daily": daily,
+    }
+    if params.get("current_weather") == "true":
+        payload["current_weather"] = {
+            "time": hourly["time"][min(12, len(times) - 1)],
+            "temperature": _hourly_value("temperature_2m", rng, 12, lat),
+            "windspeed": _hourly_value("windspeed_10m", rng, 12, lat),
+            "winddirection": rng.randint(0, 359),
+            "weathercode": rng.choice([0, 1, 2, 3, 45, 61, 80, 95]),
+            "is_day": 1,
+        }
+    return payload
+
+
+def build_bulk_payload(params):
+    """
+    Answers a request for one or many locations.
+
+    Like Open-Meteo, comma-separated ``latitude``/``longitude`` lists return
+    a JSON list with one forecast per location, in order.
+    """
+    latitudes = str(params.get("latitude", 0)).split(",")
+    longitudes = str(params.get("longitude", 0)).split(",")
+    if len(latitudes) == 1:
+        return build_forecast_payload(params)
+    return [
+        build_forecast_payload({**params, "latitude": lat, "longitude": lon})
+        for lat, lon in zip(latitudes, longitudes)
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def setup(self):
+        super().setup()
+        self.server.owner._connection_opened()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        owner = self.server.owner
+        owner._request_received()
+        url = urlparse(self.path)
+        if owner.latency:
+            time.sleep(owner.latency)
+
+        status = owner._next_status()
+        if status != 200:
+            self._send(status, {"error": True, "reason": "Injected failure"})
+        elif url.path != "/v1/forecast":
+            self._send(404, {"error": True, "reason": "Not found"})
+        else:
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            self._send(200, build_bulk_payload(params))
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeOpenMeteo:
+    """
+    Local HTTP server imitating Open-Meteo.
+
+    Use it as a context manager; ``url`` is the forecast endpoint to put in
+    ``WEATHER_FORECAST_CLIENT["BASE_URL"]``. ``latency`` delays every
+    response, ``error_rate`` answers a random share of requests with 503 and
+    ``fail_next(n)`` answers the next ``n`` requests with an error.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.connections = 0
+        self._forced_failures = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/forecast"
+
+    def use_in_settings(self):
+        """
+        Points this process's forecast client at the fake and turns the
+        snapshot store off, so synthetic forecasts never reach the database
+        where real requests would be served them.
+        """
+        settings.WEATHER_FORECAST_CLIENT = {**getattr(settings, "WEATHER_FORECAST_CLIENT", {}), "BASE_URL": self.url}
+        settings.WEATHER_SNAPSHOT_STORE = {**getattr(settings, "WEATHER_SNAPSHOT_STORE", {}), "ENABLED": False}
+        return self
+
+    def fail_next(self, count=1, status=503):
+        with self._lock:
+            self._forced_failures.extend([status] * count)
+
+    def _connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def _request_received(self):
+        with self._lock:
+            self.requests += 1
+
+    def _next_status(self):
+        with self._lock:
+            if self._forced_failures:
+                return self._forced_failures.pop(0)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return 503
+        return 200
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-open-meteo", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
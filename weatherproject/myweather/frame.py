@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+
+from . import metrics
+
+HOURLY_VARIABLES = (
+    "temperature_2m", "cloudcover", "rain", "precipitation_probability",
+    "windspeed_10m", "windgusts_10m", "pressure_msl", "uv_index", "weathercode",
+)
+
+
+def _float_column(values):
+    """Converts a JSON number list to float32, mapping missing values (None) to NaN."""
+    try:
+        column = np.asarray(values, dtype=np.float32)
+    except TypeError:
+        column = np.asarray([np.nan if v is None else v for v in values], dtype=np.float32)
+    column.flags.writeable = False
+    return column
+
+
+def _time_column(values, unit="m"):
+    column = np.asarray(values, dtype=f"datetime64[{unit}]")
+    column.flags.writeable = False
+    return column
+
+
+def to_python(value):
+    """Returns a numpy scalar as a short Python number for display (54.0 -> 54)."""
+    number = round(float(value), 2)
+    return int(number) if number.is_integer() else number
+
+
+def json_column(column):
+    """Returns a float column as a JSON-ready list rounded to 2 decimals, NaN as None."""
+    values = np.round(column.astype(np.float64), 2).tolist()
+    if np.isnan(column).any():
+        return [None if value != value else value for value in values]
+    return values
+
+
+@dataclass(frozen=True)
+class ForecastFrame:
+    """
+    Columnar view of one Open-Meteo forecast.
+
+    Hourly timestamps are ``datetime64[m]`` and every hourly variable is a
+    contiguous float32 array of the same length. Daily sunrise/sunset are
+    parsed once as well, so nothing downstream needs ``fromisoformat``.
+    """
+
+    time: np.ndarray
+    hourly: dict
+    sunrise: np.ndarray
+    sunset: np.ndarray
+    current: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_response(cls, data, variables=HOURLY_VARIABLES):
+        """Builds a frame from a decoded Open-Meteo response in a single pass."""
+        with metrics.stage("parse"):
+            hourly_data = data["hourly"]
+            daily_data = data["daily"]
+            return cls(
+                time=_time_column(hourly_data["time"]),
+                hourly={name: _float_column(hourly_data[name]) for name in variables},
+                sunrise=_time_column(daily_data["sunrise"]),
+                sunset=_time_column(daily_data["sunset"]),
+                current=data.get("current_weather", {}),
+            )
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the frame's arrays."""
+        arrays = (self.time, self.sunrise, self.sunset, *self.hourly.values())
+        return sum(array.nbytes for array in arrays)
+
+    def __getitem__(self, name):
+        """Returns an hourly variable or a derived series by name."""
+        if name in self.hourly:
+            return self.hourly[name]
+        if name in DERIVED_SERIES:
+            return getattr(self, name)
+        raise KeyError(name)
+
+    @cached_property
+    def gust_excess(self):
+        """How much the gusts exceed the mean wind speed, never below zero."""
+        return np.maximum(self.hourly["windgusts_10m"] - self.hourly["windspeed_10m"], 0)
+
+    @cached_property
+    def days(self):
+        """Calendar day of every hourly timestamp."""
+        return self.time.astype("datetime64[D]")
+
+    @cached_property
+    def day_boundaries(self):
+        """Indices at which a new calendar day starts, beginning with 0."""
+        return np.flatnonzero(np.r_[True, self.days[1:] != self.days[:-1]])
+
+    def window(self, first_day, last_day):
+        """Returns the part of the frame from ``first_day`` through ``last_day`` (dates), sharing its arrays."""
+        first_day, last_day = np.datetime64(first_day, "D"), np.datetime64(last_day, "D") + 1
+        start, end = np.searchsorted(self.days, [first_day, last_day])
+        day_start, day_end = np.searchsorted(self.sunrise.astype("datetime64[D]"), [first_day, last_day])
+        return ForecastFrame(
+            time=self.time[start:end],
+            hourly={name: column[start:end] for name, column in self.hourly.items()},
+            sunrise=self.sunrise[day_start:day_end],
+            sunset=self.sunset[day_start:day_end],
+            current=self.current,
+        )
+
+    def hhmm(self, column, index=0):
+        """Formats a timestamp of ``column`` ("time", "sunrise" or "sunset") as HH:MM."""
+        return str(getattr(self, column)[index])[11:16]
+
+
+DERIVED_SERIES = ("gust_excess",)
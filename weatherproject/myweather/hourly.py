@@ -0,0 +1,60 @@
+"""
+Hourly forecast table, built one calendar day at a time.
+
+``hourly_days`` splits a ``ForecastFrame`` at its day boundaries without
+copying anything; a day's row dicts are only built from slices of the
+hourly arrays when the day is rendered, so a streamed page never holds
+more than one day of rows.
+"""
+import numpy as np
+
+from .frame import json_column
+
+# Table column -> hourly variable it shows
+ROW_COLUMNS = {
+    "weathercode": "weathercode",
+    "temp": "temperature_2m",
+    "rain": "rain",
+    "rain_prob": "precipitation_probability",
+}
+
+
+def _display_column(column):
+    """Returns a float column as display values: 2 decimals, whole numbers as int, NaN as None."""
+    return [value if value is None or not value.is_integer() else int(value) for value in json_column(column)]
+
+
+class HourlyDay:
+    """One day of the hourly table: hours ``start`` to ``end`` of ``frame``."""
+
+    def __init__(self, frame, start, end):
+        self.frame = frame
+        self.start = start
+        self.end = end
+
+    @property
+    def date(self):
+        return self.frame.days[self.start].item()
+
+    def __len__(self):
+        return self.end - self.start
+
+    def rows(self):
+        """Yields one dict per hour with its time (HH:MM) and the ``ROW_COLUMNS`` values."""
+        hours = slice(self.start, self.end)
+        times = np.datetime_as_string(self.frame.time[hours], unit="m")
+        columns = {
+            name: _display_column(self.frame.hourly[variable][hours]) if variable in self.frame.hourly
+            else [None] * len(self)
+            for name, variable in ROW_COLUMNS.items()
+        }
+        for i, time in enumerate(times):
+            yield {"time": time[11:16], **{name: values[i] for name, values in columns.items()}}
+
+
+def hourly_days(frame):
+    """Yields the ``HourlyDay`` of every calendar day in ``frame``."""
+    boundaries = frame.day_boundaries
+    ends = np.r_[boundaries[1:], len(frame)]
+    for start, end in zip(boundaries.tolist(), ends.tolist()):
+        yield HourlyDay(frame, start, end)
@@ -0,0 +1,55 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from myweather.catalogue import City, CityCatalogue
+
+SYLLABLES = ["an", "ber", "ca", "dor", "el", "fen", "gra", "ho", "is", "ju", "ka", "lin", "mo", "nor",
+             "os", "pra", "qui", "ro", "san", "tal", "ur", "vil", "wes", "xa", "yor", "zu", "burg", "ville"]
+
+
+def synthetic_cities(size, seed=0):
+    """Returns ``size`` cities with made-up names spread over the globe."""
+    rng = random.Random(seed)
+    return [
+        City(
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title(),
+            rng.uniform(-60, 70), rng.uniform(-180, 180), population=rng.randint(500, 2_000_000),
+        )
+        for _ in range(size)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Measures city catalogue build time and search latency on a synthetic catalogue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=1000)
+
+    def _measure(self, label, queries, func):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            func(query)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        self.stdout.write(f"{label:<12} {statistics.median(timings):>10.1f} {p99:>10.1f}")
+
+    def handle(self, *args, **options):
+        cities = synthetic_cities(options["size"])
+        start = time.perf_counter()
+        catalogue = CityCatalogue(cities)
+        self.stdout.write(f"Built catalogue of {len(catalogue)} cities in {time.perf_counter() - start:.2f}s")
+
+        rng = random.Random(1)
+        sample = [rng.choice(cities) for _ in range(options["queries"])]
+        self.stdout.write(f"{'operation':<12} {'median us':>10} {'p99 us':>10}")
+        self._measure("exact", [c.name for c in sample], catalogue.get)
+        self._measure("prefix", [c.name[:4] for c in sample], catalogue.prefix_search)
+        self._measure("substring", [c.name[2:6] for c in sample], catalogue.search)
+        self._measure("short", [c.name[1:3] for c in sample], catalogue.search)
+        self._measure("nearest", [(c.latitude + 0.1, c.longitude) for c in sample], lambda p: catalogue.nearest(*p, k=5))
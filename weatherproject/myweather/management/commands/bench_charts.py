@@ -0,0 +1,54 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from myweather.charts import CHART_TYPES, RENDER_MODES, ChartRenderer, chart_series, hour_interval_for
+from myweather.client import forecast_params
+from myweather.fake_upstream import build_forecast_payload
+from myweather.frame import ForecastFrame
+
+
+def forecast_series(selected_days, latitude=51.5074, longitude=-0.1278):
+    """Returns the four chart series for a synthetic forecast of ``selected_days`` days."""
+    frame = ForecastFrame.from_response(build_forecast_payload(forecast_params(latitude, longitude, selected_days)))
+    hour_interval = hour_interval_for(selected_days)
+    return [chart_series(kind, frame, hour_interval) for kind in CHART_TYPES]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares serial, threaded and process chart rendering for several forecast horizons, "
+        "with freshly built and with pooled figures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, nargs="+", default=[1, 2, 7])
+        parser.add_argument("--modes", nargs="+", choices=RENDER_MODES, default=list(RENDER_MODES))
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--figure-pool", type=int, default=16,
+                            help="Pool size for the pooled runs; 0 only benchmarks freshly built figures.")
+
+    def handle(self, *args, **options):
+        pool_sizes = [0, options["figure_pool"]] if options["figure_pool"] else [0]
+        self.stdout.write(f"{'mode':<8} {'pool':>4} {'days':>4} {'median ms':>10} {'min ms':>8} {'per chart':>10}")
+        for mode, pool_size in ((m, p) for m in options["modes"] for p in pool_sizes):
+            renderer = ChartRenderer(mode, workers=options["workers"], pool_size=pool_size)
+            try:
+                # The first call starts the pool (and warms the worker processes).
+                renderer.render_many(forecast_series(1))
+                for days in options["days"]:
+                    series_list = forecast_series(days)
+                    timings = []
+                    for _ in range(options["repeat"]):
+                        start = time.perf_counter()
+                        renderer.render_many(series_list)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    median = statistics.median(timings)
+                    self.stdout.write(
+                        f"{mode:<8} {pool_size:>4} {days:>4} {median:>10.1f} {min(timings):>8.1f} "
+                        f"{median / len(series_list):>10.1f}"
+                    )
+            finally:
+                renderer.shutdown()
@@ -0,0 +1,50 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from myweather.charts import CHART_BACKENDS, CHART_TYPES, ChartRenderer, chart_series, hour_interval_for
+from myweather.client import forecast_params
+from myweather.fake_upstream import build_forecast_payload
+from myweather.frame import ForecastFrame
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the four forecast charts for growing horizons (up to 16 days) from the raw hourly "
+        "series and from the downsampled ones, to show render time staying flat as days grow."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, nargs="+", default=[1, 2, 3, 5, 7, 10, 14, 16])
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--backend", choices=sorted(CHART_BACKENDS), default="matplotlib")
+        parser.add_argument("--figure-pool", type=int, default=16,
+                            help="Figure pool size for the matplotlib backend; 0 builds every figure afresh.")
+
+    def _median_ms(self, renderer, series_list, repeat):
+        renderer.render_many(series_list)  # builds the pooled figures for this shape
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            renderer.render_many(series_list)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        renderer = ChartRenderer("serial", pool_size=options["figure_pool"], backend=options["backend"])
+        self.stdout.write(
+            f"{'days':>4} {'hours':>6} {'points':>16} {'raw ms':>9} {'reduced ms':>11} {'speed-up':>9}"
+        )
+        for days in options["days"]:
+            frame = ForecastFrame.from_response(build_forecast_payload(forecast_params(51.5074, -0.1278, days)))
+            hour_interval = hour_interval_for(days)
+            raw = [chart_series(kind, frame, hour_interval, downsample=False) for kind in CHART_TYPES]
+            reduced = [chart_series(kind, frame, hour_interval) for kind in CHART_TYPES]
+            raw_ms = self._median_ms(renderer, raw, options["repeat"])
+            reduced_ms = self._median_ms(renderer, reduced, options["repeat"])
+            points = "/".join(str(len(series["time"])) for series in reduced)
+            self.stdout.write(
+                f"{days:>4} {len(frame):>6} {points:>16} {raw_ms:>9.1f} {reduced_ms:>11.1f} "
+                f"{raw_ms / reduced_ms:>8.1f}x"
+            )
@@ -0,0 +1,101 @@
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myweather.catalogue import get_catalogue
+from myweather.frame import ForecastFrame
+from myweather.models import ForecastSnapshot
+from myweather.snapshots import build_snapshot, latest_snapshots, save_snapshots, unpack_frame
+from myweather.startup import _dummy_frame
+
+
+def _variant(frame, rng, day):
+    """Returns ``frame`` moved ``day`` days ahead, its hourly values shifted by random noise."""
+    noise = rng.standard_normal(len(frame)).astype(np.float32)
+    shift = np.timedelta64(day, "D")
+    return ForecastFrame(
+        time=frame.time + shift,
+        hourly={name: column + noise for name, column in frame.hourly.items()},
+        sunrise=frame.sunrise + shift,
+        sunset=frame.sunset + shift,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures forecast snapshot ingest rate and read latency on a synthetic store. "
+        "Runs inside a transaction that is rolled back, so the database is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=1_000_000, help="Total forecast hours to store.")
+        parser.add_argument("--horizon", type=int, default=192, help="Hours per snapshot.")
+        parser.add_argument("--reads", type=int, default=500)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        count = options["hours"] // options["horizon"]
+        base = _dummy_frame(options["horizon"])
+        fetched = datetime.now(timezone.utc).timestamp()
+        # One forecast per catalogue city and day, going back in time: a history of daily snapshots.
+        cities = get_catalogue().cities
+        first_day = date(2024, 1, 1)
+
+        start = time.perf_counter()
+        snapshots = []
+        for i in range(count):
+            city, day = cities[i % len(cities)], i // len(cities)
+            params = {"latitude": city.latitude, "longitude": city.longitude,
+                      "start_date": (first_day + timedelta(days=day)).isoformat()}
+            snapshots.append(build_snapshot(params, _variant(base, rng, day), fetched - (count - i)))
+        build = time.perf_counter() - start
+        keys = list({snapshot.request_key for snapshot in snapshots})
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            save_snapshots(snapshots)
+            ingest = time.perf_counter() - start
+            stored = ForecastSnapshot.objects.count()
+            self.stdout.write(
+                f"Ingested {count} snapshots ({count * options['horizon']} hours) in {ingest:.2f}s: "
+                f"{count / ingest:,.0f} snapshots/s, {count * options['horizon'] / ingest:,.0f} hours/s "
+                f"(packing took {build:.2f}s); {stored} rows in the table"
+            )
+
+            timings = {"latest": [], "latest_unpacked": [], "city_week": [], "batch_50": []}
+            days = count // len(cities)
+            for _ in range(options["reads"]):
+                key = random.choice(keys)
+                t = time.perf_counter()
+                snapshot = latest_snapshots([key])[key]
+                timings["latest"].append(time.perf_counter() - t)
+                unpack_frame(snapshot)
+                timings["latest_unpacked"].append(time.perf_counter() - t)
+
+                # A city's snapshots covering one week of its history, unpacked.
+                window_start = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(days=random.randrange(max(1, days - 7)))
+                t = time.perf_counter()
+                for snapshot in ForecastSnapshot.objects.filter(
+                    city=random.choice(cities).name,
+                    valid_from__gte=window_start, valid_from__lt=window_start + timedelta(days=7),
+                ):
+                    unpack_frame(snapshot)
+                timings["city_week"].append(time.perf_counter() - t)
+
+            for _ in range(max(1, options["reads"] // 50)):
+                t = time.perf_counter()
+                for snapshot in latest_snapshots(random.sample(keys, min(50, len(keys)))).values():
+                    unpack_frame(snapshot)
+                timings["batch_50"].append(time.perf_counter() - t)
+
+            self.stdout.write(f"{'read':<16} {'median ms':>10} {'p99 ms':>8}")
+            for label, values in timings.items():
+                values.sort()
+                p99 = values[max(0, int(len(values) * 0.99) - 1)]
+                self.stdout.write(f"{label:<16} {statistics.median(values) * 1000:>10.2f} {p99 * 1000:>8.2f}")
+            transaction.set_rollback(True)
@@ -0,0 +1,55 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from myweather.cache import ForecastCache, MemoryBackend
+from myweather.catalogue import get_catalogue
+from myweather.fake_upstream import build_forecast_payload
+from myweather.frame import ForecastFrame
+from myweather.tiles import DEFAULT_TILE_SETTINGS, TileCache
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends many distinct user coordinates, scattered around the catalogue cities, through the "
+        "tile cache at every snap level and reports how few upstream fetches they collapse into."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=5000)
+        parser.add_argument("--cities", type=int, default=20, help="Cities the points cluster around.")
+        parser.add_argument("--spread-km", type=float, default=15.0,
+                            help="Standard deviation of a point's distance from its city.")
+        parser.add_argument("--days", type=int, default=2)
+        parser.add_argument("--max-entries", type=int, default=DEFAULT_TILE_SETTINGS["MAX_ENTRIES"])
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        cities = get_catalogue().cities[:options["cities"]]
+        spread = options["spread_km"] / 111.0  # degrees of latitude
+        points = [
+            (city.latitude + rng.gauss(0, spread), city.longitude + rng.gauss(0, spread))
+            for city in (rng.choice(cities) for _ in range(options["points"]))
+        ]
+
+        def fetch(params):
+            return ForecastFrame.from_response(build_forecast_payload(params))
+
+        self.stdout.write(f"{len(points)} points around {len(cities)} cities, spread {options['spread_km']} km")
+        self.stdout.write(f"{'level':<10} {'step':>6} {'tiles':>7} {'fetches':>8} {'hit ratio':>10} {'ms':>8}")
+        for level, step in DEFAULT_TILE_SETTINGS["LEVELS"].items():
+            tiles = TileCache(ForecastCache(MemoryBackend(options["max_entries"], 3600), 600, 3600),
+                              DEFAULT_TILE_SETTINGS["LEVELS"], level)
+            start = time.perf_counter()
+            distinct = set()
+            for latitude, longitude in points:
+                tile = tiles.tile(latitude, longitude)
+                distinct.add((tile.latitude, tile.longitude))
+                tiles.get_entry(tile, options["days"], fetch)
+            elapsed = (time.perf_counter() - start) * 1000
+            stats = tiles.stats()[level]
+            self.stdout.write(
+                f"{level:<10} {step:>6} {len(distinct):>7} {stats['misses']:>8} {stats['hit_ratio']:>10.1%} {elapsed:>8.0f}"
+            )
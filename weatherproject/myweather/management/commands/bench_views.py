@@ -0,0 +1,256 @@
+import json
+import platform
+import resource
+import statistics
+import time
+import tracemalloc
+from datetime import date, datetime
+from pathlib import Path
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from myweather.cache import get_forecast_cache, get_page_cache
+from myweather.catalogue import get_catalogue
+from myweather.charts import CHART_BACKENDS, get_chart_store
+from myweather.client import forecast_params, get_forecast_client, set_forecast_client
+from myweather.fake_upstream import build_forecast_payload
+from myweather.frame import HOURLY_VARIABLES
+
+DEFAULT_CITIES = ["London", "Cairo", "Buenos Aires"]
+DEFAULT_FIXTURES = Path(settings.BASE_DIR) / "benchmarks" / "fixtures"
+
+# Recording from the fake upstream pins this date so the fixtures are identical on every machine.
+FAKE_START = date(2024, 6, 1)
+
+
+def _fixture_name(city, days):
+    return f"{city.lower().replace(' ', '_')}_{days}d.json"
+
+
+def _current_fixture(path):
+    """True when ``path`` holds a fixture recorded with today's hourly variables."""
+    if not path.exists():
+        return False
+    return json.loads(path.read_text())["params"]["hourly"] == ",".join(HOURLY_VARIABLES)
+
+
+def _horizon(params):
+    return (date.fromisoformat(params["end_date"]) - date.fromisoformat(params["start_date"])).days
+
+
+class ReplayClient:
+    """Stands in for ``ForecastClient``: answers from recorded responses, never touches the network."""
+
+    def __init__(self, fixtures):
+        self.responses = {
+            (round(float(f["params"]["latitude"]), 4), round(float(f["params"]["longitude"]), 4), f["days"]): f["response"]
+            for f in fixtures
+        }
+
+    def fetch(self, params):
+        key = (round(float(params["latitude"]), 4), round(float(params["longitude"]), 4), _horizon(params))
+        try:
+            return self.responses[key]
+        except KeyError:
+            raise CommandError(f"No recorded response for {key}; run with --record.") from None
+
+    def fetch_many(self, params_list):
+        return [self.fetch(params) for params in params_list]
+
+
+def _summary(values):
+    values = sorted(values)
+    return {
+        "median": round(statistics.median(values), 3),
+        "min": round(values[0], 3),
+        "p90": round(values[min(len(values) - 1, int(len(values) * 0.9))], 3),
+    }
+
+
+def _chunks(response):
+    if not response.streaming:
+        return iter([response.content])
+    return iter(response.streaming_content)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays recorded Open-Meteo responses for several cities and 1-7 day horizons through the "
+        "forecast page, with the network stubbed out. Reports end-to-end, first-byte, parse, per-chart, "
+        "template and hourly table time and peak memory as JSON; --baseline flags regressions against "
+        "an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cities", nargs="+", default=DEFAULT_CITIES)
+        parser.add_argument("--days", type=int, nargs="+", default=list(range(1, 8)))
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--backend", choices=sorted(CHART_BACKENDS), default=None,
+                            help="Chart backend (default: WEATHER_CHART_BACKEND).")
+        parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES, help=(
+            "Directory of recorded responses (default: benchmarks/fixtures, which git ignores; the "
+            "fake-upstream recordings are rebuilt on demand, so only --live ones are worth keeping)."))
+        parser.add_argument("--record", action="store_true", help=(
+            "Re-record all fixtures before running (missing or outdated ones are always recorded): from the "
+            "configured Open-Meteo URL with --live, otherwise from the built-in fake upstream."))
+        parser.add_argument("--live", action="store_true", help="Record from the real API.")
+        parser.add_argument("--output", type=Path, help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", type=Path, help="Compare with the results in this JSON file.")
+        parser.add_argument("--threshold", type=float, default=0.10,
+                            help="Relative slowdown of a median counted as a regression (default 0.10).")
+        parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                            help="Ignore slowdowns smaller than this many milliseconds.")
+
+    def handle(self, *args, **options):
+        wanted = [(city, days) for city in options["cities"] for days in options["days"]]
+        paths = {(city, days): options["fixtures"] / _fixture_name(city, days) for city, days in wanted}
+        missing = [pair for pair in wanted if options["record"] or not _current_fixture(paths[pair])]
+        if missing:
+            self._record(missing, options)
+        fixtures = [json.loads(paths[pair].read_text()) for pair in wanted]
+
+        results = self._run(fixtures, options)
+        text = json.dumps(results, indent=2)
+        if options["output"]:
+            options["output"].write_text(text)
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(text)
+
+        if options["baseline"]:
+            regressions = self._compare(json.loads(options["baseline"].read_text()), results, options)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+
+    def _record(self, pairs, options):
+        options["fixtures"].mkdir(parents=True, exist_ok=True)
+        catalogue = get_catalogue()
+        for name, days in pairs:
+            city = catalogue.get(name)
+            if city is None:
+                raise CommandError(f"Unknown city: {name}")
+            if options["live"]:
+                params = forecast_params(city.latitude, city.longitude, days)
+                response = get_forecast_client().fetch(params)
+            else:
+                params = forecast_params(city.latitude, city.longitude, days,
+                                         now=datetime.combine(FAKE_START, datetime.min.time()))
+                response = build_forecast_payload(params)
+            fixture = {"city": name, "days": days, "params": params, "response": response}
+            (options["fixtures"] / _fixture_name(name, days)).write_text(json.dumps(fixture))
+        self.stderr.write(f"Recorded {len(pairs)} fixtures in {options['fixtures']}")
+
+    def _clear_caches(self):
+        get_forecast_cache().clear()
+        get_page_cache().clear()
+        get_chart_store().clear()
+
+    def _run(self, fixtures, options):
+        overrides = {
+            # Serial rendering keeps every chart's stage timing on the request thread.
+            "WEATHER_CHART_RENDERING": "serial",
+            "WEATHER_CHART_BACKEND": options["backend"] or getattr(settings, "WEATHER_CHART_BACKEND", "matplotlib"),
+            "WEATHER_SNAPSHOT_STORE": {**getattr(settings, "WEATHER_SNAPSHOT_STORE", {}), "ENABLED": False},
+            "WEATHER_METRICS": True,
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+        }
+        # Stores of this process only, so clearing them between runs touches nothing a server uses.
+        for name in ("WEATHER_FORECAST_CACHE", "WEATHER_PAGE_CACHE", "WEATHER_CHART_STORE"):
+            overrides[name] = {**getattr(settings, name, {}), "BACKEND": "memory"}
+        with override_settings(**overrides):
+            return self._replay(fixtures, options)
+
+    def _replay(self, fixtures, options):
+        previous = set_forecast_client(ReplayClient(fixtures))
+        client = Client()
+        cases = {}
+        try:
+            for fixture in fixtures:
+                url = reverse("forecast", kwargs={"city": fixture["city"], "days": fixture["days"]})
+                self._clear_caches()
+                client.get(url)  # warm-up: imports, fonts, figure pool
+
+                end_to_end, first_byte, stages = [], [], {}
+                for _ in range(options["repeat"]):
+                    self._clear_caches()
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    chunks = _chunks(response)
+                    body = next(chunks, b"")
+                    first_byte.append((time.perf_counter() - start) * 1000)
+                    body += b"".join(chunks)
+                    end_to_end.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200 or b'class="error"' in body:
+                        raise CommandError(f"{url} failed with status {response.status_code}.")
+                    # Complete once the body is consumed, including what was rendered while streaming.
+                    for name, seconds in response.server_timing.items():
+                        stages.setdefault(name, []).append(seconds * 1000)
+
+                start = time.perf_counter()
+                b"".join(_chunks(client.get(url)))
+                warm = (time.perf_counter() - start) * 1000
+
+                self._clear_caches()
+                tracemalloc.start()
+                b"".join(_chunks(client.get(url)))
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                case = f"{fixture['city']}/{fixture['days']}"
+                cases[case] = {
+                    "hours": len(fixture["response"]["hourly"]["time"]),
+                    "end_to_end_ms": _summary(end_to_end),
+                    "first_byte_ms": _summary(first_byte),
+                    "cached_ms": round(warm, 3),
+                    "stages_ms": {name: _summary(values) for name, values in stages.items() if name != "total"},
+                    "peak_memory_kb": round(peak / 1024, 1),
+                }
+                self.stderr.write(f"{case:<20} {cases[case]['end_to_end_ms']['median']:>9.1f} ms")
+        finally:
+            set_forecast_client(previous)
+
+        return {
+            "meta": {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "chart_backend": settings.WEATHER_CHART_BACKEND,
+                "repeat": options["repeat"],
+                "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            },
+            "cases": cases,
+        }
+
+    def _compare(self, baseline, results, options):
+        """Prints every median that moved and returns the regressions."""
+        regressions = []
+        self.stdout.write(f"{'case':<20} {'metric':<26} {'baseline':>10} {'current':>10} {'change':>8}")
+        for case, current in results["cases"].items():
+            before = baseline.get("cases", {}).get(case)
+            if before is None:
+                continue
+            pairs = [("end_to_end", before["end_to_end_ms"], current["end_to_end_ms"])]
+            if "first_byte_ms" in before:
+                pairs.append(("first_byte", before["first_byte_ms"], current["first_byte_ms"]))
+            pairs += [
+                (name, before["stages_ms"][name], summary)
+                for name, summary in current["stages_ms"].items() if name in before.get("stages_ms", {})
+            ]
+            rows = [(metric, old["median"], new["median"]) for metric, old, new in pairs]
+            rows.append(("peak_memory_kb", before["peak_memory_kb"], current["peak_memory_kb"]))
+            for metric, old, new in rows:
+                change = (new - old) / old if old else 0.0
+                is_memory = metric == "peak_memory_kb"
+                regressed = change > options["threshold"] and (is_memory or new - old >= options["min_delta_ms"])
+                flag = "  REGRESSION" if regressed else ""
+                if regressed:
+                    regressions.append((case, metric, old, new))
+                self.stdout.write(f"{case:<20} {metric:<26} {old:>10.1f} {new:>10.1f} {change:>+7.0%}{flag}")
+        return regressions
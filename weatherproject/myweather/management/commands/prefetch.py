@@ -0,0 +1,82 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myweather.fake_upstream import FakeOpenMeteo
+from myweather.prefetch import Prefetcher, process_local_caches
+
+
+class Command(BaseCommand):
+    help = (
+        "Keeps the forecast, page and chart caches warm by refreshing every catalogue city "
+        "on a fixed cadence. Settings come from WEATHER_PREFETCH; options override them. The web "
+        "processes only benefit when these caches are shared (Django cache backend such as Redis)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run a single cycle and exit.")
+        parser.add_argument("--cycles", type=int, help="Exit after this many cycles.")
+        parser.add_argument("--interval", type=float, help="Seconds between cycle starts.")
+        parser.add_argument("--jitter", type=float, help="Share of the interval the pause may vary by.")
+        parser.add_argument("--days", type=int, nargs="+", help="Forecast lengths to refresh.")
+        parser.add_argument("--city", action="append", dest="cities", help="Refresh only this city (repeatable).")
+        parser.add_argument("--workers", type=int, help="Concurrent refreshes.")
+        parser.add_argument("--rate", type=float, help="Upstream requests per second (0 = unlimited).")
+        parser.add_argument("--no-render", action="store_true", help="Only refresh forecasts, skip pages and charts.")
+        parser.add_argument("--json", action="store_true", help="Print one JSON object per cycle.")
+        parser.add_argument("--fake-upstream", action="store_true", help=(
+            "Serve forecasts from a local fake Open-Meteo instead of the real API (the snapshot store is "
+            "turned off, so nothing fake is saved)."))
+        parser.add_argument("--fake-latency", type=float, default=0.0)
+        parser.add_argument("--fake-error-rate", type=float, default=0.0)
+        parser.add_argument("--allow-local-caches", action="store_true", help=(
+            "Run even though some caches are process-local, i.e. only this process would see what it fetches."))
+
+    def handle(self, *args, **options):
+        overrides = {
+            name.upper(): options[name]
+            for name in ("interval", "jitter", "days", "cities", "workers", "rate")
+            if options[name] is not None
+        }
+        if options["no_render"]:
+            overrides["RENDER"] = False
+        cycles = 1 if options["once"] else options["cycles"]
+
+        local = process_local_caches(render=not options["no_render"])
+        if local and not options["allow_local_caches"]:
+            raise CommandError(
+                f"{', '.join(local)} {'is' if len(local) == 1 else 'are'} process-local, so the web processes "
+                "would never see what this process prefetches. Put them on a shared Django cache "
+                "(BACKEND 'django' with e.g. Redis or Memcached), or set WEATHER_PREFETCH['IN_PROCESS'] "
+                "to prefetch inside the serving processes instead."
+            )
+
+        upstream = None
+        if options["fake_upstream"]:
+            upstream = FakeOpenMeteo(latency=options["fake_latency"], error_rate=options["fake_error_rate"]).start()
+            upstream.use_in_settings()
+            self.stderr.write(f"Fake Open-Meteo at {upstream.url}")
+
+        prefetcher = Prefetcher.from_settings(**overrides)
+        self.stderr.write(
+            f"Prefetching {len(prefetcher.cities)} cities x {len(prefetcher.days)} horizons "
+            f"every {prefetcher.interval:g}s with {prefetcher.workers} workers"
+        )
+        try:
+            prefetcher.run_forever(cycles=cycles, on_cycle=lambda stats: self._report(stats, options["json"]))
+        except KeyboardInterrupt:
+            prefetcher.stop()
+        finally:
+            if upstream is not None:
+                upstream.stop()
+
+    def _report(self, stats, as_json):
+        if as_json:
+            self.stdout.write(json.dumps(stats.as_dict()))
+            return
+        self.stdout.write(
+            f"cycle: {stats.refreshed}/{stats.cities} cities refreshed, "
+            f"{stats.pages_rendered} pages rendered, {stats.failures} failures, {stats.duration:.1f}s"
+        )
+        for error in stats.errors:
+            self.stdout.write(f"  {error}")
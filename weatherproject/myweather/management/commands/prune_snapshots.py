@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from myweather.models import ForecastSnapshot
+from myweather.snapshots import prune_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes forecast snapshots that ended more than RETENTION_DAYS ago and all but the newest "
+        "KEEP snapshots of every forecast request (see WEATHER_SNAPSHOT_STORE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-days", type=float, help="Override RETENTION_DAYS.")
+        parser.add_argument("--keep", type=int, help="Override KEEP.")
+        parser.add_argument("--vacuum", action="store_true", help="Reclaim the freed space (SQLite VACUUM).")
+
+    def handle(self, *args, **options):
+        before = ForecastSnapshot.objects.count()
+        expired, superseded = prune_snapshots(options["retention_days"], options["keep"])
+        self.stdout.write(
+            f"Deleted {expired} expired and {superseded} superseded snapshots "
+            f"({before} -> {before - expired - superseded})"
+        )
+        if options["vacuum"] and connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+            self.stdout.write("Vacuumed the database.")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from myweather.fake_upstream import FakeOpenMeteo
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local stand-in for the Open-Meteo forecast API. A server pointed at it (OPEN_METEO_URL) "
+        "should run with WEATHER_SNAPSHOT_STORE['ENABLED'] off, or its synthetic forecasts are stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503.")
+
+    def handle(self, *args, **options):
+        server = FakeOpenMeteo(
+            host=options["host"], port=options["port"],
+            latency=options["latency"], error_rate=options["error_rate"],
+        )
+        self.stdout.write(f"Serving fake Open-Meteo at {server.url}")
+        self.stderr.write(
+            "Synthetic forecasts: turn WEATHER_SNAPSHOT_STORE['ENABLED'] off in any server using this URL, "
+            "so they are not stored and served to real users."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
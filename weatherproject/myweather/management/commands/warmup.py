@@ -0,0 +1,82 @@
+import importlib
+import json
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from myweather.fake_upstream import FakeOpenMeteo
+from myweather.startup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Warms up Matplotlib, fonts and the chart renderers. With --report, compares import time "
+        "and first-request latency of fresh processes with and without warm-up."
+    )
+    # System checks import the URLconf (and so the views) before --measure could time it.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--report", action="store_true", help="Measure fresh processes with and without warm-up.")
+        parser.add_argument("--measure", action="store_true", help=(
+            "Internal: measure this process and print JSON."))
+        parser.add_argument("--warm", action="store_true", help="Internal: warm up before measuring.")
+
+    def handle(self, *args, **options):
+        if options["measure"]:
+            self.stdout.write(json.dumps(self._measure(options["warm"])))
+        elif options["report"]:
+            self._report()
+        else:
+            for step, ms in warm_up().items():
+                self.stdout.write(f"{step:<26} {ms:>9.1f} ms")
+
+    def _measure(self, warm):
+        result = {}
+        start = time.perf_counter()
+        views = importlib.import_module("myweather.views")
+        result["import_views"] = (time.perf_counter() - start) * 1000
+        result["matplotlib_imported"] = "matplotlib" in sys.modules
+
+        if warm:
+            start = time.perf_counter()
+            warm_up()
+            result["warm_up"] = (time.perf_counter() - start) * 1000
+
+        # In-process stores only: pages and charts left by earlier runs (e.g. in the
+        # shared chart directory) would make the cold request look warm.
+        process_local = override_settings(**{
+            name: {**getattr(settings, name, {}), "BACKEND": "memory"}
+            for name in ("WEATHER_FORECAST_CACHE", "WEATHER_PAGE_CACHE", "WEATHER_CHART_STORE")
+        })
+        with FakeOpenMeteo() as upstream, process_local:
+            upstream.use_in_settings()
+            factory = RequestFactory()
+            for label, city in (("first_request", "London"), ("second_request", "Paris")):
+                start = time.perf_counter()
+                response = views.forecast_view(factory.get(f"/forecast/{city}/2/"), city=city, days=2)
+                body = b"".join(response) if response.streaming else response.content
+                result[label] = (time.perf_counter() - start) * 1000
+                if response.status_code != 200 or b'class="error"' in body:
+                    raise CommandError(f"Forecast page for {city} failed with status {response.status_code}.")
+        return result
+
+    def _report(self):
+        rows = {}
+        for label, extra in (("cold", []), ("warmed", ["--warm"])):
+            output = subprocess.run(
+                [sys.executable, sys.argv[0], "warmup", "--measure", *extra],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            rows[label] = json.loads(output.strip().splitlines()[-1])
+
+        self.stdout.write(f"{'':<22} {'cold':>10} {'warmed':>10}")
+        for key in ("import_views", "warm_up", "first_request", "second_request"):
+            cells = [rows[label].get(key) for label in ("cold", "warmed")]
+            self.stdout.write(f"{key + ' (ms)':<22} " + " ".join(
+                f"{cell:>10.1f}" if cell is not None else f"{'-':>10}" for cell in cells))
+        self.stdout.write(f"matplotlib imported by views: {rows['cold']['matplotlib_imported']}")
@@ -0,0 +1,357 @@
+"""
+Request instrumentation: stage timers, counters and histograms.
+
+``stage(name)`` times a block of work into the ``myweather_stage_seconds``
+histogram and, inside a request handled by ``ServerTimingMiddleware``, into
+that response's ``Server-Timing`` header (for a streamed response, into its
+``server_timing`` dict once the stream ends). ``metrics_view`` exposes every
+metric in the Prometheus text format to the addresses in
+``settings.WEATHER_METRICS_ALLOWED_IPS`` (loopback by default).
+
+Everything is switched on by ``settings.WEATHER_METRICS``. When it is off,
+``stage`` hands out one shared no-op context manager, counters are not
+touched and the middleware removes itself from the stack.
+"""
+import bisect
+import contextvars
+import ipaddress
+import threading
+import time
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from .startup import _setting
+
+DEFAULT_ALLOWED_IPS = ("127.0.0.1", "::1")
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+_enabled = None
+_registry = {}
+_registry_lock = threading.Lock()
+
+# Stage timings of the request being handled in this context, for Server-Timing.
+_request_stages = contextvars.ContextVar("myweather_request_stages", default=None)
+
+
+def enabled():
+    """Returns True when ``settings.WEATHER_METRICS`` is on (read once per process)."""
+    global _enabled
+    if _enabled is None:
+        _enabled = bool(_setting("WEATHER_METRICS", False))
+    return _enabled
+
+
+def _settings_changed(setting, **kwargs):
+    # Read again on next use, e.g. inside override_settings; the middleware is
+    # only (un)loaded by handlers created afterwards.
+    global _enabled
+    if setting == "WEATHER_METRICS":
+        _enabled = None
+
+
+setting_changed.connect(_settings_changed)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, _label_text(self.labels, label_values), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, in the Prometheus sense."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, ([*counts], total, n)) for labels, (counts, total, n) in self._series.items())
+        for label_values, (counts, total, n) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                labels = _label_text((*self.labels, "le"), (*label_values, le))
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _label_text(self.labels, label_values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, n
+
+
+def _register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+def counter(name, documentation, labels=()):
+    """Returns the counter called ``name``, creating it on first use."""
+    return _registry.get(name) or _register(Counter(name, documentation, labels))
+
+
+def histogram(name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+    """Returns the histogram called ``name``, creating it on first use."""
+    return _registry.get(name) or _register(Histogram(name, documentation, labels, buckets))
+
+
+STAGE_SECONDS = histogram("myweather_stage_seconds", "Time spent per processing stage.", ("stage",))
+REQUEST_SECONDS = histogram("myweather_request_seconds", "Request latency per view.", ("view", "method"))
+UPSTREAM_REQUESTS = counter("myweather_upstream_requests_total", "Requests sent to Open-Meteo.")
+UPSTREAM_ERRORS = counter("myweather_upstream_errors_total", "Failed Open-Meteo calls by error kind.", ("kind",))
+CACHE_LOOKUPS = counter("myweather_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+RENDERED_BYTES = counter("myweather_chart_rendered_bytes_total", "Bytes of chart images rendered.", ("backend", "kind"))
+RENDERED_CHARTS = counter("myweather_charts_rendered_total", "Chart images rendered.", ("backend", "kind"))
+RENDER_REJECTED = counter("myweather_render_queue_rejected_total", "Renders refused because the render queue was full.")
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, self.name)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[self.name] = stages.get(self.name, 0.0) + elapsed
+        return False
+
+
+def stage(name):
+    """Context manager timing the enclosed block as stage ``name``."""
+    if not enabled():
+        return _NOOP
+    return _Stage(name)
+
+
+def count(metric, amount=1, *label_values):
+    """Increments ``metric`` when instrumentation is on."""
+    if enabled():
+        metric.inc(amount, *label_values)
+
+
+def count_lookup(cache, hit):
+    """Counts one cache lookup of ``cache`` as a hit or a miss."""
+    if enabled():
+        CACHE_LOOKUPS.inc(1, cache, "hit" if hit else "miss")
+
+
+def _cache_ratios():
+    """Hit ratio per cache, from the lookup counters and the forecast cache's own stats."""
+    from .cache import get_forecast_cache
+
+    stats = get_forecast_cache().stats()
+    ratios = {"forecast": stats["hit_ratio"]}
+    caches = {cache for cache, _ in CACHE_LOOKUPS._values}
+    for cache in sorted(caches):
+        hits = CACHE_LOOKUPS.value(cache, "hit")
+        total = hits + CACHE_LOOKUPS.value(cache, "miss")
+        ratios[cache] = hits / total if total else 0.0
+    return stats, ratios
+
+
+def render_prometheus():
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in list(_registry.values()):
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(f"{name}{labels} {value}" for name, labels, value in metric.samples())
+
+    stats, ratios = _cache_ratios()
+    lines.append("# HELP myweather_forecast_cache_events_total Forecast cache lookups and refreshes.")
+    lines.append("# TYPE myweather_forecast_cache_events_total counter")
+    for event in ("hits", "misses", "stale", "refreshes", "refresh_errors"):
+        lines.append(f'myweather_forecast_cache_events_total{{event="{event}"}} {stats[event]}')
+    lines.append("# HELP myweather_cache_hit_ratio Share of lookups answered from cache.")
+    lines.append("# TYPE myweather_cache_hit_ratio gauge")
+    lines.extend(f'myweather_cache_hit_ratio{{cache="{cache}"}} {ratio}' for cache, ratio in ratios.items())
+    return "\n".join(lines) + "\n"
+
+
+def _allowed(address):
+    """True when ``address`` is in one of the networks of ``WEATHER_METRICS_ALLOWED_IPS``."""
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    networks = _setting("WEATHER_METRICS_ALLOWED_IPS", DEFAULT_ALLOWED_IPS)
+    return any(address in ipaddress.ip_network(network, strict=False) for network in networks)
+
+
+def metrics_view(request):
+    """
+    Serves the metrics to a Prometheus scraper; 404 while instrumentation is
+    off, 403 for a client outside ``WEATHER_METRICS_ALLOWED_IPS``.
+    """
+    if not enabled():
+        raise Http404("Metrics are disabled.")
+    if not _allowed(request.META.get("REMOTE_ADDR", "")):
+        return HttpResponseForbidden("Metrics are not served to this address.")
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a ``Server-Timing`` header with the request's stage timings and
+    records its latency per view. Not loaded at all while metrics are off.
+    Runs natively in both sync and async stacks, so async views stay async.
+
+    A streamed body is rendered after the headers have gone out, so the
+    header of a streamed response only covers the work before its first
+    byte. Its latency is recorded when the stream ends, and the complete
+    timings, streamed stages and ``total`` included, are then in the
+    response's ``server_timing`` dict (in seconds).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stages = {}
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stages.reset(token)
+        return self._finish(request, response, stages, start)
+
+    async def __acall__(self, request):
+        stages = {}
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stages.reset(token)
+        return self._finish(request, response, stages, start)
+
+    def _finish(self, request, response, stages, start):
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else "unmatched"
+        elapsed = time.perf_counter() - start
+        timings = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages.items()]
+        timings.append(f"total;dur={elapsed * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+        response.server_timing = stages
+
+        def done():
+            stages["total"] = time.perf_counter() - start
+            REQUEST_SECONDS.observe(stages["total"], view, request.method)
+
+        if not response.streaming:
+            done()
+        elif response.is_async:
+            response.streaming_content = _atimed(response.streaming_content, stages, done)
+        else:
+            response.streaming_content = _timed(response.streaming_content, stages, done)
+        return response
+
+
+_END = object()
+
+
+def _timed(chunks, stages, done):
+    """Yields ``chunks``, timing the stages that render them into ``stages``; calls ``done()`` at the end."""
+    chunks = iter(chunks)
+    try:
+        while True:
+            token = _request_stages.set(stages)
+            try:
+                chunk = next(chunks, _END)
+            finally:
+                _request_stages.reset(token)
+            if chunk is _END:
+                return
+            yield chunk
+    finally:
+        done()
+
+
+async def _atimed(chunks, stages, done):
+    """Async ``_timed``."""
+    chunks = aiter(chunks)
+    try:
+        while True:
+            token = _request_stages.set(stages)
+            try:
+                chunk = await anext(chunks, _END)
+            finally:
+                _request_stages.reset(token)
+            if chunk is _END:
+                return
+            yield chunk
+    finally:
+        done()
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_key', models.CharField(max_length=40)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('fetched_at', models.DateTimeField()),
+                ('valid_from', models.DateTimeField()),
+                ('valid_to', models.DateTimeField()),
+                ('hours', models.PositiveIntegerField()),
+                ('days', models.PositiveSmallIntegerField()),
+                ('variables', models.CharField(max_length=255)),
+                ('data', models.BinaryField()),
+                ('current', models.JSONField(default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['city', 'valid_from'], name='snapshot_city_valid'), models.Index(fields=['request_key', '-fetched_at'], name='snapshot_request_latest'), models.Index(fields=['fetched_at'], name='snapshot_fetched')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myweather', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastsnapshot',
+            name='timezone',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='forecastsnapshot',
+            index=models.Index(fields=['latitude', 'longitude', 'valid_from'], name='snapshot_point_valid'),
+        ),
+    ]
@@ -1,3 +1,37 @@
 from django.db import models
 
-# Create your models here.
+
+class ForecastSnapshot(models.Model):
+    """
+    One fetched forecast, stored in packed columnar form.
+
+    ``data`` holds the hour offsets (int32 minutes from ``valid_from``), one
+    float32 array per entry of ``variables`` and the sunrise/sunset offsets,
+    back to back. ``valid_from``/``valid_to`` are the forecast's wall-clock
+    times, stored as if they were UTC.
+    """
+
+    request_key = models.CharField(max_length=40)
+    city = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    timezone = models.CharField(max_length=64, blank=True)
+    fetched_at = models.DateTimeField()
+    valid_from = models.DateTimeField()
+    valid_to = models.DateTimeField()
+    hours = models.PositiveIntegerField()
+    days = models.PositiveSmallIntegerField()
+    variables = models.CharField(max_length=255)
+    data = models.BinaryField()
+    current = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["city", "valid_from"], name="snapshot_city_valid"),
+            models.Index(fields=["latitude", "longitude", "valid_from"], name="snapshot_point_valid"),
+            models.Index(fields=["request_key", "-fetched_at"], name="snapshot_request_latest"),
+            models.Index(fields=["fetched_at"], name="snapshot_fetched"),
+        ]
+
+    def __str__(self):
+        return f"{self.city or (self.latitude, self.longitude)} @ {self.fetched_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,320 @@
+"""
+Matplotlib (PNG) backend for the forecast charts.
+
+Importing this module pulls in Matplotlib, so ``charts.render_chart`` only
+does that when the first PNG chart is rendered.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+from .startup import configure_matplotlib
+
+configure_matplotlib()
+
+# Bar width in days
+BAR_WIDTH = 0.05
+
+
+def _new_figure():
+    """Creates a figure and its axes without touching pyplot's global state."""
+    fig = Figure(figsize=(13, 5))
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
+
+def figure_to_png(fig):
+    """Renders a Matplotlib figure to PNG bytes."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def _date_numbers(times):
+    """Converts ``datetime64`` timestamps to Matplotlib date numbers."""
+    return mdates.date2num(np.asarray(times, dtype="datetime64[s]"))
+
+
+def _setup_plot_axes(ax, hour_interval):
+    """Configures the common elements for all weather plots."""
+    # Configure bottom axis for hours, ticks aligned to midnight like the aggregated bars
+    ax.xaxis.set_major_locator(mdates.HourLocator(byhour=range(0, 24, hour_interval)))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+    ax.tick_params(axis='x', rotation=90)
+    ax.set_xlabel("Hour of Day", fontsize=12)
+
+    # Configure top axis for days
+    ax_top = ax.secondary_xaxis('top')
+    ax_top.xaxis.set_major_locator(mdates.DayLocator())
+    ax_top.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
+    ax_top.set_xlabel("Day", fontsize=12)
+
+
+def _bar_width(series):
+    return BAR_WIDTH * series.get("bar_hours", 1)
+
+
+def _update_bars(bars, x, heights, width, bottoms=None):
+    for i, rect in enumerate(bars.patches):
+        rect.set_x(x[i] - width / 2)
+        rect.set_height(heights[i])
+        if bottoms is not None:
+            rect.set_y(bottoms[i])
+
+
+class ChartFigure:
+    """
+    A chart's figure together with the artists that carry its data.
+
+    Building the figure (axes, grid, locators, twin axes, legends and
+    ``tight_layout``) is the expensive part of a render; ``update`` only
+    swaps in new series data, night shading and limits, so one instance can
+    be reused for every forecast with the same shape.
+    """
+
+    kind = None
+    reusable = True
+
+    def __init__(self, series):
+        self.shape = figure_shape(series)
+        self.fig, self.ax = _new_figure()
+        self.ax.grid(visible=True, which='major', axis='y', linestyle='--', alpha=0.7)
+        x = _date_numbers(series["time"])
+        self._build(series, x)
+        # Two night spans per day: midnight to sunrise and sunset to midnight.
+        self.night = []
+        for _ in range(2 * len(series["sunrise"])):
+            span = Rectangle((0, 0), 0, 1, transform=self.ax.get_xaxis_transform(),
+                             color="grey", alpha=0.2, zorder=0)
+            self.ax.add_patch(span)
+            self.night.append(span)
+        _setup_plot_axes(self.ax, series["hour_interval"])
+        self._decorate()
+        self.update(series, x)
+        self.fig.tight_layout()
+
+    def _build(self, series, x):
+        raise NotImplementedError
+
+    def _decorate(self):
+        pass
+
+    def _update(self, series, x):
+        raise NotImplementedError
+
+    def _update_night(self, series):
+        sunrises = _date_numbers(series["sunrise"])
+        sunsets = _date_numbers(series["sunset"])
+        day_starts = np.floor(sunrises)
+        for i, (sr, ss, day_start) in enumerate(zip(sunrises, sunsets, day_starts)):
+            self.night[2 * i].set_bounds(day_start, 0, sr - day_start, 1)
+            self.night[2 * i + 1].set_bounds(ss, 0, day_start + 1 - ss, 1)
+
+    def update(self, series, x=None):
+        """Replaces the plotted data with ``series``."""
+        if x is None:
+            x = _date_numbers(series["time"])
+        self._update_night(series)
+        self._update(series, x)
+        return self
+
+    def _autoscale(self, *axes):
+        for ax in axes:
+            ax.relim()
+            ax.autoscale_view()
+
+    def to_png(self):
+        return figure_to_png(self.fig)
+
+
+class TemperatureChart(ChartFigure):
+    kind = "temperature"
+
+    def _build(self, series, x):
+        self.ax.grid(visible=True, which='major', axis='x', linestyle='--', alpha=0.7)
+        (self.line,) = self.ax.plot(x, series["columns"]["temperature_2m"], color='crimson', marker='o', linewidth=2, markersize=6, alpha=0.8)
+        self.ax.set_ylabel("Temperature (°C)", fontsize=12)
+
+    def _update(self, series, x):
+        self.line.set_data(x, series["columns"]["temperature_2m"])
+        self.line.set_markevery(series.get("marker_every", 1))
+        self._autoscale(self.ax)
+
+
+class RainChart(ChartFigure):
+    kind = "rain"
+
+    def _build(self, series, x):
+        self.ax.grid(visible=True, which='major', axis='x', linestyle='--', alpha=0.7)
+        self.bars = self.ax.bar(x, series["columns"]["rain"], color='royalblue', alpha=0.6, label='Rain (mm)', width=_bar_width(series))
+        self.ax.set_ylabel("Rain (mm)", fontsize=12, color='royalblue')
+        self.ax.tick_params(axis='y', labelcolor='royalblue')
+
+        self.ax_twin = self.ax.twinx()
+        (self.line,) = self.ax_twin.plot(x, series["columns"]["precipitation_probability"], color='seagreen', marker='x', linewidth=2, markersize=6, alpha=0.8, label='Rain Probability (%)')
+        self.ax_twin.set_ylabel("Rain Probability (%)", fontsize=12, color='seagreen')
+        self.ax_twin.tick_params(axis='y', labelcolor='seagreen')
+        self.ax_twin.set_ylim(0, 100)
+
+    def _decorate(self):
+        self.fig.suptitle("Rain & Rain Probability", fontsize=16, fontweight="bold", y=1.05)
+        self.fig.legend(loc='upper left', frameon=True, fontsize=12)
+
+    def _update(self, series, x):
+        rain = series["columns"]["rain"]
+        _update_bars(self.bars, x, rain, _bar_width(series))
+        self.line.set_data(x, series["columns"]["precipitation_probability"])
+        self.line.set_markevery(series.get("marker_every", 1))
+        self._autoscale(self.ax, self.ax_twin)
+        peak = float(np.nanmax(rain)) if len(rain) else 0
+        self.ax.set_ylim(0, peak * 1.2 if peak > 0 else 1)
+        self.ax_twin.set_ylim(0, 100)
+
+
+class CloudChart(ChartFigure):
+    kind = "cloud"
+
+    def _build(self, series, x):
+        self.ax.grid(visible=True, which='major', axis='x', linestyle='--', alpha=0.7)
+        (self.line,) = self.ax.plot(x, series["columns"]["cloudcover"], color='dimgray', marker='D', linewidth=2, markersize=5, alpha=0.8)
+        self.ax.set_ylabel("Cloud Cover (%)", fontsize=12)
+
+    def _update(self, series, x):
+        self.line.set_data(x, series["columns"]["cloudcover"])
+        self.line.set_markevery(series.get("marker_every", 1))
+        self._autoscale(self.ax)
+        self.ax.set_ylim(0, 100)
+
+
+class WindChart(ChartFigure):
+    kind = "wind"
+
+    def _build(self, series, x):
+        wind_speed = series["columns"]["windspeed_10m"]
+        width = _bar_width(series)
+        self.speed_bars = self.ax.bar(x, wind_speed, color='royalblue', alpha=0.7, label='Wind Speed (km/h)', width=width)
+        self.gust_bars = self.ax.bar(x, np.zeros(len(x)), bottom=wind_speed, color='lightcoral', alpha=0.7, label='Wind Gust (km/h)', width=width)
+        self.ax.set_ylabel("Wind Speed (km/h)", fontsize=12)
+
+    def _decorate(self):
+        self.fig.suptitle("Wind Speed and Gusts", fontsize=16, fontweight="bold", y=1.05)
+        self.fig.legend(loc='upper left', frameon=True, fontsize=12)
+
+    def _update(self, series, x):
+        wind_speed = series["columns"]["windspeed_10m"]
+        width = _bar_width(series)
+        _update_bars(self.speed_bars, x, wind_speed, width)
+        _update_bars(self.gust_bars, x, series["columns"]["gust_excess"], width, bottoms=wind_speed)
+        self._autoscale(self.ax)
+
+
+class OverlayChart(ChartFigure):
+    """One line per forecast on shared axes; rebuilt every time since its legend varies."""
+
+    kind = "overlay"
+    reusable = False
+
+    def _build(self, series, x):
+        self.ax.grid(visible=True, which='major', axis='x', linestyle='--', alpha=0.7)
+        for name, column in series["columns"].items():
+            self.ax.plot(x, column, linewidth=1.5, alpha=0.8, label=name)
+        self.ax.set_ylabel(series["label"], fontsize=12)
+        rows = -(-len(series["columns"]) // 6)
+        self.fig.set_figheight(5 + 0.25 * rows)
+        self.ax.legend(loc='upper center', bbox_to_anchor=(0.5, -0.25), ncol=6, fontsize=9, frameon=False)
+
+    def _update(self, series, x):
+        self._autoscale(self.ax)
+
+
+CHART_FIGURES = {cls.kind: cls for cls in (TemperatureChart, RainChart, CloudChart, WindChart, OverlayChart)}
+
+
+def figure_shape(series):
+    """Returns what a reusable chart figure has to match: type, points, days, tick spacing and bar width."""
+    return (series["kind"], len(series["time"]), len(series["sunrise"]), series["hour_interval"],
+            series.get("bar_hours", 1))
+
+
+class FigurePool:
+    """
+    Bounded pool of pre-built chart figures, one skeleton per shape.
+
+    A figure is checked out for the duration of a render, so concurrent
+    renders in the same process never share one. Idle figures beyond
+    ``max_figures`` are dropped, least recently used shape first.
+    """
+
+    def __init__(self, max_figures=16):
+        self.max_figures = max_figures
+        self.built = 0
+        self.reused = 0
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _checkout(self, shape):
+        with self._lock:
+            figures = self._idle.get(shape)
+            if figures:
+                self._idle.move_to_end(shape)
+                self.reused += 1
+                return figures.pop()
+        return None
+
+    def _checkin(self, chart):
+        with self._lock:
+            self._idle.setdefault(chart.shape, []).append(chart)
+            self._idle.move_to_end(chart.shape)
+            idle = sum(len(figures) for figures in self._idle.values())
+            while idle > self.max_figures:
+                shape, figures = next(iter(self._idle.items()))
+                figures.pop(0)
+                idle -= 1
+                if not figures:
+                    del self._idle[shape]
+
+    def render(self, series):
+        """Renders ``series`` to PNG bytes on a pooled figure."""
+        chart = self._checkout(figure_shape(series))
+        if chart is None:
+            chart = CHART_FIGURES[series["kind"]](series)
+            with self._lock:
+                self.built += 1
+        else:
+            chart.update(series)
+        try:
+            return chart.to_png()
+        finally:
+            self._checkin(chart)
+
+
+_figure_pool = None
+_figure_pool_lock = threading.Lock()
+
+
+def get_figure_pool(max_figures):
+    """Returns this process's figure pool."""
+    global _figure_pool
+    if _figure_pool is None:
+        with _figure_pool_lock:
+            if _figure_pool is None:
+                _figure_pool = FigurePool(max_figures)
+    return _figure_pool
+
+
+def render_png(series, pool_size=0):
+    """
+    Draws the chart described by ``series`` and returns it as PNG bytes.
+
+    With a ``pool_size`` the chart is drawn on a reused figure from this
+    process's ``FigurePool`` instead of a freshly built one.
+    """
+    if pool_size and CHART_FIGURES[series["kind"]].reusable:
+        return get_figure_pool(pool_size).render(series)
+    return CHART_FIGURES[series["kind"]](series).to_png()
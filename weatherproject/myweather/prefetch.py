@@ -0,0 +1,273 @@
+"""
+Background refresh of popular forecasts.
+
+A ``Prefetcher`` cycles over a set of cities and forecast lengths, refetches
+each forecast into the forecast cache and renders its page and charts, so
+user requests are answered from warm caches. Upstream calls go through a
+bounded worker pool and a token-bucket rate limiter; the order of the work
+is shuffled and the pause between cycles jittered so refreshes from several
+workers do not land on Open-Meteo all at once.
+
+The prefetcher only helps the processes that read the caches it fills. It
+either runs inside each serving process (``IN_PROCESS``), or as its own
+``manage.py prefetch`` process, which needs the forecast cache, page cache
+and chart store on a shared Django cache (e.g. Redis or Memcached).
+"""
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+
+from django.conf import settings
+
+from .cache import DEFAULT_CACHE_SETTINGS, DEFAULT_PAGE_CACHE_SETTINGS, get_forecast_cache
+from .catalogue import get_catalogue
+from .charts import DEFAULT_CHART_STORE_SETTINGS
+from .client import forecast_params
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFETCH_SETTINGS = {
+    "INTERVAL": 300,  # seconds between the starts of two cycles
+    "JITTER": 0.1,  # the pause between cycles varies by up to this share of INTERVAL
+    "DAYS": (1, 2, 3, 7),  # forecast lengths refreshed for every city
+    "CITIES": None,  # city names; None refreshes the whole catalogue
+    "WORKERS": 4,  # concurrent refreshes
+    "RATE": 5.0,  # upstream requests per second
+    "BURST": 5,
+    "RENDER": True,  # also render pages and charts
+    "IN_PROCESS": False,  # run in a thread of every serving process, started by its first request
+}
+
+# Django cache backends that keep their entries inside one process
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+# manage.py commands that serve requests; any other command (test, check,
+# the benchmarks) never starts the in-process prefetcher
+SERVING_COMMANDS = ("runserver",)
+
+
+def prefetch_settings():
+    """Returns ``settings.WEATHER_PREFETCH`` merged over the defaults."""
+    return {**DEFAULT_PREFETCH_SETTINGS, **getattr(settings, "WEATHER_PREFETCH", {})}
+
+
+def serving_process(argv=None):
+    """
+    False when this process runs a management command other than one of
+    ``SERVING_COMMANDS``; True under a WSGI/ASGI server.
+    """
+    argv = sys.argv if argv is None else argv
+    program = argv[0] if argv else ""
+    if os.path.basename(program) not in ("manage.py", "django-admin") and not program.endswith(
+        os.path.join("django", "__main__.py")
+    ):
+        return True
+    return len(argv) > 1 and argv[1] in SERVING_COMMANDS
+
+
+def process_local_caches(render=True):
+    """
+    Returns the settings names of the caches a separate prefetch process
+    would fill for itself only: those on the in-process "memory" backend or
+    on a process-local Django cache (the chart store's "file" backend is
+    shared by every process of the host).
+    """
+    caches = [
+        ("WEATHER_FORECAST_CACHE", DEFAULT_CACHE_SETTINGS),
+        ("WEATHER_PAGE_CACHE", DEFAULT_PAGE_CACHE_SETTINGS),
+        ("WEATHER_CHART_STORE", DEFAULT_CHART_STORE_SETTINGS),
+    ]
+    if not render:
+        caches = caches[:1]
+    local = []
+    for name, defaults in caches:
+        options = {**defaults, **getattr(settings, name, {})}
+        if options["BACKEND"] == "memory" or (
+            options["BACKEND"] == "django"
+            and settings.CACHES[options["CACHE_ALIAS"]]["BACKEND"] in PROCESS_LOCAL_CACHES
+        ):
+            local.append(name)
+    return local
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` acquisitions per second on average, up to ``burst`` at once."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop=None):
+        """Blocks until a token is available; returns False if ``stop`` is set meanwhile."""
+        if not self.rate:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if stop is None:
+                time.sleep(wait)
+            elif stop.wait(wait):
+                return False
+
+
+@dataclass
+class CycleStats:
+    started: float
+    duration: float = 0.0
+    cities: int = 0
+    refreshed: int = 0
+    failures: int = 0
+    pages_rendered: int = 0
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            "started": self.started,
+            "duration": self.duration,
+            "cities": self.cities,
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+            "pages_rendered": self.pages_rendered,
+        }
+
+
+class Prefetcher:
+    """Refreshes the forecast (and optionally the page) of every ``(city, days)`` pair each cycle."""
+
+    def __init__(self, cities, days=(2,), workers=4, rate=5.0, burst=5, interval=300, jitter=0.1,
+                 render=True, history=100):
+        self.cities = list(cities)
+        self.days = tuple(days)
+        self.workers = workers
+        self.interval = interval
+        self.jitter = jitter
+        self.render = render
+        self.limiter = RateLimiter(rate, burst)
+        self.history = deque(maxlen=history)
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        options = {**prefetch_settings(), **overrides}
+        catalogue = get_catalogue()
+        if options["CITIES"] is None:
+            cities = catalogue.cities
+        else:
+            cities = [city for city in map(catalogue.get, options["CITIES"]) if city is not None]
+        return cls(
+            cities,
+            days=options["DAYS"],
+            workers=options["WORKERS"],
+            rate=options["RATE"],
+            burst=options["BURST"],
+            interval=options["INTERVAL"],
+            jitter=options["JITTER"],
+            render=options["RENDER"],
+        )
+
+    def _refresh(self, city, days):
+        # Imported here: the views pull in the whole rendering stack.
+        from .views import fetch_forecast_frame, forecast_page
+
+        if not self.limiter.acquire(self._stop):
+            return False
+        params = forecast_params(city.latitude, city.longitude, days)
+        entry = get_forecast_cache().refresh(params, partial(fetch_forecast_frame, read_store=False))
+        if self.render:
+            forecast_page(city, days, entry)
+        return True
+
+    def run_cycle(self):
+        """Refreshes every ``(city, days)`` pair once and returns the cycle's ``CycleStats``."""
+        stats = CycleStats(started=time.time(), cities=len(self.cities))
+        tasks = [(city, days) for city in self.cities for days in self.days]
+        random.shuffle(tasks)
+        start = time.perf_counter()
+        refreshed_cities = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch") as executor:
+            futures = {executor.submit(self._refresh, city, days): (city, days) for city, days in tasks}
+            for future, (city, days) in futures.items():
+                try:
+                    if not future.result():
+                        continue
+                except Exception as exc:
+                    stats.failures += 1
+                    if len(stats.errors) < 10:
+                        stats.errors.append(f"{city.name}/{days}: {exc}")
+                    logger.warning("Prefetch of %s for %s days failed: %s", city.name, days, exc)
+                    continue
+                refreshed_cities.add(city.name)
+                if self.render:
+                    stats.pages_rendered += 1
+        stats.refreshed = len(refreshed_cities)
+        stats.duration = time.perf_counter() - start
+        self.history.append(stats)
+        logger.info(
+            "Prefetch cycle: %d/%d cities refreshed, %d failures, %.1fs",
+            stats.refreshed, stats.cities, stats.failures, stats.duration,
+        )
+        return stats
+
+    def next_delay(self, stats):
+        """Seconds to wait after a cycle so cycles start every ``interval`` seconds, with jitter."""
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval - stats.duration + random.uniform(-spread, spread))
+
+    def run_forever(self, cycles=None, on_cycle=None):
+        """Runs cycles until ``stop()`` is called or ``cycles`` cycles have run."""
+        count = 0
+        while not self._stop.is_set():
+            stats = self.run_cycle()
+            count += 1
+            if on_cycle is not None:
+                on_cycle(stats)
+            if cycles is not None and count >= cycles:
+                break
+            self._stop.wait(self.next_delay(stats))
+
+    def stop(self):
+        self._stop.set()
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def start_in_background(**kwargs):
+    """
+    Starts this process's prefetcher in a daemon thread, once per process.
+
+    Connected to ``request_started`` when ``IN_PROCESS`` is set and
+    ``serving_process()`` is true, so neither management commands nor the
+    requests they make through the test client start it.
+    """
+    global _background
+    if _background is not None:
+        return _background
+    with _background_lock:
+        if _background is None:
+            prefetcher = Prefetcher.from_settings()
+            threading.Thread(target=prefetcher.run_forever, name="prefetch", daemon=True).start()
+            logger.info("Started in-process prefetch of %d cities", len(prefetcher.cities))
+            _background = prefetcher
+    return _background
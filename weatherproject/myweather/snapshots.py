@@ -0,0 +1,307 @@
+"""
+Persistent forecast snapshots.
+
+Every forecast fetched from Open-Meteo is written to ``ForecastSnapshot``
+(in bulk when several were fetched together). Reads go to the store first
+while its newest snapshot is younger than the forecast cache TTL, so a
+restarted worker starts warm. When Open-Meteo cannot be reached, the
+newest snapshot of the same place whose forecast covers the requested days
+is served instead, whatever its age or the request it was fetched for.
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from . import metrics
+from .cache import CacheEntry, _split_variables, forecast_key, get_forecast_cache
+from .catalogue import get_catalogue
+from .frame import HOURLY_VARIABLES, ForecastFrame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_SETTINGS = {
+    "ENABLED": True,
+    "RETENTION_DAYS": 7,  # snapshots whose forecast ended longer ago are pruned
+    "KEEP": 1,  # snapshots kept per forecast request when compacting
+    "BATCH_SIZE": 500,  # rows per bulk insert
+}
+
+# Snapshots of a forecast are matched to a city this close to its coordinates.
+CITY_MATCH_KM = 1.0
+
+
+def _options():
+    return {**DEFAULT_SNAPSHOT_SETTINGS, **getattr(settings, "WEATHER_SNAPSHOT_STORE", {})}
+
+
+def request_key(params):
+    """Identifies the forecast request ``params`` stands for (same normalization as the cache)."""
+    return hashlib.sha1(repr(forecast_key(params)).encode("utf-8")).hexdigest()
+
+
+def _to_datetime(minute):
+    return minute.astype("datetime64[us]").item().replace(tzinfo=timezone.utc)
+
+
+def _minutes(values, origin):
+    return (values.astype("datetime64[m]") - origin).astype(np.int32)
+
+
+def pack_frame(frame):
+    """Returns the ``ForecastSnapshot`` fields describing ``frame``."""
+    origin = frame.time[0]
+    variables = [name for name in HOURLY_VARIABLES if name in frame.hourly]
+    data = b"".join([
+        _minutes(frame.time, origin).tobytes(),
+        *(np.ascontiguousarray(frame.hourly[name], dtype=np.float32).tobytes() for name in variables),
+        _minutes(frame.sunrise, origin).tobytes(),
+        _minutes(frame.sunset, origin).tobytes(),
+    ])
+    return {
+        "valid_from": _to_datetime(origin),
+        "valid_to": _to_datetime(frame.time[-1]),
+        "hours": len(frame),
+        "days": len(frame.sunrise),
+        "variables": ",".join(variables),
+        "data": data,
+        "current": frame.current,
+    }
+
+
+def unpack_frame(snapshot):
+    """Rebuilds the ``ForecastFrame`` stored in ``snapshot``; the arrays are views on its blob."""
+    hours, days = snapshot.hours, snapshot.days
+    variables = snapshot.variables.split(",") if snapshot.variables else []
+    origin = np.datetime64(snapshot.valid_from.replace(tzinfo=None), "m")
+    data = bytes(snapshot.data)
+    time_offsets = np.frombuffer(data, dtype=np.int32, count=hours)
+    position = 4 * hours
+    hourly = {}
+    for name in variables:
+        hourly[name] = np.frombuffer(data, dtype=np.float32, count=hours, offset=position)
+        position += 4 * hours
+    sunrise = np.frombuffer(data, dtype=np.int32, count=days, offset=position)
+    sunset = np.frombuffer(data, dtype=np.int32, count=days, offset=position + 4 * days)
+    return ForecastFrame(
+        time=origin + time_offsets.astype("timedelta64[m]"),
+        hourly=hourly,
+        sunrise=origin + sunrise.astype("timedelta64[m]"),
+        sunset=origin + sunset.astype("timedelta64[m]"),
+        current=snapshot.current,
+    )
+
+
+def _city_name(latitude, longitude):
+    matches = get_catalogue().nearest(latitude, longitude, 1)
+    if matches and matches[0][1] <= CITY_MATCH_KM:
+        return matches[0][0].name
+    return ""
+
+
+def build_snapshot(params, frame, fetched_at):
+    """Returns an unsaved ``ForecastSnapshot`` of ``frame``, fetched for ``params`` at ``fetched_at`` (epoch seconds)."""
+    from .models import ForecastSnapshot
+
+    latitude, longitude = float(params["latitude"]), float(params["longitude"])
+    return ForecastSnapshot(
+        request_key=request_key(params),
+        city=_city_name(latitude, longitude),
+        latitude=latitude,
+        longitude=longitude,
+        timezone=params.get("timezone", ""),
+        fetched_at=datetime.fromtimestamp(fetched_at, timezone.utc),
+        **pack_frame(frame),
+    )
+
+
+def save_snapshots(snapshots):
+    """Writes ``snapshots`` with bulk inserts; a failing database is logged, not raised."""
+    from .models import ForecastSnapshot
+
+    try:
+        with metrics.stage("store_write"):
+            ForecastSnapshot.objects.bulk_create(snapshots, batch_size=_options()["BATCH_SIZE"])
+    except DatabaseError:
+        logger.warning("Could not store %d forecast snapshots", len(snapshots), exc_info=True)
+
+
+def latest_snapshots(keys, max_age=None):
+    """Returns the newest snapshot per request key in ``keys`` (only younger than ``max_age`` seconds if given)."""
+    from .models import ForecastSnapshot
+
+    queryset = ForecastSnapshot.objects.filter(request_key__in=set(keys))
+    if max_age is not None:
+        queryset = queryset.filter(fetched_at__gte=datetime.now(timezone.utc) - timedelta(seconds=max_age))
+    latest = {}
+    try:
+        with metrics.stage("store_read"):
+            for snapshot in queryset.order_by("request_key", "-fetched_at").iterator():
+                latest.setdefault(snapshot.request_key, snapshot)
+    except DatabaseError:
+        logger.warning("Could not read forecast snapshots", exc_info=True)
+    return latest
+
+
+def _entry(snapshot):
+    return CacheEntry(value=unpack_frame(snapshot), fetched_at=snapshot.fetched_at.timestamp())
+
+
+def _read_fresh(keys):
+    """Entries for ``keys`` from snapshots younger than the forecast cache TTL (None where there is none)."""
+    fresh = latest_snapshots(keys, max_age=get_forecast_cache().ttl)
+    results = []
+    for key in keys:
+        metrics.count_lookup("snapshot", key in fresh)
+        results.append(_entry(fresh[key]) if key in fresh else None)
+    return results
+
+
+def fallback_snapshot(params):
+    """
+    Returns the newest snapshot of the place ``params`` asks for (the same
+    catalogue city, else the same coordinates) in the same timezone whose
+    forecast covers ``start_date`` through ``end_date`` with every
+    requested hourly variable, or None.
+    """
+    from .models import ForecastSnapshot
+
+    latitude, longitude = float(params["latitude"]), float(params["longitude"])
+    city = _city_name(latitude, longitude)
+    place = {"city": city} if city else {"latitude": latitude, "longitude": longitude}
+    first_hour = np.datetime64(params["start_date"], "m")
+    last_hour = np.datetime64(params["end_date"], "m") + np.timedelta64(23, "h")
+    queryset = ForecastSnapshot.objects.filter(
+        **place,
+        timezone=params.get("timezone", ""),
+        valid_from__lte=_to_datetime(first_hour),
+        valid_to__gte=_to_datetime(last_hour),
+    ).order_by("-fetched_at")
+    wanted = set(_split_variables(params.get("hourly")))
+    for snapshot in queryset.iterator():
+        if wanted <= set(snapshot.variables.split(",")):
+            return snapshot
+    return None
+
+
+def _read_fallback(params_list):
+    """Entries for ``params_list`` cut from their ``fallback_snapshot``; None unless every item has one."""
+    try:
+        with metrics.stage("store_read"):
+            snapshots = [fallback_snapshot(params) for params in params_list]
+    except DatabaseError:
+        logger.warning("Could not read forecast snapshots", exc_info=True)
+        return None
+    if any(snapshot is None for snapshot in snapshots):
+        return None
+    logger.warning("Open-Meteo unavailable, serving %d stored forecasts", len(snapshots))
+    return [
+        CacheEntry(
+            value=unpack_frame(snapshot).window(params["start_date"], params["end_date"]),
+            fetched_at=snapshot.fetched_at.timestamp(),
+        )
+        for params, snapshot in zip(params_list, snapshots)
+    ]
+
+
+def _save_fetched(params_list, frames):
+    now = time.time()
+    save_snapshots([build_snapshot(params, frame, now) for params, frame in zip(params_list, frames)])
+    return [CacheEntry(value=frame, fetched_at=now) for frame in frames]
+
+
+def fetch_through_store(params_list, fetch_frames, read_store=True):
+    """
+    Returns a ``CacheEntry`` for every item of ``params_list``, in order.
+
+    Fresh snapshots (younger than the forecast cache TTL) are used as they
+    are unless ``read_store`` is False. The rest are requested with
+    ``fetch_frames(missing_params)`` and stored. If that fails with a
+    request error, each missing item is cut from its ``fallback_snapshot``
+    instead, as long as every missing item has one.
+    """
+    if not _options()["ENABLED"]:
+        now = time.time()
+        return [CacheEntry(value=frame, fetched_at=now) for frame in fetch_frames(params_list)]
+
+    keys = [request_key(params) for params in params_list]
+    results = _read_fresh(keys) if read_store else [None] * len(keys)
+    missing = [index for index, entry in enumerate(results) if entry is None]
+    if not missing:
+        return results
+    missing_params = [params_list[index] for index in missing]
+    try:
+        frames = fetch_frames(missing_params)
+    except requests.exceptions.RequestException:
+        entries = _read_fallback(missing_params)
+        if entries is None:
+            raise
+    else:
+        entries = _save_fetched(missing_params, frames)
+    for index, entry in zip(missing, entries):
+        results[index] = entry
+    return results
+
+
+async def afetch_through_store(params_list, fetch_frames, read_store=True):
+    """
+    Async ``fetch_through_store``: ``fetch_frames`` is awaited and the
+    database is read and written from Django's thread for sync code.
+    """
+    if not _options()["ENABLED"]:
+        now = time.time()
+        return [CacheEntry(value=frame, fetched_at=now) for frame in await fetch_frames(params_list)]
+
+    keys = [request_key(params) for params in params_list]
+    results = await sync_to_async(_read_fresh)(keys) if read_store else [None] * len(keys)
+    missing = [index for index, entry in enumerate(results) if entry is None]
+    if not missing:
+        return results
+    missing_params = [params_list[index] for index in missing]
+    try:
+        frames = await fetch_frames(missing_params)
+    except requests.exceptions.RequestException:
+        entries = await sync_to_async(_read_fallback)(missing_params)
+        if entries is None:
+            raise
+    else:
+        entries = await sync_to_async(_save_fetched)(missing_params, frames)
+    for index, entry in zip(missing, entries):
+        results[index] = entry
+    return results
+
+
+def prune_snapshots(retention_days=None, keep=None, now=None):
+    """
+    Deletes expired and superseded snapshots; returns ``(expired, superseded)`` counts.
+
+    Snapshots whose forecast ended more than ``retention_days`` ago are
+    removed, as are all but the ``keep`` newest snapshots of every request.
+    """
+    from .models import ForecastSnapshot
+
+    options = _options()
+    retention_days = options["RETENTION_DAYS"] if retention_days is None else retention_days
+    keep = options["KEEP"] if keep is None else keep
+    now = now or datetime.now(timezone.utc)
+
+    with transaction.atomic():
+        expired, _ = ForecastSnapshot.objects.filter(valid_to__lt=now - timedelta(days=retention_days)).delete()
+        superseded = []
+        seen = {}
+        rows = ForecastSnapshot.objects.order_by("request_key", "-fetched_at").values_list("pk", "request_key")
+        for pk, key in rows.iterator():
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] > keep:
+                superseded.append(pk)
+        removed = 0
+        for offset in range(0, len(superseded), options["BATCH_SIZE"]):
+            count, _ = ForecastSnapshot.objects.filter(pk__in=superseded[offset:offset + options["BATCH_SIZE"]]).delete()
+            removed += count
+    return expired, removed
@@ -0,0 +1,104 @@
+"""
+Worker startup helpers.
+
+Matplotlib is imported lazily by the PNG chart backend. ``warm_up`` does the
+expensive one-off work (imports, font resolution and font cache, the first
+render of every chart type) ahead of the first request, e.g. from
+``AppConfig.ready`` in a pre-forking server's master process or from
+``manage.py warmup``.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+DEFAULT_CHART_FONTS = ("Segoe UI Emoji", "DejaVu Sans")
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _setting(name, default):
+    # Render worker processes are spawned without Django settings.
+    return getattr(settings, name, default) if settings.configured else default
+
+
+def configure_matplotlib():
+    """
+    Selects the Agg backend and the chart fonts, once per process.
+
+    Only fonts from ``WEATHER_CHART_FONTS`` that are actually installed are
+    used, so Matplotlib never searches for a missing family and logs
+    fallback warnings on every chart.
+    """
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        import matplotlib
+        from matplotlib import font_manager
+
+        matplotlib.use("Agg")
+        installed = {font.name for font in font_manager.fontManager.ttflist}
+        fonts = [name for name in _setting("WEATHER_CHART_FONTS", DEFAULT_CHART_FONTS) if name in installed]
+        matplotlib.rcParams["font.family"] = fonts or ["DejaVu Sans"]
+        _configured = True
+
+
+def _dummy_frame(hours=48):
+    from .frame import ForecastFrame
+
+    start = np.datetime64("2024-01-01T00:00", "m")
+    days = np.arange(hours // 24).astype("timedelta64[D]") + start.astype("datetime64[D]")
+    wave = np.sin(np.arange(hours, dtype=np.float32) / 24 * 2 * np.pi)
+    hourly = {
+        "temperature_2m": 10 + 5 * wave,
+        "cloudcover": 50 + 40 * wave,
+        "rain": np.clip(wave, 0, None),
+        "precipitation_probability": 50 + 50 * wave,
+        "windspeed_10m": 10 + 5 * wave,
+        "windgusts_10m": 20 + 5 * wave,
+        "pressure_msl": 1013 + wave,
+        "uv_index": np.clip(5 * wave, 0, None),
+    }
+    return ForecastFrame(
+        time=start + np.arange(hours).astype("timedelta64[h]"),
+        hourly={name: values.astype(np.float32) for name, values in hourly.items()},
+        sunrise=days.astype("datetime64[m]") + np.timedelta64(7 * 60, "m"),
+        sunset=days.astype("datetime64[m]") + np.timedelta64(18 * 60, "m"),
+    )
+
+
+def warm_up():
+    """
+    Prepares this process for its first request and returns per-step timings in ms.
+
+    Imports Matplotlib, resolves the fonts (building Matplotlib's font cache
+    if it does not exist yet), renders one throw-away chart of every type
+    with each backend and loads the city catalogue.
+    """
+    from .catalogue import get_catalogue
+    from .charts import CHART_TYPES, chart_series, render_chart
+
+    timings = {}
+    start = time.perf_counter()
+    configure_matplotlib()
+    from matplotlib import font_manager, rcParams
+    font_manager.findfont(font_manager.FontProperties(family=rcParams["font.family"]))
+    timings["matplotlib_and_fonts"] = (time.perf_counter() - start) * 1000
+
+    frame = _dummy_frame()
+    for backend in ("matplotlib", "svg"):
+        start = time.perf_counter()
+        for kind in CHART_TYPES:
+            render_chart(chart_series(kind, frame, 1), backend=backend)
+        timings[f"first_render_{backend}"] = (time.perf_counter() - start) * 1000
+
+    if settings.configured:
+        start = time.perf_counter()
+        get_catalogue()
+        timings["catalogue"] = (time.perf_counter() - start) * 1000
+    return timings
@@ -0,0 +1,290 @@
+"""
+Native SVG backend for the forecast charts.
+
+Draws the same elements as the Matplotlib charts (lines with markers, rain
+bars with a probability twin axis, stacked wind/gust bars, multi-city
+overlays, hour and day axes, night shading) straight from the series
+arrays, without Matplotlib.
+"""
+import math
+from html import escape
+
+import numpy as np
+
+WIDTH, HEIGHT = 1300, 500
+LEFT, RIGHT, TOP, BOTTOM = 80, 80, 90, 80
+PLOT_WIDTH = WIDTH - LEFT - RIGHT
+PLOT_HEIGHT = HEIGHT - TOP - BOTTOM
+
+BAR_WIDTH_DAYS = 0.05
+MINUTES_PER_DAY = 24 * 60
+
+STYLE = (
+    "<style>"
+    "text{font-family:DejaVu Sans,Segoe UI,Arial,sans-serif;font-size:12px;fill:#222}"
+    ".grid{stroke:#b0b0b0;stroke-dasharray:4 3;stroke-opacity:.7}"
+    ".night{fill:grey;fill-opacity:.2}"
+    ".frame{fill:none;stroke:#222}"
+    ".label{font-size:15px}"
+    ".title{font-size:20px;font-weight:bold}"
+    "</style>"
+)
+
+# Matplotlib's "tab10" colour cycle, used for overlay lines
+PALETTE = (
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+)
+LEGEND_COLUMNS = 6
+
+MARKERS = {
+    "o": '<circle cx="4" cy="4" r="3" fill="{color}"/>',
+    "D": '<path d="M4 0.5 7.5 4 4 7.5 0.5 4Z" fill="{color}"/>',
+    "x": '<path d="M1 1 7 7M7 1 1 7" stroke="{color}" stroke-width="1.5"/>',
+}
+
+
+def _nice_ticks(lo, hi, count=6):
+    """Returns evenly spaced round tick values covering [lo, hi]."""
+    if hi <= lo:
+        hi = lo + 1
+    raw = (hi - lo) / count
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    first = math.ceil(lo / step) * step
+    return [round(first + i * step, 10) for i in range(int((hi - first) / step + 1e-9) + 1)]
+
+
+def _auto_limits(values, margin=0.05, zero=False):
+    """Matplotlib-style autoscaling: data range plus a 5% margin."""
+    finite = values[np.isfinite(values)]
+    lo = float(finite.min()) if finite.size else 0.0
+    hi = float(finite.max()) if finite.size else 1.0
+    if zero:
+        lo = min(lo, 0.0)
+    span = (hi - lo) or 1.0
+    return (lo if zero and lo == 0 else lo - span * margin), hi + span * margin
+
+
+def _format_tick(value):
+    return f"{value:g}"
+
+
+class _Canvas:
+    """Maps data to pixels and collects SVG fragments for one chart."""
+
+    def __init__(self, series):
+        self.parts = []
+        self.height = HEIGHT
+        self.minutes = series["time"].astype("datetime64[m]").astype(np.int64)
+        sunrise = series["sunrise"].astype("datetime64[m]").astype(np.int64)
+        day_start = sunrise - sunrise % MINUTES_PER_DAY
+        # Night shading covers whole days, which also sets the x range.
+        self.x0 = float(np.min(np.r_[self.minutes, day_start]))
+        self.x1 = float(np.max(np.r_[self.minutes, day_start + MINUTES_PER_DAY]))
+        self.day_start = day_start
+        self.sunrise = sunrise
+        self.sunset = series["sunset"].astype("datetime64[m]").astype(np.int64)
+        self.xs = self.x(self.minutes)
+
+    def x(self, minutes):
+        return LEFT + (np.asarray(minutes, dtype=float) - self.x0) / (self.x1 - self.x0) * PLOT_WIDTH
+
+    @staticmethod
+    def y(values, lo, hi):
+        return TOP + PLOT_HEIGHT - (np.asarray(values, dtype=float) - lo) / (hi - lo) * PLOT_HEIGHT
+
+    def add(self, fragment):
+        self.parts.append(fragment)
+
+    def night(self):
+        spans = []
+        starts = self.x(np.r_[self.day_start, self.sunset]).tolist()
+        ends = self.x(np.r_[self.sunrise, self.day_start + MINUTES_PER_DAY]).tolist()
+        for xa, xb in zip(starts, ends):
+            spans.append(f"M{xa:.1f} {TOP}H{xb:.1f}V{TOP + PLOT_HEIGHT}H{xa:.1f}Z")
+        self.add(f'<path class="night" d="{"".join(spans)}"/>')
+
+    def hour_axis(self, hour_interval, vertical_grid=True):
+        step = hour_interval * 60
+        first = math.ceil(self.x0 / step) * step
+        ticks = np.arange(first, self.x1 + 1, step)
+        xs = self.x(ticks).tolist()
+        bottom = TOP + PLOT_HEIGHT
+        if vertical_grid:
+            self.add('<path class="grid" d="' + "".join(f"M{x:.1f} {TOP}V{bottom}" for x in xs) + '"/>')
+        label = f'<text transform="translate(%.1f {bottom + 6}) rotate(-90)" text-anchor="end">%02d:%02d</text>'
+        minutes_of_day = (ticks.astype(np.int64) % MINUTES_PER_DAY).tolist()
+        self.add("".join(label % (x + 4, m // 60, m % 60) for x, m in zip(xs, minutes_of_day)))
+        self.add(f'<text class="label" x="{LEFT + PLOT_WIDTH / 2}" y="{HEIGHT - 8}" text-anchor="middle">Hour of Day</text>')
+
+    def day_axis(self):
+        labels = []
+        for start in range(int(self.x0) - int(self.x0) % MINUTES_PER_DAY, int(self.x1) + 1, MINUTES_PER_DAY):
+            if not self.x0 <= start <= self.x1:
+                continue
+            x = float(self.x([start])[0])
+            day = np.datetime64(int(start), "m").astype("datetime64[D]").item()
+            labels.append(
+                f'<path d="M{x:.1f} {TOP}v-5" stroke="#222"/>'
+                f'<text x="{x:.1f}" y="{TOP - 9}" text-anchor="middle">{day:%d %b}</text>'
+            )
+        self.add("".join(labels))
+        self.add(f'<text class="label" x="{LEFT + PLOT_WIDTH / 2}" y="{TOP - 30}" text-anchor="middle">Day</text>')
+
+    def y_axis(self, lo, hi, label, color="#222", right=False, grid=True):
+        ticks = [t for t in _nice_ticks(lo, hi) if lo <= t <= hi]
+        ys = self.y(ticks, lo, hi).tolist()
+        if grid:
+            self.add('<path class="grid" d="' + "".join(f"M{LEFT} {y:.1f}H{LEFT + PLOT_WIDTH}" for y in ys) + '"/>')
+        x = LEFT + PLOT_WIDTH + 6 if right else LEFT - 6
+        anchor = "start" if right else "end"
+        self.add("".join(
+            f'<text x="{x}" y="{y + 4:.1f}" text-anchor="{anchor}" style="fill:{color}">{_format_tick(t)}</text>'
+            for t, y in zip(ticks, ys)
+        ))
+        lx = WIDTH - 14 if right else 18
+        self.add(
+            f'<text class="label" transform="translate({lx} {TOP + PLOT_HEIGHT / 2}) rotate({90 if right else -90})" '
+            f'text-anchor="middle" style="fill:{color}">{escape(label)}</text>'
+        )
+
+    def line(self, values, lo, hi, color, marker=None, marker_id=None, every=1):
+        ys = self.y(values, lo, hi)
+        finite = np.isfinite(ys)
+        xs, ys = self.xs[finite].tolist(), ys[finite].tolist()
+        points = " ".join(map("%.1f,%.1f".__mod__, zip(xs, ys)))
+        if marker is None:
+            self.add(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="1.5" stroke-opacity=".8"/>')
+            return
+        self.add(
+            f'<marker id="{marker_id}" viewBox="0 0 8 8" refX="4" refY="4" markerWidth="8" markerHeight="8" '
+            f'markerUnits="userSpaceOnUse">{MARKERS[marker].format(color=color)}</marker>'
+        )
+        markers = f'marker-start="url(#{marker_id})" marker-mid="url(#{marker_id})" marker-end="url(#{marker_id})"'
+        if every == 1:
+            self.add(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2" stroke-opacity=".8" {markers}/>')
+            return
+        # Markers on every ``every``-th point only: an unstroked polyline through those points carries them.
+        marked = " ".join(map("%.1f,%.1f".__mod__, zip(xs[::every], ys[::every])))
+        self.add(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2" stroke-opacity=".8"/>')
+        self.add(f'<polyline points="{marked}" fill="none" stroke="none" {markers}/>')
+
+    def bars(self, heights, lo, hi, color, opacity, bottoms=None, hours=1):
+        width = BAR_WIDTH_DAYS * hours * MINUTES_PER_DAY / (self.x1 - self.x0) * PLOT_WIDTH
+        base = np.zeros_like(heights, dtype=float) if bottoms is None else np.asarray(bottoms, dtype=float)
+        y_base = self.y(base, lo, hi)
+        y_top = self.y(base + np.nan_to_num(heights), lo, hi)
+        visible = y_top < y_base
+        bar = f"M%.1f %.1fV%.1fh{width:.1f}V%.1fZ"
+        d = "".join(
+            bar % (x, yb, yt, yb)
+            for x, yb, yt in zip((self.xs[visible] - width / 2).tolist(), y_base[visible].tolist(), y_top[visible].tolist())
+        )
+        self.add(f'<path d="{d}" fill="{color}" fill-opacity="{opacity}"/>')
+
+    def legend(self, entries):
+        items = []
+        for i, (label, color, kind) in enumerate(entries):
+            y = 14 + i * 22
+            swatch = (
+                f'<rect x="12" y="{y}" width="26" height="12" fill="{color}" fill-opacity=".7"/>' if kind == "bar"
+                else f'<path d="M12 {y + 6}h26" stroke="{color}" stroke-width="2"/>'
+            )
+            items.append(f'{swatch}<text x="46" y="{y + 11}">{escape(label)}</text>')
+        height = 12 + 22 * len(entries)
+        self.add(f'<rect x="4" y="6" width="230" height="{height}" rx="4" fill="white" stroke="#ccc"/>' + "".join(items))
+
+    def bottom_legend(self, entries):
+        """Lists line entries in columns under the chart, growing the canvas to fit."""
+        column_width = WIDTH // LEGEND_COLUMNS
+        top = HEIGHT + 4
+        items = []
+        for i, (label, color) in enumerate(entries):
+            x = 12 + (i % LEGEND_COLUMNS) * column_width
+            y = top + (i // LEGEND_COLUMNS) * 20
+            items.append(
+                f'<path d="M{x} {y + 6}h22" stroke="{color}" stroke-width="2"/>'
+                f'<text x="{x + 28}" y="{y + 10}">{escape(label)}</text>'
+            )
+        self.add("".join(items))
+        self.height = top + 20 * math.ceil(len(entries) / LEGEND_COLUMNS) + 8
+
+    def title(self, text):
+        self.add(f'<text class="title" x="{WIDTH / 2}" y="24" text-anchor="middle">{escape(text)}</text>')
+
+    def to_svg(self):
+        frame = f'<rect class="frame" x="{LEFT}" y="{TOP}" width="{PLOT_WIDTH}" height="{PLOT_HEIGHT}"/>'
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {self.height}" width="{WIDTH}" height="{self.height}">'
+            + STYLE + "".join(self.parts) + frame + "</svg>"
+        ).encode("utf-8")
+
+
+def _temperature(canvas, series):
+    temps = series["columns"]["temperature_2m"]
+    lo, hi = _auto_limits(temps)
+    canvas.y_axis(lo, hi, "Temperature (°C)")
+    canvas.line(temps, lo, hi, "crimson", "o", "m-temp", series.get("marker_every", 1))
+
+
+def _rain(canvas, series):
+    rain = series["columns"]["rain"]
+    peak = float(np.nanmax(rain)) if len(rain) else 0
+    hi = peak * 1.2 if peak > 0 else 1
+    canvas.y_axis(0, hi, "Rain (mm)", color="royalblue")
+    canvas.y_axis(0, 100, "Rain Probability (%)", color="seagreen", right=True, grid=False)
+    canvas.bars(rain, 0, hi, "royalblue", 0.6, hours=series.get("bar_hours", 1))
+    canvas.line(series["columns"]["precipitation_probability"], 0, 100, "seagreen", "x", "m-prob",
+                series.get("marker_every", 1))
+    canvas.title("Rain & Rain Probability")
+    canvas.legend([("Rain (mm)", "royalblue", "bar"), ("Rain Probability (%)", "seagreen", "line")])
+
+
+def _cloud(canvas, series):
+    canvas.y_axis(0, 100, "Cloud Cover (%)")
+    canvas.line(series["columns"]["cloudcover"], 0, 100, "dimgray", "D", "m-cloud", series.get("marker_every", 1))
+
+
+def _wind(canvas, series):
+    speed = series["columns"]["windspeed_10m"]
+    excess = series["columns"]["gust_excess"]
+    lo, hi = _auto_limits(np.nan_to_num(speed) + np.nan_to_num(excess), zero=True)
+    canvas.y_axis(lo, hi, "Wind Speed (km/h)")
+    hours = series.get("bar_hours", 1)
+    canvas.bars(speed, lo, hi, "royalblue", 0.7, hours=hours)
+    canvas.bars(excess, lo, hi, "lightcoral", 0.7, bottoms=np.nan_to_num(speed), hours=hours)
+    canvas.title("Wind Speed and Gusts")
+    canvas.legend([("Wind Speed (km/h)", "royalblue", "bar"), ("Wind Gust (km/h)", "lightcoral", "bar")])
+
+
+def _overlay(canvas, series):
+    columns = series["columns"]
+    values = np.concatenate([np.asarray(column, dtype=float) for column in columns.values()]) if columns else np.array([])
+    lo, hi = _auto_limits(values)
+    canvas.y_axis(lo, hi, series["label"])
+    entries = []
+    for i, (name, column) in enumerate(columns.items()):
+        color = PALETTE[i % len(PALETTE)]
+        canvas.line(column, lo, hi, color)
+        entries.append((name, color))
+    canvas.bottom_legend(entries)
+
+
+_DRAWERS = {
+    "temperature": _temperature,
+    "rain": _rain,
+    "cloud": _cloud,
+    "wind": _wind,
+    "overlay": _overlay,
+}
+
+
+def render_svg(series):
+    """Draws the chart described by ``series`` and returns it as SVG bytes."""
+    canvas = _Canvas(series)
+    canvas.night()
+    canvas.hour_axis(series["hour_interval"], vertical_grid=series["kind"] != "wind")
+    canvas.day_axis()
+    _DRAWERS[series["kind"]](canvas, series)
+    return canvas.to_svg()
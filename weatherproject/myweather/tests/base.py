@@ -0,0 +1,64 @@
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from .. import cache, charts
+from ..client import ForecastClient, forecast_params, set_forecast_client
+from ..fake_upstream import FakeOpenMeteo
+from ..frame import ForecastFrame
+
+# Process-local stores and no snapshots, so every test starts from empty caches
+TEST_SETTINGS = {
+    "WEATHER_FORECAST_CACHE": {"BACKEND": "memory", "TTL": 600, "STALE_TTL": 3600},
+    "WEATHER_PAGE_CACHE": {"BACKEND": "memory"},
+    "WEATHER_CHART_STORE": {"BACKEND": "memory", "MAX_BYTES": 16 * 1024 * 1024},
+    "WEATHER_CHART_BACKEND": "svg",
+    "WEATHER_CHART_RENDERING": "serial",
+    "WEATHER_SNAPSHOT_STORE": {"ENABLED": False},
+    "WEATHER_PREFETCH": {"IN_PROCESS": False},
+}
+
+
+def reset_singletons():
+    cache._forecast_cache = None
+    cache._page_cache = None
+    charts._chart_store = None
+    charts._render_queue = None
+
+
+def make_frame(start="2024-06-01T00:00", hours=24, **columns):
+    """A ``ForecastFrame`` of ``hours`` hourly rows; unnamed variables are zero."""
+    time = np.datetime64(start, "m") + np.arange(hours).astype("timedelta64[h]")
+    days = np.unique(time.astype("datetime64[D]"))
+    hourly = {name: np.zeros(hours, dtype=np.float32) for name in ("temperature_2m", "rain")}
+    hourly.update({name: np.asarray(values, dtype=np.float32) for name, values in columns.items()})
+    return ForecastFrame(
+        time=time,
+        hourly=hourly,
+        sunrise=days + np.timedelta64(6 * 60, "m"),
+        sunset=days + np.timedelta64(18 * 60, "m"),
+    )
+
+
+class UpstreamTestCase(SimpleTestCase):
+    """Runs a ``FakeOpenMeteo`` for the whole class and resets the process-wide caches around every test."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.upstream = FakeOpenMeteo().start()
+        cls.addClassCleanup(cls.upstream.stop)
+
+    def setUp(self):
+        settings_override = override_settings(**TEST_SETTINGS)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_singletons()
+        self.addCleanup(reset_singletons)
+        self.client_under_test = ForecastClient(self.upstream.url, retries=2, backoff_base=0, backoff_max=0)
+        previous = set_forecast_client(self.client_under_test)
+        self.addCleanup(set_forecast_client, previous)
+        self.addCleanup(self.client_under_test.close)
+
+    def params(self, city="London", days=2):
+        coordinates = {"London": (51.5074, -0.1278), "Paris": (48.8566, 2.3522)}[city]
+        return forecast_params(*coordinates, days)
@@ -0,0 +1,63 @@
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from ..alerts import DEFAULT_RULES, SEVERE, AlertRule, Condition, evaluate, evaluate_many, rules_from_settings, summarize
+from ..client import forecast_params
+from ..fake_upstream import build_forecast_payload
+from ..frame import HOURLY_VARIABLES, ForecastFrame
+from .base import make_frame
+
+
+class AlertTests(SimpleTestCase):
+    def test_consecutive_hours_merge_into_one_window(self):
+        rain = np.zeros(24)
+        rain[[3, 4, 5, 10]] = 1
+        frame = make_frame(rain=rain)
+        rule = AlertRule("rain", "Rain", (Condition("rain", ">", 0.5),))
+        alerts = evaluate(frame, (rule,))
+        self.assertEqual([(a.start.hour, a.end.hour, a.hours) for a in alerts], [(3, 6, 3), (10, 11, 1)])
+        self.assertEqual(summarize(alerts), [{"message": "Rain", "severity": "warning",
+                                              "windows": ["01.06 03:00–06:00", "01.06 10:00–11:00"]}])
+
+    def test_all_conditions_must_hold(self):
+        frame = make_frame(rain=[1] * 24, precipitation_probability=[0] * 12 + [90] * 12)
+        rule = AlertRule("rain", "Rain", (Condition("rain", ">", 0.5), Condition("precipitation_probability", ">", 50)))
+        [alert] = evaluate(frame, (rule,))
+        self.assertEqual((alert.start.hour, alert.hours), (12, 12))
+
+    def test_per_hours_compares_the_change(self):
+        pressure = np.full(24, 1015.0)
+        pressure[8:] = 1010.0
+        frame = make_frame(pressure_msl=pressure)
+        rule = AlertRule("drop", "Falling", (Condition("pressure_msl", "<", -3, per_hours=3),))
+        [alert] = evaluate(frame, (rule,))
+        self.assertEqual((alert.start.hour, alert.hours), (8, 3))
+
+    def test_alerts_are_ordered_by_severity(self):
+        frame = make_frame(temperature_2m=[35] * 24, rain=[1] * 24)
+        rules = (
+            AlertRule("heat", "Heat", (Condition("temperature_2m", ">", 30),)),
+            AlertRule("rain", "Rain", (Condition("rain", ">", 0.5),), severity=SEVERE),
+        )
+        self.assertEqual([a.rule for a in evaluate(frame, rules)], ["rain", "heat"])
+
+    def test_batch_evaluation_matches_one_frame_at_a_time(self):
+        frames = {
+            name: ForecastFrame.from_response(build_forecast_payload(forecast_params(lat, lon, days)))
+            for name, lat, lon, days in [("a", 51.5, -0.1, 3), ("b", 30.0, 31.2, 3), ("c", -34.6, -58.4, 7)]
+        }
+        frames["d"] = make_frame(**{name: [0] * 24 for name in HOURLY_VARIABLES})
+        batched = evaluate_many(frames)
+        self.assertEqual(set(batched), set(frames))
+        for name, frame in frames.items():
+            self.assertEqual(batched[name], evaluate(frame), name)
+        self.assertTrue(any(batched.values()))
+        self.assertEqual(batched["d"], [])
+
+    def test_rules_from_settings(self):
+        self.assertIs(rules_from_settings(), DEFAULT_RULES)
+        configured = [{"name": "drop", "message": "Falling", "conditions": [("pressure_msl", "<", -3, 3)],
+                       "severity": SEVERE}]
+        with override_settings(WEATHER_ALERT_RULES=configured):
+            [rule] = rules_from_settings()
+        self.assertEqual(rule, AlertRule("drop", "Falling", (Condition("pressure_msl", "<", -3, 3),), SEVERE))
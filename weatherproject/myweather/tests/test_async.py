@@ -0,0 +1,119 @@
+import asyncio
+import contextvars
+import threading
+
+import requests
+from django.test import RequestFactory, SimpleTestCase
+
+from .. import charts
+from ..cache import ForecastCache, MemoryBackend, forecast_key, get_page_cache
+from ..charts import RenderQueue, RenderQueueFull
+from ..client import forecast_params
+from ..views import forecast_view_async
+from .base import UpstreamTestCase
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class SingleFlightTests(SimpleTestCase):
+    params = forecast_params(51.5074, -0.1278, 2)
+
+    async def test_concurrent_misses_share_one_fetch(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=60, stale_ttl=60)
+        calls = []
+
+        async def fetch(params):
+            calls.append(params)
+            await asyncio.sleep(0.05)
+            return "forecast"
+
+        entries = await asyncio.gather(*(forecast_cache.aget_entry(self.params, fetch) for _ in range(5)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({entry.value for entry in entries}, {"forecast"})
+
+    async def test_a_failed_fetch_fails_every_waiter_and_is_retried(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=60, stale_ttl=60)
+        calls = []
+
+        async def fetch(params):
+            calls.append(params)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise requests.exceptions.ConnectionError("down")
+            return "forecast"
+
+        results = await asyncio.gather(
+            *(forecast_cache.aget_entry(self.params, fetch) for _ in range(3)), return_exceptions=True)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(result, requests.exceptions.ConnectionError) for result in results))
+        self.assertEqual((await forecast_cache.aget_entry(self.params, fetch)).value, "forecast")
+        self.assertEqual(len(calls), 2)
+
+    async def test_a_cancelled_waiter_does_not_cancel_the_fetch(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=60, stale_ttl=60)
+
+        async def fetch(params):
+            await asyncio.sleep(0.05)
+            return "forecast"
+
+        first = asyncio.ensure_future(forecast_cache.aget_entry(self.params, fetch))
+        second = asyncio.ensure_future(forecast_cache.aget_entry(self.params, fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        self.assertEqual((await second).value, "forecast")
+
+    async def test_stale_entries_are_refreshed_on_the_loop(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=0, stale_ttl=60)
+        values = iter(["old", "new"])
+
+        async def fetch(params):
+            return next(values)
+
+        await forecast_cache.aget_entry(self.params, fetch)
+        await asyncio.sleep(0.01)
+        self.assertEqual((await forecast_cache.aget_entry(self.params, fetch)).value, "old")
+        await asyncio.gather(*forecast_cache._tasks)
+        self.assertEqual(forecast_cache.backend.get(forecast_key(self.params)).value, "new")
+        self.assertEqual(forecast_cache.stats()["refreshes"], 1)
+
+
+class RenderQueueTests(UpstreamTestCase):
+    async def test_full_queue_refuses_work(self):
+        queue = RenderQueue(workers=1, max_pending=1)
+        self.addCleanup(queue.shutdown)
+        release = threading.Event()
+        running = asyncio.ensure_future(queue.run(release.wait, 2))
+        await asyncio.sleep(0.01)
+        with self.assertRaises(RenderQueueFull):
+            await queue.run(str, 1)
+        release.set()
+        self.assertTrue(await running)
+        self.assertEqual(await queue.run(str, 1), "1")
+
+    async def test_async_view_answers_503_while_the_queue_is_full(self):
+        charts._render_queue = RenderQueue(max_pending=0, retry_after=7)
+        request = RequestFactory().get("/forecast/London/2/")
+        response = await forecast_view_async(request, city="London", days=2)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "7")
+
+    async def test_jobs_see_the_callers_context_and_free_their_slot_on_errors(self):
+        queue = RenderQueue(workers=1, max_pending=1)
+        self.addCleanup(queue.shutdown)
+        request_id.set("abc")
+        self.assertEqual(await queue.run(request_id.get), "abc")
+        with self.assertRaises(ZeroDivisionError):
+            await queue.run(divmod, 1, 0)
+        self.assertEqual(queue.pending, 0)
+        self.assertEqual(await queue.run(str, 2), "2")
+
+    async def test_async_view_serves_the_page_of_the_sync_view(self):
+        sync_page = b"".join(self.client.get("/forecast/London/2/").streaming_content)
+        get_page_cache().clear()
+        response = await forecast_view_async(RequestFactory().get("/forecast/London/2/"), city="London", days=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertEqual(b"".join([chunk async for chunk in response.streaming_content]), sync_page)
+
+        revalidation = RequestFactory().get("/forecast/London/2/", HTTP_IF_NONE_MATCH=response.headers["ETag"])
+        self.assertEqual((await forecast_view_async(revalidation, city="London", days=2)).status_code, 304)
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from .. import cache
+from ..cache import CacheEntry, DjangoCacheBackend, ForecastCache, MemoryBackend, forecast_key
+from ..client import forecast_params
+
+
+class ForecastCacheTests(SimpleTestCase):
+    params = forecast_params(51.5074, -0.1278, 2)
+
+    def test_fresh_entries_are_hits(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=60, stale_ttl=60)
+        calls = []
+        fetch = lambda params: calls.append(params) or "forecast"  # noqa: E731
+        self.assertEqual(forecast_cache.lookup(self.params, fetch)[1], "miss")
+        entry, outcome = forecast_cache.lookup(self.params, fetch)
+        self.assertEqual((entry.value, outcome), ("forecast", "hit"))
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_entry_is_served_while_refreshed(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=0, stale_ttl=60)
+        refreshed = threading.Event()
+        values = iter(["old", "new"])
+
+        def fetch(params):
+            value = next(values)
+            if value == "new":
+                refreshed.set()
+            return value
+
+        forecast_cache.get_entry(self.params, fetch)
+        time.sleep(0.01)
+        entry, outcome = forecast_cache.lookup(self.params, fetch)
+        self.assertEqual((entry.value, outcome), ("old", "stale"))
+        self.assertTrue(refreshed.wait(2))
+        for _ in range(100):
+            if forecast_cache.stats()["refreshes"]:
+                break
+            time.sleep(0.01)
+        self.assertEqual(forecast_cache.backend.get(cache.forecast_key(self.params)).value, "new")
+
+    def test_expired_entry_is_fetched_again(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=0, stale_ttl=0)
+        forecast_cache.get_entry(self.params, lambda params: "old")
+        time.sleep(0.01)
+        entry, outcome = forecast_cache.lookup(self.params, lambda params: "new")
+        self.assertEqual((entry.value, outcome), ("new", "miss"))
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2, timeout=60)
+        now = time.time()
+        backend.set("a", CacheEntry("a", now))
+        backend.set("b", CacheEntry("b", now))
+        backend.get("a")
+        backend.set("c", CacheEntry("c", now))
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual([backend.get(key).value for key in ("a", "c")], ["a", "c"])
+
+    def test_memory_backend_respects_byte_budget(self):
+        backend = MemoryBackend(max_entries=10, timeout=60, max_bytes=10, sizeof=lambda entry: len(entry.value))
+        now = time.time()
+        backend.set("a", CacheEntry("x" * 6, now))
+        backend.set("b", CacheEntry("y" * 6, now))
+        self.assertEqual(len(backend), 1)
+        self.assertEqual(backend.size, 6)
+
+    def test_batched_lookups_fetch_all_misses_at_once(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=60, stale_ttl=60)
+        paris = forecast_params(48.8566, 2.3522, 2)
+        forecast_cache.get_entry(self.params, lambda params: "london")
+        batches = []
+
+        def fetch_many(params_list):
+            batches.append(params_list)
+            return [f"fetched {params['latitude']}" for params in params_list]
+
+        entries = forecast_cache.get_entries([self.params, paris, paris], fetch_many)
+        self.assertEqual([entry.value for entry in entries], ["london", "fetched 48.8566", "fetched 48.8566"])
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(forecast_cache.stats()["hits"], 1)
+
+    def test_stats_count_stale_entries_as_hits(self):
+        forecast_cache = ForecastCache(MemoryBackend(8, 60), ttl=0, stale_ttl=60)
+        forecast_cache.get_entry(self.params, lambda params: "forecast")
+        time.sleep(0.01)
+        forecast_cache.get_entry(self.params, lambda params: "forecast")
+        stats = forecast_cache.stats()
+        self.assertEqual((stats["misses"], stats["stale"], stats["hit_ratio"]), (1, 1, 0.5))
+
+    def test_key_ignores_variable_order(self):
+        reordered = {**self.params, "hourly": ",".join(reversed(self.params["hourly"].split(",")))}
+        self.assertEqual(forecast_key(reordered), forecast_key(self.params))
+
+
+class DjangoCacheBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(caches["default"].clear)
+
+    def test_round_trip(self):
+        backend = DjangoCacheBackend("default", 60, "myweather:test")
+        entry = CacheEntry("forecast", time.time())
+        backend.set(("London", 2), entry)
+        self.assertEqual(backend.get(("London", 2)), entry)
+        self.assertIsNone(backend.get(("Paris", 2)))
+
+    def test_clear_leaves_the_shared_cache_alone(self):
+        caches["default"].set("session:abc", "keep me")
+        backend = DjangoCacheBackend("default", 60, "myweather:test")
+        with self.assertRaises(NotImplementedError):
+            backend.clear()
+        self.assertEqual(caches["default"].get("session:abc"), "keep me")
@@ -0,0 +1,111 @@
+import json
+import math
+import os
+import random
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from ..catalogue import EARTH_RADIUS_KM, City, CityCatalogue, get_catalogue, load_cities
+
+
+def haversine(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+class CityCatalogueTests(SimpleTestCase):
+    catalogue = CityCatalogue([
+        City("Zürich", 47.3769, 8.5417),
+        City("Zurich Heights", 40.0, -75.0),
+        City("Bern", 46.948, 7.4474),
+        City("Berlin", 52.52, 13.405),
+        City("Hamburg", 53.5511, 9.9937),
+        City("Homburg", 49.3268, 7.3385),
+        City("", 0.0, 0.0),
+    ])
+
+    def test_get_ignores_case_and_accents(self):
+        self.assertEqual(self.catalogue.get(" zurich ").name, "Zürich")
+        self.assertIsNone(self.catalogue.get("Atlantis"))
+
+    def test_nameless_places_are_left_out(self):
+        self.assertEqual(len(self.catalogue), 6)
+
+    def test_prefix_search(self):
+        self.assertEqual([c.name for c in self.catalogue.prefix_search("ber")], ["Berlin", "Bern"])
+        self.assertEqual([c.name for c in self.catalogue.prefix_search("zur", limit=1)], ["Zürich"])
+
+    def test_substring_search_follows_prefix_matches(self):
+        self.assertEqual([c.name for c in self.catalogue.search("burg")], ["Hamburg", "Homburg"])
+        self.assertEqual([c.name for c in self.catalogue.search("er")], ["Berlin", "Bern"])
+        self.assertEqual(self.catalogue.search("xyz"), [])
+
+    def test_nearest(self):
+        [(city, distance)] = self.catalogue.nearest(47.37, 8.54)
+        self.assertEqual(city.name, "Zürich")
+        self.assertLess(distance, 1)
+        self.assertEqual([c.name for c, _ in self.catalogue.nearest(52.0, 13.0, k=2)], ["Berlin", "Hamburg"])
+
+    def test_duplicate_names_resolve_to_the_most_populous_place(self):
+        catalogue = CityCatalogue([
+            City("Paris", 33.66, -95.55, "US", 25000),
+            City("Paris", 48.85, 2.35, "FR", 2100000),
+        ])
+        self.assertEqual(catalogue.get("paris").country, "FR")
+        self.assertEqual(len(catalogue.search("paris")), 2)
+
+    def test_short_queries_match_substrings_too(self):
+        self.assertEqual([c.name for c in self.catalogue.search("ur")],
+                         ["Hamburg", "Homburg", "Zürich", "Zurich Heights"])
+
+    def test_nearest_matches_a_brute_force_search(self):
+        rng = random.Random(7)
+        catalogue = CityCatalogue([
+            City(f"City {i}", rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(500)
+        ])
+        for _ in range(20):
+            point = (rng.uniform(-90, 90), rng.uniform(-180, 180))
+            expected = sorted(catalogue, key=lambda city: haversine(point, (city.latitude, city.longitude)))[:3]
+            found = catalogue.nearest(*point, k=3)
+            self.assertEqual([city for city, _ in found], expected)
+            for city, distance in found:
+                self.assertAlmostEqual(distance, haversine(point, (city.latitude, city.longitude)), places=3)
+
+    def test_nearest_wraps_around_the_antimeridian(self):
+        catalogue = CityCatalogue([City("Suva", -18.14, 178.44), City("Apia", -13.83, -171.76)])
+        self.assertEqual(catalogue.nearest(-14.0, -179.9)[0][0].name, "Suva")
+        self.assertEqual(catalogue.nearest(-14.0, 179.0, k=2)[1][0].name, "Apia")
+
+
+class CityDataTests(SimpleTestCase):
+    def write(self, name, text):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_loads_json_csv_and_geonames_files(self):
+        expected = City("Zürich", 47.3769, 8.5417, "CH", 421878)
+        json_path = self.write("cities.json", json.dumps([
+            {"name": "Zürich", "latitude": 47.3769, "longitude": 8.5417, "country": "CH", "population": 421878},
+        ]))
+        csv_path = self.write("cities.csv", (
+            "name,latitude,longitude,country,population\n"
+            "Zürich,47.3769,8.5417,CH,421878\n"
+        ))
+        fields = ["2657896", "Zürich", "Zurich", "", "47.3769", "8.5417", "P", "PPLA", "CH", "", "25", "", "", "",
+                  "421878"]
+        txt_path = self.write("cities500.txt", "\t".join(fields) + "\n")
+        for path in (json_path, csv_path, txt_path):
+            self.assertEqual(load_cities(path), [expected], path)
+
+    def test_catalogue_is_reloaded_when_the_data_file_changes(self):
+        path = self.write("cities.csv", "name,latitude,longitude\nTimbuktu,16.7666,-3.0026\n")
+        self.assertIsNone(get_catalogue().get("Timbuktu"))
+        with override_settings(WEATHER_CITY_DATA=path):
+            self.assertEqual([city.name for city in get_catalogue()], ["Timbuktu"])
+        self.assertIsNotNone(get_catalogue().get("London"))
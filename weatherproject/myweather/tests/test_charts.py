@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from .. import charts
+from ..charts import ChartStore, chart_key, chart_series, get_chart_store
+from .base import TEST_SETTINGS, make_frame, reset_singletons
+
+
+class ChartStoreTests(SimpleTestCase):
+    def file_store(self, max_bytes, min_age=0):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return ChartStore(max_bytes=max_bytes, directory=directory.name, min_age=min_age)
+
+    def age(self, store, key, seconds):
+        path = store.directory / key
+        os.utime(path, (time.time() - seconds, time.time() - seconds))
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        store = ChartStore(max_bytes=10)
+        store.put("a.svg", b"aaaa")
+        store.put("b.svg", b"bbbb")
+        store.get("a.svg")
+        store.put("c.svg", b"cccc")
+        self.assertNotIn("b.svg", store)
+        self.assertEqual((store.get("a.svg"), store.get("c.svg")), (b"aaaa", b"cccc"))
+
+    def test_file_backend_is_shared_between_stores(self):
+        writer = self.file_store(100)
+        reader = ChartStore(max_bytes=100, directory=writer.directory)
+        writer.put("a.svg", b"image")
+        self.assertIn("a.svg", reader)
+        self.assertEqual(reader.get("a.svg"), b"image")
+        self.assertEqual(list(writer.directory.iterdir()), [writer.directory / "a.svg"])
+
+    def test_file_backend_size_is_a_hard_cap(self):
+        store = self.file_store(max_bytes=10, min_age=3600)
+        with self.assertLogs("myweather.charts", "WARNING"):
+            for name in "abcd":
+                store.put(f"{name}.svg", b"1234")
+                self.age(store, f"{name}.svg", 10 - ord(name) + ord("a"))
+        self.assertEqual(sorted(path.name for path in store.directory.iterdir()), ["c.svg", "d.svg"])
+        self.assertEqual(store.size, 8)
+
+    def test_file_backend_counts_images_written_by_other_workers(self):
+        store = self.file_store(max_bytes=10)
+        other_worker = ChartStore(max_bytes=10, directory=store.directory)
+        other_worker.put("a.svg", b"12345678")
+        self.age(store, "a.svg", 60)
+        store.put("b.svg", b"1234")
+        self.assertNotIn("a.svg", store)
+        self.assertEqual(store.size, 4)
+
+    def test_file_backend_keeps_the_image_just_written(self):
+        store = self.file_store(max_bytes=2)
+        store.put("a.svg", b"1234")
+        self.assertEqual(store.get("a.svg"), b"1234")
+
+    def test_django_backend_cannot_clear_the_shared_cache(self):
+        self.addCleanup(caches["default"].clear)
+        caches["default"].set("session:abc", "keep me")
+        store = ChartStore(cache_alias="default", timeout=60)
+        store.put("a.svg", b"image")
+        self.assertEqual(store.get("a.svg"), b"image")
+        with self.assertRaises(NotImplementedError):
+            store.clear()
+        self.assertEqual(caches["default"].get("session:abc"), "keep me")
+
+    def test_chart_key_changes_with_the_data(self):
+        frame = make_frame(temperature_2m=range(24))
+        series = chart_series("temperature", frame, 3)
+        self.assertRegex(chart_key(series, "svg"), r"^[0-9a-f]{32}\.svg$")
+        self.assertEqual(chart_key(series, "svg"), chart_key(chart_series("temperature", frame, 3), "svg"))
+        other = chart_series("temperature", make_frame(temperature_2m=range(1, 25)), 3)
+        self.assertNotEqual(chart_key(other, "svg"), chart_key(series, "svg"))
+
+
+class ChartViewTests(SimpleTestCase):
+    def setUp(self):
+        settings_override = override_settings(**TEST_SETTINGS)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_singletons()
+        self.addCleanup(reset_singletons)
+        self.key = "0123456789abcdef0123456789abcdef.svg"
+        get_chart_store().put(self.key, b"<svg/>")
+
+    def test_serves_immutable_images(self):
+        response = self.client.get(f"/charts/{self.key}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"<svg/>")
+        self.assertEqual(response.headers["Content-Type"], "image/svg+xml")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertEqual(response.headers["ETag"], f'"{self.key}"')
+
+    def test_revalidation_answers_304(self):
+        response = self.client.get(f"/charts/{self.key}", HTTP_IF_NONE_MATCH=f'"{self.key}"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_charts_are_404(self):
+        charts._chart_store = ChartStore(max_bytes=10)
+        self.assertEqual(self.client.get(f"/charts/{self.key}").status_code, 404)
+        self.assertEqual(self.client.get("/charts/not-a-hash.svg").status_code, 404)
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from unittest import mock, skipIf
+
+import requests
+from django.test import SimpleTestCase
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from ..client import AsyncForecastClient, CircuitBreaker, CircuitOpenError, ForecastClient
+from .base import UpstreamTestCase
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_closes_after_successful_trial(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow(), "only one trial call at a time")
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class ForecastClientTests(UpstreamTestCase):
+    def test_retries_transient_failures(self):
+        requests_before = self.upstream.requests
+        self.upstream.fail_next(2)
+        data = self.client_under_test.fetch(self.params())
+        self.assertIn("hourly", data)
+        self.assertEqual(self.upstream.requests - requests_before, 3)
+
+    def test_gives_up_after_retries(self):
+        self.upstream.fail_next(3)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client_under_test.fetch(self.params())
+
+    def test_open_circuit_fails_fast(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        forecast_client = ForecastClient(self.upstream.url, retries=0, breaker=breaker)
+        self.addCleanup(forecast_client.close)
+        self.upstream.fail_next(2)
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                forecast_client.fetch(self.params())
+
+        requests_before = self.upstream.requests
+        with self.assertRaises(CircuitOpenError):
+            forecast_client.fetch(self.params())
+        self.assertEqual(self.upstream.requests, requests_before)
+
+    def test_reuses_connections(self):
+        connections_before = self.upstream.connections
+        for _ in range(5):
+            self.client_under_test.fetch(self.params())
+        self.assertEqual(self.upstream.connections - connections_before, 1)
+
+    def test_fetch_many_batches_locations(self):
+        requests_before = self.upstream.requests
+        forecasts = self.client_under_test.fetch_many([self.params("London"), self.params("Paris")])
+        self.assertEqual(self.upstream.requests - requests_before, 1)
+        self.assertEqual([f["latitude"] for f in forecasts], [51.5074, 48.8566])
+
+    def test_unretried_request_errors_end_a_half_open_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        forecast_client = ForecastClient(self.upstream.url, retries=0, breaker=breaker)
+        self.addCleanup(forecast_client.close)
+        with mock.patch.object(forecast_client.session, "get", side_effect=requests.exceptions.ChunkedEncodingError):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                forecast_client.fetch(self.params())
+        self.assertEqual(breaker.failures, 2)
+        self.assertIn("hourly", forecast_client.fetch(self.params()))
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_unexpected_errors_release_a_half_open_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        forecast_client = ForecastClient(self.upstream.url, retries=0, breaker=breaker)
+        self.addCleanup(forecast_client.close)
+        with mock.patch.object(forecast_client.session, "get", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                forecast_client.fetch(self.params())
+        self.assertTrue(breaker.allow())
+
+
+@skipIf(httpx is None, "httpx is not installed")
+class AsyncForecastClientTests(UpstreamTestCase):
+    def build_async_client(self, handler, breaker):
+        forecast_client = ForecastClient(self.upstream.url, retries=0, breaker=breaker)
+        self.addCleanup(forecast_client.close)
+        async_client = AsyncForecastClient(forecast_client)
+        async_client._clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return async_client
+
+    async def test_other_httpx_errors_are_request_errors_and_end_the_trial(self):
+        def handler(request):
+            raise httpx.DecodingError("broken gzip stream", request=request)
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        async_client = self.build_async_client(handler, breaker)
+        with self.assertRaises(requests.exceptions.RequestException):
+            await async_client.fetch(self.params())
+        self.assertTrue(breaker.allow())
+
+    async def test_transport_errors_are_retried_as_connection_errors(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200, json={"hourly": {}})
+
+        async_client = self.build_async_client(handler, CircuitBreaker(failure_threshold=5, reset_timeout=30))
+        async_client.sync_client.retries = 1
+        async_client.sync_client.backoff_base = 0
+        self.assertEqual(await async_client.fetch(self.params()), {"hourly": {}})
+        self.assertEqual(len(calls), 2)
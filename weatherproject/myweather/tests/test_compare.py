@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..catalogue import get_catalogue
+from ..client import ForecastClient, forecast_params
+from ..compare import align, compare
+from .base import UpstreamTestCase, make_frame
+
+
+class FetchManyTests(UpstreamTestCase):
+    def forecast_client(self, bulk_size):
+        client = ForecastClient(self.upstream.url, retries=0, bulk_size=bulk_size)
+        self.addCleanup(client.close)
+        return client
+
+    def test_locations_are_requested_in_chunks_and_returned_in_order(self):
+        params_list = [forecast_params(10.0 + i, 20.0 + i, 2) for i in range(5)]
+        requests_before = self.upstream.requests
+        forecasts = self.forecast_client(bulk_size=2).fetch_many(params_list)
+        self.assertEqual(self.upstream.requests - requests_before, 3)
+        self.assertEqual([round(f["latitude"]) for f in forecasts], [10, 11, 12, 13, 14])
+
+    def test_locations_with_different_parameters_are_requested_apart(self):
+        params_list = [forecast_params(10.0, 20.0, 2), forecast_params(11.0, 21.0, 3), forecast_params(12.0, 22.0, 2)]
+        requests_before = self.upstream.requests
+        forecasts = self.forecast_client(bulk_size=25).fetch_many(params_list)
+        self.assertEqual(self.upstream.requests - requests_before, 2)
+        self.assertEqual([len(f["daily"]["sunrise"]) for f in forecasts],
+                         [len(self.forecast_client(1).fetch(params)["daily"]["sunrise"]) for params in params_list])
+
+    def test_a_short_answer_is_an_error(self):
+        client = self.forecast_client(bulk_size=25)
+        client.fetch = lambda params: [{}]
+        with self.assertRaises(ValueError):
+            client.fetch_many([forecast_params(10.0, 20.0, 2), forecast_params(11.0, 21.0, 2)])
+
+
+class CompareTests(UpstreamTestCase):
+    def cities(self, *names):
+        return [get_catalogue().get(name) for name in names]
+
+    def test_missing_forecasts_share_one_upstream_call(self):
+        requests_before = self.upstream.requests
+        comparison = compare(self.cities("London", "Paris", "Cairo"), 2)
+        self.assertEqual(self.upstream.requests - requests_before, 1)
+        self.assertEqual([city["name"] for city in comparison["cities"]], ["London", "Paris", "Cairo"])
+        for city in comparison["cities"]:
+            self.assertEqual(len(city["series"]["temperature_2m"]), len(comparison["time"]))
+        self.assertIsNotNone(comparison["chart"])
+
+        compare(self.cities("London", "Paris"), 2)
+        self.assertEqual(self.upstream.requests - requests_before, 1)
+
+    def test_api_answers_json(self):
+        response = self.client.get("/api/compare/", {"cities": "London,Paris", "days": 2, "variables": "rain"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual([city["name"] for city in data["cities"]], ["London", "Paris"])
+        self.assertEqual(set(data["cities"][0]["series"]), {"rain"})
+        self.assertTrue(data["chart"].startswith("/charts/"))
+        self.assertEqual(self.client.get("/api/compare/", {"cities": "Atlantis"}).status_code, 400)
+
+
+class AlignTests(SimpleTestCase):
+    def test_frames_on_one_axis_are_used_as_they_are(self):
+        frames = {"a": make_frame(rain=np.ones(24)), "b": make_frame()}
+        time, aligned = align(frames, ("rain",))
+        self.assertIs(time, frames["a"].time)
+        self.assertIs(aligned["a"]["rain"], frames["a"]["rain"])
+
+    def test_offset_frames_are_padded_with_nan(self):
+        frames = {
+            "a": make_frame(start="2024-06-01T00:00", hours=3, rain=[1, 2, 3]),
+            "b": make_frame(start="2024-06-01T02:00", hours=2, rain=[4, 5]),
+        }
+        time, aligned = align(frames, ("rain",))
+        self.assertEqual(len(time), 4)
+        np.testing.assert_array_equal(aligned["a"]["rain"], [1, 2, 3, np.nan])
+        np.testing.assert_array_equal(aligned["b"]["rain"], [np.nan, np.nan, 4, 5])
@@ -0,0 +1,82 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..charts import chart_series, hour_interval_for, overlay_series
+from ..downsample import MAX_LINE_POINTS, MARKER_SPACING_PX, aggregate, lttb_indices, marker_every
+from ..svg_charts import PLOT_WIDTH
+from .base import make_frame
+
+
+class LttbTests(SimpleTestCase):
+    def test_keeps_the_ends_and_the_extremes(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50)
+        y[437] = 5
+        y[802] = -5
+        indices = lttb_indices(x, y, 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertIn(437, indices)
+        self.assertIn(802, indices)
+
+    def test_short_or_incomplete_series_are_kept_whole(self):
+        np.testing.assert_array_equal(lttb_indices(np.arange(10), np.arange(10), 20), np.arange(10))
+        y = np.arange(100, dtype=float)
+        y[5] = np.nan
+        np.testing.assert_array_equal(lttb_indices(np.arange(100), y, 20), np.arange(100))
+
+
+class AggregateTests(SimpleTestCase):
+    def test_rain_is_summed_and_other_columns_take_the_maximum(self):
+        time = np.datetime64("2024-06-01T00:00", "m") + np.arange(5).astype("timedelta64[h]")
+        bucket_time, columns = aggregate(time, {
+            "rain": np.array([1, 2, np.nan, 4, 5], dtype=np.float32),
+            "precipitation_probability": np.array([10, 30, 20, 5, 0], dtype=np.float32),
+        }, 2)
+        expected = np.array(["2024-06-01T00:30", "2024-06-01T02:30", "2024-06-01T04:00"], dtype="datetime64[m]")
+        np.testing.assert_array_equal(bucket_time, expected)
+        np.testing.assert_array_equal(columns["rain"], [3, 4, 5])
+        np.testing.assert_array_equal(columns["precipitation_probability"], [30, 20, 0])
+
+    def test_stacked_gusts_keep_the_tallest_stack(self):
+        time = np.datetime64("2024-06-01T00:00", "m") + np.arange(2).astype("timedelta64[h]")
+        _, columns = aggregate(time, {
+            "windspeed_10m": np.array([10, 20], dtype=np.float32),
+            "gust_excess": np.array([15, 0], dtype=np.float32),
+        }, 2)
+        np.testing.assert_array_equal(columns["windspeed_10m"], [20])
+        np.testing.assert_array_equal(columns["gust_excess"], [5])
+
+
+class ReduceSeriesTests(SimpleTestCase):
+    def test_short_horizons_are_unchanged(self):
+        frame = make_frame(hours=48, temperature_2m=np.arange(48))
+        series = chart_series("temperature", frame, hour_interval_for(2))
+        self.assertIs(series["columns"]["temperature_2m"], frame["temperature_2m"])
+        self.assertEqual((series["marker_every"], series["bar_hours"]), (1, 1))
+
+    def test_long_horizons_fit_the_chart(self):
+        hours = 16 * 24
+        frame = make_frame(hours=hours, temperature_2m=np.sin(np.arange(hours) / 7), rain=np.ones(hours),
+                           precipitation_probability=np.zeros(hours))
+        interval = hour_interval_for(16)
+
+        line = chart_series("temperature", frame, interval)
+        self.assertEqual(len(line["time"]), MAX_LINE_POINTS)
+        self.assertGreaterEqual(PLOT_WIDTH / (len(line["time"]) - 1) * line["marker_every"], MARKER_SPACING_PX)
+
+        bars = chart_series("rain", frame, interval)
+        self.assertEqual((len(bars["time"]), bars["bar_hours"]), (hours // interval, interval))
+        self.assertEqual(float(bars["columns"]["rain"].sum()), hours)
+
+        overlay = overlay_series("temperature_2m", frame.time, {"a": frame["temperature_2m"], "b": frame["rain"]},
+                                 interval)
+        self.assertLessEqual(len(overlay["time"]), MAX_LINE_POINTS)
+        self.assertEqual(set(overlay["columns"]), {"a", "b"})
+        np.testing.assert_allclose(overlay["columns"]["b"], 1)
+
+    def test_marker_every(self):
+        self.assertEqual(marker_every(1), 1)
+        self.assertEqual(marker_every(48), 1)
+        self.assertEqual(marker_every(MAX_LINE_POINTS), 2)
@@ -0,0 +1,50 @@
+import dataclasses
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..charts import CHART_TYPES, chart_series
+from ..mpl_charts import CHART_FIGURES, FigurePool, figure_shape
+from ..startup import _dummy_frame
+
+
+class FigurePoolTests(SimpleTestCase):
+    def setUp(self):
+        self.frame = _dummy_frame()
+        self.other = dataclasses.replace(self.frame, hourly={
+            name: (values * 1.3 + 2).astype(np.float32) for name, values in self.frame.hourly.items()
+        })
+
+    def test_reused_figures_draw_what_a_fresh_figure_draws(self):
+        for kind in CHART_TYPES:
+            with self.subTest(kind=kind):
+                pool = FigurePool()
+                pool.render(chart_series(kind, self.frame, 1))
+                pooled = pool.render(chart_series(kind, self.other, 1))
+                self.assertEqual((pool.built, pool.reused), (1, 1))
+                self.assertEqual(pooled, CHART_FIGURES[kind](chart_series(kind, self.other, 1)).to_png())
+
+    def test_each_shape_gets_its_own_figure(self):
+        pool = FigurePool()
+        short = chart_series("temperature", self.frame, 1)
+        long = chart_series("temperature", _dummy_frame(hours=72), 1)
+        self.assertNotEqual(figure_shape(short), figure_shape(long))
+        for series in (short, long, short):
+            pool.render(series)
+        self.assertEqual((pool.built, pool.reused), (2, 1))
+
+    def test_idle_figures_are_bounded(self):
+        pool = FigurePool(max_figures=2)
+        for kind in CHART_TYPES:
+            pool.render(chart_series(kind, self.frame, 1))
+        self.assertEqual(sum(len(figures) for figures in pool._idle.values()), 2)
+        self.assertEqual(list(pool._idle), [("cloud", 48, 2, 1, 1), ("wind", 48, 2, 1, 1)])
+
+    def test_checked_out_figures_are_not_shared(self):
+        pool = FigurePool()
+        series = chart_series("rain", self.frame, 1)
+        pool.render(series)
+        chart = pool._checkout(figure_shape(series))
+        self.assertIsNotNone(chart)
+        self.assertIsNone(pool._checkout(figure_shape(series)))
+        pool._checkin(chart)
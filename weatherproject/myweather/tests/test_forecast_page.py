@@ -0,0 +1,60 @@
+from datetime import date
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from .. import metrics
+from ..hourly import hourly_days
+from .base import UpstreamTestCase, make_frame
+
+
+@override_settings(WEATHER_METRICS=True)
+class StreamedPageTimingTests(UpstreamTestCase):
+    def test_stages_rendered_while_streaming_are_timed_when_the_stream_ends(self):
+        requests_timed = metrics.REQUEST_SECONDS.count("forecast", "GET")
+        response = self.client.get("/forecast/London/2/")
+        self.assertTrue(response.streaming)
+        self.assertNotIn("hourly_table", response.headers["Server-Timing"])
+        self.assertEqual(metrics.REQUEST_SECONDS.count("forecast", "GET"), requests_timed)
+
+        b"".join(response.streaming_content)
+        timings = response.server_timing
+        self.assertIn("charts", timings)
+        self.assertIn("hourly_table", timings)
+        self.assertGreaterEqual(timings["total"], timings["charts"] + timings["hourly_table"])
+        self.assertEqual(metrics.REQUEST_SECONDS.count("forecast", "GET"), requests_timed + 1)
+
+
+class StreamedPageTests(UpstreamTestCase):
+    def test_parts_are_streamed_in_page_order(self):
+        response = self.client.get("/forecast/London/2/")
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        page = "".join(chunks)
+        markers = ["Now in London", "/charts/", "Hourly Forecast", "<h3>", "</html>"]
+        positions = [page.index(marker) for marker in markers]
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(page.count("<table>"), 3)
+        self.assertEqual(page.count("<h3>"), 3)
+        self.assertNotIn("Now in London", chunks[-1])
+        self.assertEqual(page.count("</main>"), 1)
+
+
+class HourlyDaysTests(SimpleTestCase):
+    def test_days_split_at_midnight(self):
+        frame = make_frame(start="2024-06-01T18:00", hours=36)
+        days = list(hourly_days(frame))
+        self.assertEqual([(day.date, len(day)) for day in days],
+                         [(date(2024, 6, 1), 6), (date(2024, 6, 2), 24), (date(2024, 6, 3), 6)])
+        self.assertTrue(all(day.frame is frame for day in days))
+
+    def test_rows_hold_display_values(self):
+        rain = np.zeros(24)
+        rain[:3] = [np.nan, 0.125, 2]
+        frame = make_frame(hours=24, temperature_2m=np.full(24, 21.5), rain=rain)
+        [day] = hourly_days(frame)
+        rows = list(day.rows())
+        self.assertEqual(len(rows), 24)
+        self.assertEqual(rows[0], {"time": "00:00", "weathercode": None, "temp": 21.5, "rain": None, "rain_prob": None})
+        self.assertEqual([row["rain"] for row in rows[1:4]], [0.12, 2, 0])
+        self.assertIsInstance(rows[2]["rain"], int)
+
@@ -0,0 +1,57 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..client import forecast_params
+from ..fake_upstream import build_forecast_payload
+from ..frame import HOURLY_VARIABLES, ForecastFrame, json_column, to_python
+from .base import make_frame
+
+
+class ForecastFrameTests(SimpleTestCase):
+    def setUp(self):
+        self.payload = build_forecast_payload(forecast_params(51.5074, -0.1278, 3))
+        self.frame = ForecastFrame.from_response(self.payload)
+
+    def test_parses_every_variable_into_read_only_columns(self):
+        self.assertEqual(len(self.frame), len(self.payload["hourly"]["time"]))
+        self.assertEqual(self.frame.time.dtype, np.dtype("datetime64[m]"))
+        self.assertEqual(set(self.frame.hourly), set(HOURLY_VARIABLES))
+        for name, column in self.frame.hourly.items():
+            self.assertEqual(column.dtype, np.float32, name)
+            self.assertEqual(len(column), len(self.frame), name)
+            self.assertFalse(column.flags.writeable, name)
+        self.assertEqual(len(self.frame.sunrise), len(self.payload["daily"]["sunrise"]))
+        self.assertEqual(self.frame.current, self.payload["current_weather"])
+
+    def test_missing_values_become_nan(self):
+        self.payload["hourly"]["rain"][:2] = [None, None]
+        rain = ForecastFrame.from_response(self.payload)["rain"]
+        self.assertTrue(np.isnan(rain[:2]).all())
+        self.assertFalse(np.isnan(rain[2:]).any())
+        self.assertEqual(json_column(rain)[:2], [None, None])
+
+    def test_incomplete_responses_raise_key_error(self):
+        del self.payload["daily"]
+        with self.assertRaises(KeyError):
+            ForecastFrame.from_response(self.payload)
+        with self.assertRaises(KeyError):
+            self.frame["snowfall"]
+
+    def test_derived_series(self):
+        frame = make_frame(hours=3, windspeed_10m=[10, 20, 30], windgusts_10m=[15, 18, 40])
+        np.testing.assert_array_equal(frame["gust_excess"], [5, 0, 10])
+
+    def test_day_boundaries_and_window(self):
+        frame = make_frame(start="2024-06-01T12:00", hours=48)
+        np.testing.assert_array_equal(frame.day_boundaries, [0, 12, 36])
+        window = frame.window("2024-06-02", "2024-06-02")
+        self.assertEqual(len(window), 24)
+        self.assertEqual(window.hhmm("time"), "00:00")
+        self.assertEqual(window.hhmm("sunrise"), "06:00")
+        self.assertEqual(len(window.sunset), 1)
+        self.assertTrue(np.shares_memory(window["rain"], frame["rain"]))
+
+    def test_display_helpers(self):
+        self.assertEqual(to_python(np.float32(54.0)), 54)
+        self.assertEqual(to_python(np.float32(3.14159)), 3.14)
+        self.assertEqual(json_column(np.array([1.234, 2.0], dtype=np.float32)), [1.23, 2.0])
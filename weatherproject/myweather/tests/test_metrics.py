@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase, override_settings
+
+from .. import metrics
+from ..metrics import Counter, Histogram
+from .base import UpstreamTestCase
+
+
+class MetricTypeTests(SimpleTestCase):
+    def test_counter_counts_per_label(self):
+        counter = Counter("test_events_total", "Events.", ("kind",))
+        counter.inc(1, "a")
+        counter.inc(2, "a")
+        counter.inc(1, "b")
+        self.assertEqual(counter.value("a"), 3)
+        self.assertEqual(counter.value("c"), 0)
+        self.assertEqual(list(counter.samples()), [
+            ("test_events_total", '{kind="a"}', 3),
+            ("test_events_total", '{kind="b"}', 1),
+        ])
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_seconds", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        samples = {(name, labels): value for name, labels, value in histogram.samples()}
+        self.assertEqual(samples[("test_seconds_bucket", '{le="0.1"}')], 2)
+        self.assertEqual(samples[("test_seconds_bucket", '{le="1.0"}')], 3)
+        self.assertEqual(samples[("test_seconds_bucket", '{le="+Inf"}')], 4)
+        self.assertEqual(samples[("test_seconds_count", "")], 4)
+        self.assertAlmostEqual(samples[("test_seconds_sum", "")], 3.65)
+        self.assertEqual(histogram.count(), 4)
+
+    def test_label_values_are_escaped(self):
+        counter = Counter("test_paths_total", "Paths.", ("path",))
+        counter.inc(1, 'a"b\\c\n')
+        self.assertEqual(next(counter.samples())[1], '{path="a\\"b\\\\c\\n"}')
+
+    @override_settings(WEATHER_METRICS=False)
+    def test_stage_is_a_no_op_while_disabled(self):
+        observed = metrics.STAGE_SECONDS.count("test_disabled")
+        with metrics.stage("test_disabled"):
+            pass
+        self.assertEqual(metrics.STAGE_SECONDS.count("test_disabled"), observed)
+
+
+@override_settings(WEATHER_METRICS=True)
+class MetricsEndpointTests(UpstreamTestCase):
+    def test_serves_the_text_format_to_loopback(self):
+        self.client.get("/api/forecast/", {"lat": 51.5, "lon": -0.12, "days": 1})
+        response = self.client.get("/metrics", REMOTE_ADDR="127.0.0.1")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn("# TYPE myweather_request_seconds histogram", text)
+        self.assertIn('myweather_request_seconds_count{view="forecast_api",method="GET"}', text)
+        self.assertIn('myweather_forecast_cache_events_total{event="misses"}', text)
+
+    def test_refuses_addresses_outside_the_allowlist(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="203.0.113.7").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="not-an-ip").status_code, 403)
+
+    @override_settings(WEATHER_METRICS_ALLOWED_IPS=["10.0.0.0/8"])
+    def test_allowlist_takes_networks(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.1.2.3").status_code, 200)
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="127.0.0.1").status_code, 403)
+
+    @override_settings(WEATHER_METRICS=False)
+    def test_not_found_while_disabled(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="127.0.0.1").status_code, 404)
+
+    def test_server_timing_header_lists_the_stages(self):
+        response = self.client.get("/api/forecast/", {"lat": 51.5, "lon": -0.12, "days": 1})
+        self.assertEqual(response.status_code, 200)
+        entries = dict(entry.split(";dur=") for entry in response["Server-Timing"].split(", "))
+        self.assertIn("upstream", entries)
+        self.assertIn("total", entries)
+        self.assertGreaterEqual(float(entries["total"]), float(entries["upstream"]))
@@ -0,0 +1,86 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import get_forecast_cache, get_page_cache
+from ..catalogue import get_catalogue
+from ..prefetch import Prefetcher, RateLimiter, prefetch_settings, serving_process
+from .base import UpstreamTestCase
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_burst_is_granted_at_once_then_paced(self):
+        limiter = RateLimiter(rate=50, burst=3)
+        start = time.perf_counter()
+        for _ in range(3):
+            limiter.acquire()
+        self.assertLess(time.perf_counter() - start, 0.01)
+        limiter.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.015)
+
+    def test_zero_rate_never_waits(self):
+        limiter = RateLimiter(rate=0)
+        self.assertTrue(all(limiter.acquire() for _ in range(100)))
+
+    def test_stop_interrupts_the_wait(self):
+        limiter = RateLimiter(rate=0.01, burst=1)
+        limiter.acquire()
+        stop = threading.Event()
+        stop.set()
+        self.assertFalse(limiter.acquire(stop))
+
+
+class PrefetchSettingsTests(SimpleTestCase):
+    @override_settings(WEATHER_PREFETCH={"RATE": 1.0})
+    def test_settings_are_merged_over_the_defaults(self):
+        options = prefetch_settings()
+        self.assertEqual(options["RATE"], 1.0)
+        self.assertFalse(options["IN_PROCESS"])
+
+    def test_only_serving_commands_count_as_serving(self):
+        self.assertTrue(serving_process(["manage.py", "runserver"]))
+        self.assertFalse(serving_process(["manage.py", "check"]))
+        self.assertFalse(serving_process(["/srv/app/manage.py", "test", "myweather"]))
+        self.assertFalse(serving_process(["/usr/lib/python3/site-packages/django/__main__.py", "bench_views"]))
+        self.assertTrue(serving_process(["/usr/bin/gunicorn", "weatherproject.wsgi"]))
+        self.assertTrue(serving_process([]))
+
+
+class PrefetcherTests(UpstreamTestCase):
+    def prefetcher(self, *names, **options):
+        catalogue = get_catalogue()
+        options = {"days": (1, 2), "workers": 2, "rate": 0, "render": False, **options}
+        return Prefetcher([catalogue.get(name) for name in names], **options)
+
+    def test_cycle_fills_the_forecast_cache(self):
+        stats = self.prefetcher("London", "Paris").run_cycle()
+        self.assertEqual((stats.cities, stats.refreshed, stats.failures), (2, 2, 0))
+        self.assertEqual(len(get_forecast_cache().backend), 4)
+
+    def test_render_also_fills_the_page_cache(self):
+        stats = self.prefetcher("London", days=(2,), render=True).run_cycle()
+        self.assertEqual(stats.pages_rendered, 1)
+        self.assertEqual(len(get_page_cache()), 1)
+
+    def test_failures_are_counted_not_raised(self):
+        self.upstream.fail_next(3)
+        with self.assertLogs("myweather.prefetch", "WARNING"):
+            stats = self.prefetcher("London", days=(2,), workers=1).run_cycle()
+        self.assertEqual((stats.refreshed, stats.failures), (0, 1))
+        self.assertEqual(len(stats.errors), 1)
+
+    @override_settings(WEATHER_PREFETCH={"CITIES": ["London", "Atlantis"], "DAYS": [3]})
+    def test_from_settings_skips_unknown_cities(self):
+        prefetcher = Prefetcher.from_settings(WORKERS=1)
+        self.assertEqual([city.name for city in prefetcher.cities], ["London"])
+        self.assertEqual((prefetcher.days, prefetcher.workers), ((3,), 1))
+
+    def test_next_delay_keeps_the_cycle_interval(self):
+        prefetcher = self.prefetcher("London", interval=10, jitter=0.1)
+        stats = prefetcher.run_cycle()
+        stats.duration = 4
+        for _ in range(20):
+            self.assertTrue(5 <= prefetcher.next_delay(stats) <= 7)
+        stats.duration = 30
+        self.assertEqual(prefetcher.next_delay(stats), 0.0)
@@ -0,0 +1,49 @@
+import sys
+
+from django.test import SimpleTestCase, override_settings
+
+from ..charts import CHART_TYPES, ChartRenderer, chart_series, get_chart_renderer
+from ..startup import _dummy_frame
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class ChartRendererTests(SimpleTestCase):
+    def setUp(self):
+        frame = _dummy_frame()
+        self.series = [chart_series(kind, frame, 1) for kind in CHART_TYPES]
+
+    def renderer(self, mode, **options):
+        renderer = ChartRenderer(mode, workers=2, **options)
+        self.addCleanup(renderer.shutdown)
+        return renderer
+
+    def test_rejects_unknown_modes_and_backends(self):
+        with self.assertRaises(ValueError):
+            ChartRenderer("fork")
+        with self.assertRaises(ValueError):
+            ChartRenderer(backend="gif")
+
+    def test_thread_pool_renders_the_same_images_in_order(self):
+        serial = self.renderer("serial").render_many(self.series)
+        threaded = self.renderer("thread").render_many(self.series)
+        self.assertEqual(len(threaded), len(CHART_TYPES))
+        self.assertTrue(all(image.startswith(PNG_SIGNATURE) for image in threaded))
+        self.assertEqual(threaded, serial)
+
+    def test_rendering_never_imports_pyplot(self):
+        self.renderer("thread").render_many(self.series)
+        self.assertNotIn("matplotlib.pyplot", sys.modules)
+
+    def test_svg_charts_are_drawn_in_the_calling_thread(self):
+        renderer = self.renderer("thread", backend="svg")
+        images = renderer.render_many(self.series)
+        self.assertTrue(all(image.startswith(b"<svg") for image in images))
+        self.assertIsNone(renderer._executor)
+
+    @override_settings(WEATHER_CHART_RENDERING="thread", WEATHER_CHART_WORKERS=3)
+    def test_renderer_follows_the_settings(self):
+        renderer = get_chart_renderer()
+        self.assertEqual((renderer.mode, renderer.workers), ("thread", 3))
+        with override_settings(WEATHER_CHART_RENDERING="serial"):
+            self.assertEqual(get_chart_renderer().mode, "serial")
@@ -0,0 +1,140 @@
+import io
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import requests
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..client import forecast_params
+from ..fake_upstream import build_forecast_payload
+from ..frame import ForecastFrame
+from ..models import ForecastSnapshot
+from ..snapshots import (
+    afetch_through_store, build_snapshot, fetch_through_store, pack_frame, prune_snapshots, unpack_frame,
+)
+from .base import TEST_SETTINGS, reset_singletons
+
+
+def unavailable(params_list):
+    raise requests.exceptions.ConnectionError("down")
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        settings_override = override_settings(**{**TEST_SETTINGS, "WEATHER_SNAPSHOT_STORE": {"ENABLED": True}})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_singletons()
+        self.addCleanup(reset_singletons)
+
+    def frame(self, params):
+        return ForecastFrame.from_response(build_forecast_payload(params))
+
+    def test_pack_round_trip(self):
+        params = forecast_params(51.5074, -0.1278, 2)
+        frame = self.frame(params)
+        restored = unpack_frame(ForecastSnapshot(**pack_frame(frame)))
+        np.testing.assert_array_equal(restored.time, frame.time)
+        np.testing.assert_array_equal(restored.sunrise, frame.sunrise)
+        np.testing.assert_array_equal(restored.sunset, frame.sunset)
+        self.assertEqual(restored.hourly.keys(), frame.hourly.keys())
+        for name, column in frame.hourly.items():
+            np.testing.assert_array_equal(restored.hourly[name], column)
+        self.assertEqual(restored.current, frame.current)
+
+    def test_fetched_forecasts_are_stored_and_read_back(self):
+        params = forecast_params(51.5074, -0.1278, 2)
+        [entry] = fetch_through_store([params], lambda params_list: [self.frame(p) for p in params_list])
+        self.assertEqual(ForecastSnapshot.objects.get().city, "London")
+
+        def fresh_only(params_list):
+            raise AssertionError("a fresh snapshot should have been used")
+
+        [stored] = fetch_through_store([params], fresh_only)
+        self.assertEqual(len(stored.value), len(entry.value))
+
+    def test_fallback_serves_a_window_of_an_older_longer_forecast(self):
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        week = forecast_params(51.5074, -0.1278, 6, now=yesterday)
+        fetched_at = time.time() - 86400
+        build_snapshot(week, self.frame(week), fetched_at).save()
+
+        params = forecast_params(51.5074, -0.1278, 2)
+        [entry] = fetch_through_store([params], unavailable)
+        self.assertAlmostEqual(entry.fetched_at, fetched_at, places=3)
+        self.assertEqual(str(entry.value.days[0]), params["start_date"])
+        self.assertEqual(str(entry.value.days[-1]), params["end_date"])
+        self.assertEqual((len(entry.value), len(entry.value.sunrise)), (72, 3))
+
+        too_long = forecast_params(51.5074, -0.1278, 6)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            fetch_through_store([too_long], unavailable)
+
+    def test_missing_values_survive_packing(self):
+        payload = build_forecast_payload(forecast_params(51.5074, -0.1278, 2))
+        payload["hourly"]["rain"][3] = None
+        restored = unpack_frame(ForecastSnapshot(**pack_frame(ForecastFrame.from_response(payload))))
+        self.assertTrue(np.isnan(restored["rain"][3]))
+
+    def test_only_the_missing_forecasts_are_fetched(self):
+        london, paris = forecast_params(51.5074, -0.1278, 2), forecast_params(48.8566, 2.3522, 2)
+        fetch_through_store([london], lambda params_list: [self.frame(p) for p in params_list])
+        fetched = []
+
+        def fetch(params_list):
+            fetched.extend(params_list)
+            return [self.frame(p) for p in params_list]
+
+        entries = fetch_through_store([paris, london], fetch)
+        self.assertEqual(fetched, [paris])
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(ForecastSnapshot.objects.count(), 2)
+
+    def test_fallback_for_a_point_needs_the_same_coordinates_and_variables(self):
+        point = forecast_params(12.3456, 65.4321, 2)
+        build_snapshot(point, self.frame(point), time.time() - 7200).save()
+        [entry] = fetch_through_store([forecast_params(12.3456, 65.4321, 1)], unavailable)
+        self.assertEqual(len(entry.value), 48)
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            fetch_through_store([forecast_params(12.3, 65.4, 1)], unavailable)
+        more_variables = {**point, "hourly": point["hourly"] + ",snowfall"}
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            fetch_through_store([more_variables], unavailable)
+
+    async def test_async_path_stores_and_falls_back(self):
+        params = forecast_params(51.5074, -0.1278, 2)
+
+        async def fetch(params_list):
+            return [self.frame(p) for p in params_list]
+
+        async def down(params_list):
+            unavailable(params_list)
+
+        [entry] = await afetch_through_store([params], fetch)
+        [fallback] = await afetch_through_store([params], down, read_store=False)
+        self.assertAlmostEqual(fallback.fetched_at, entry.fetched_at, places=3)
+
+    def test_prune_drops_expired_and_superseded_snapshots(self):
+        params = forecast_params(51.5074, -0.1278, 2)
+        for hours_ago in (3, 2, 1):
+            build_snapshot(params, self.frame(params), time.time() - hours_ago * 3600).save()
+        old = forecast_params(48.8566, 2.3522, 2, now=datetime.utcnow() - timedelta(days=30))
+        build_snapshot(old, self.frame(old), time.time() - 30 * 86400).save()
+
+        self.assertEqual(prune_snapshots(retention_days=7, keep=1), (1, 2))
+        [kept] = ForecastSnapshot.objects.all()
+        self.assertGreater(kept.fetched_at, datetime.now(timezone.utc) - timedelta(hours=1, minutes=1))
+        self.assertEqual(prune_snapshots(retention_days=7, keep=1), (0, 0))
+
+    @override_settings(WEATHER_SNAPSHOT_STORE={"ENABLED": True, "BATCH_SIZE": 2})
+    def test_prune_command(self):
+        params = forecast_params(51.5074, -0.1278, 2)
+        for hours_ago in (5, 4, 3, 2, 1):
+            build_snapshot(params, self.frame(params), time.time() - hours_ago * 3600).save()
+        out = io.StringIO()
+        call_command("prune_snapshots", "--keep", "2", stdout=out)
+        self.assertEqual(ForecastSnapshot.objects.count(), 2)
+        self.assertIn("Deleted 0 expired and 3 superseded snapshots (5 -> 2)", out.getvalue())
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+PROBE = """
+import sys
+import django
+django.setup()
+from myweather import views
+from myweather.charts import CHART_TYPES, chart_series, render_chart
+from myweather.startup import _dummy_frame
+imported_by_views = "matplotlib" in sys.modules
+for kind in CHART_TYPES:
+    render_chart(chart_series(kind, _dummy_frame(), 1), backend="svg")
+print(imported_by_views, "matplotlib" in sys.modules)
+"""
+
+
+class LazyMatplotlibTests(SimpleTestCase):
+    def test_views_and_svg_charts_do_not_import_matplotlib(self):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=settings.BASE_DIR, check=True, capture_output=True, text=True,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "weatherproject.settings"},
+        ).stdout
+        self.assertEqual(output.split(), ["False", "False"])
+
+
+class WarmupCommandTests(SimpleTestCase):
+    def test_measure_renders_into_its_own_chart_store(self):
+        with tempfile.TemporaryDirectory() as chart_dir:
+            output = subprocess.run(
+                [sys.executable, "manage.py", "warmup", "--measure"], cwd=settings.BASE_DIR, check=True,
+                capture_output=True, text=True, env={**os.environ, "WEATHER_CHART_DIR": chart_dir},
+            ).stdout
+            self.assertEqual(os.listdir(chart_dir), [])
+        self.assertIn('"first_request"', output)
@@ -0,0 +1,52 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..charts import CHART_TYPES, chart_series, overlay_series
+from ..startup import _dummy_frame
+from ..svg_charts import HEIGHT, LEFT, PLOT_WIDTH, _nice_ticks, render_svg
+from .base import make_frame
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def parse(image):
+    return ET.fromstring(image.decode("utf-8"))
+
+
+class SvgChartTests(SimpleTestCase):
+    def test_every_chart_type_is_well_formed(self):
+        frame = _dummy_frame()
+        for kind in CHART_TYPES:
+            with self.subTest(kind=kind):
+                root = parse(render_svg(chart_series(kind, frame, 1)))
+                self.assertEqual(root.tag, f"{SVG}svg")
+                self.assertEqual(root.get("height"), str(HEIGHT))
+                self.assertTrue(root.findall(f"{SVG}polyline") or root.findall(f"{SVG}path"))
+
+    def test_one_point_per_hour_and_none_for_missing_values(self):
+        temperature = np.arange(24, dtype=np.float32)
+        temperature[5] = np.nan
+        image = render_svg(chart_series("temperature", make_frame(temperature_2m=temperature), 1))
+        self.assertNotIn(b"nan", image)
+        [line] = parse(image).findall(f"{SVG}polyline")
+        points = [tuple(map(float, point.split(","))) for point in line.get("points").split()]
+        self.assertEqual(len(points), 23)
+        xs = [x for x, _ in points]
+        self.assertEqual(xs, sorted(xs))
+        self.assertTrue(LEFT <= xs[0] and xs[-1] <= LEFT + PLOT_WIDTH)
+
+    def test_overlay_escapes_labels_and_grows_for_its_legend(self):
+        frame = make_frame()
+        columns = {f"<City {i}> & co": np.full(24, i, dtype=np.float32) for i in range(8)}
+        image = render_svg(overlay_series("temperature_2m", frame.time, columns, 1))
+        root = parse(image)
+        self.assertEqual(len(root.findall(f"{SVG}polyline")), 8)
+        self.assertIn(b"&lt;City 0&gt; &amp; co", image)
+        self.assertGreater(int(root.get("height")), HEIGHT)
+
+    def test_nice_ticks(self):
+        self.assertEqual(_nice_ticks(0, 100), [0, 20, 40, 60, 80, 100])
+        self.assertEqual(_nice_ticks(-3.2, 7.9), [-2, 0, 2, 4, 6])
+        self.assertEqual(_nice_ticks(5, 5), [5, 5.2, 5.4, 5.6, 5.8, 6])
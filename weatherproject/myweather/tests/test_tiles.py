@@ -0,0 +1,83 @@
+import json
+
+from django.test import SimpleTestCase
+
+from ..cache import ForecastCache, MemoryBackend
+from ..tiles import Tile, TileCache, get_tile_cache, snap
+from .base import UpstreamTestCase
+
+
+class SnapTests(SimpleTestCase):
+    def test_snaps_to_the_nearest_grid_point(self):
+        self.assertEqual(snap(51.5074, -0.1278, 0.1), (51.5, -0.1))
+        self.assertEqual(snap(51.5074, -0.1278, 0.25), (51.5, -0.25))
+        self.assertEqual(snap(-33.8688, 151.2093, 0.5), (-34.0, 151.0))
+        self.assertEqual(snap(0.04, -0.04, 0.1), (0.0, 0.0))
+
+    def test_wraps_longitude_and_clamps_latitude(self):
+        self.assertEqual(snap(10.0, 190.0, 0.5), (10.0, -170.0))
+        self.assertEqual(snap(10.0, 179.9, 0.5), (10.0, -180.0))
+        self.assertEqual(snap(89.98, 0.0, 0.25), (90.0, 0.0))
+        self.assertEqual(snap(-90.0, -180.0, 0.1), (-90.0, -180.0))
+
+    def test_tiles_near_a_city_are_named_after_it(self):
+        self.assertEqual(Tile(51.5, -0.1, "model", 0.1).name, "London area (51.5, -0.1)")
+        self.assertEqual(Tile(0.0, -30.0, "model", 0.1).name, "0, -30")
+
+
+class TileCacheTests(SimpleTestCase):
+    def tile_cache(self):
+        return TileCache(ForecastCache(MemoryBackend(16, 60), 60, 60), {"fine": 0.1, "coarse": 1.0}, "fine")
+
+    def test_levels_are_validated(self):
+        with self.assertRaises(ValueError):
+            TileCache(ForecastCache(MemoryBackend(16, 60), 60, 60), {"fine": 0.1}, "coarse")
+        with self.assertRaises(ValueError):
+            self.tile_cache().tile(10, 10, "medium")
+
+    def test_nearby_points_share_a_tile_and_a_fetch(self):
+        tile_cache = self.tile_cache()
+        fetched = []
+
+        def fetch(params):
+            fetched.append(params)
+            return "forecast"
+
+        for latitude, longitude in ((51.51, -0.12), (51.49, -0.08), (51.46, -0.14)):
+            tile_cache.get_entry(tile_cache.tile(latitude, longitude), 2, fetch)
+        tile_cache.get_entry(tile_cache.tile(51.51, -0.12, "coarse"), 2, fetch)
+        self.assertEqual(len(fetched), 2)
+        self.assertEqual((fetched[0]["latitude"], fetched[1]["latitude"]), (51.5, 52.0))
+
+        stats = tile_cache.stats()
+        self.assertEqual(stats["fine"], {"hits": 2, "misses": 1, "hit_ratio": 2 / 3})
+        self.assertEqual(stats["coarse"], {"hits": 0, "misses": 1, "hit_ratio": 0.0})
+        tile_cache.clear()
+        self.assertEqual(tile_cache.stats()["fine"]["hits"], 0)
+
+
+class PointForecastTests(UpstreamTestCase):
+    def test_api_reports_the_tile(self):
+        response = self.client.get("/api/forecast/", {"lat": 51.5074, "lon": -0.1278, "days": 1, "snap": "regional"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data["tile"], {"latitude": 51.5, "longitude": -0.25, "level": "regional", "step": 0.25,
+                                        "name": "London area (51.5, -0.25)"})
+        self.assertEqual((data["latitude"], data["longitude"]), (51.5074, -0.1278))
+        self.assertEqual(len(data["time"]), len(data["hourly"]["temperature_2m"]))
+
+    def test_points_of_one_tile_share_one_upstream_fetch_and_validators(self):
+        requests_before = self.upstream.requests
+        first = self.client.get("/forecast/point/", {"lat": 48.87, "lon": 2.31, "days": 2})
+        b"".join(first.streaming_content)
+        second = self.client.get("/forecast/point/", {"lat": 48.88, "lon": 2.34, "days": 2})
+        self.assertEqual(self.upstream.requests - requests_before, 1)
+        self.assertEqual(first.headers["ETag"], second.headers["ETag"])
+        self.assertEqual(get_tile_cache().stats()["model"]["hits"], 1)
+
+    def test_invalid_points_answer_400(self):
+        for query in ({"lat": "north", "lon": 0}, {"lat": 91, "lon": 0}, {"lat": 0, "lon": 0, "days": 9},
+                      {"lat": 0, "lon": 0, "snap": "street"}):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get("/forecast/point/", query).status_code, 400)
+                self.assertEqual(self.client.get("/api/forecast/", query).status_code, 400)
@@ -0,0 +1,86 @@
+import json
+
+from django.test import RequestFactory
+
+from ..client import set_forecast_client
+from ..views import forecast_view_async
+from .base import UpstreamTestCase
+
+
+class UnparseableClient:
+    """Answers every forecast request with a payload that has no hourly data."""
+
+    def fetch(self, params):
+        return {"latitude": params["latitude"], "longitude": params["longitude"]}
+
+    def fetch_many(self, params_list):
+        return [self.fetch(params) for params in params_list]
+
+
+class ForecastViewTests(UpstreamTestCase):
+    def test_page_carries_validators_and_revalidates_with_304(self):
+        response = self.client.get("/forecast/London/2/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Now in London", response.getvalue())
+        etag = response.headers["ETag"]
+
+        requests_before = self.upstream.requests
+        revalidated = self.client.get("/forecast/London/2/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.headers["ETag"], etag)
+        self.assertEqual(self.upstream.requests, requests_before)
+
+    def test_city_names_redirect_to_their_canonical_spelling(self):
+        response = self.client.get("/forecast/london/2/")
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response.headers["Location"], "/forecast/London/2/")
+        self.assertEqual(self.client.get("/forecast/Atlantis/2/").status_code, 404)
+
+    def test_upstream_failure_renders_an_error_page(self):
+        self.upstream.fail_next(3)
+        response = self.client.get("/forecast/Paris/2/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Could not retrieve weather data", response.content)
+        self.assertIn("no-cache", response.headers["Cache-Control"])
+
+
+class UpstreamErrorTests(UpstreamTestCase):
+    def use_unparseable_upstream(self):
+        previous = set_forecast_client(UnparseableClient())
+        self.addCleanup(set_forecast_client, previous)
+
+    def test_point_page_shows_the_error(self):
+        self.upstream.fail_next(3)
+        response = self.client.get("/forecast/point/", {"lat": 51.5, "lon": -0.12, "days": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Could not retrieve weather data", response.content)
+
+    def test_unparseable_forecast_renders_an_error_page(self):
+        self.use_unparseable_upstream()
+        response = self.client.get("/forecast/London/2/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Could not parse weather data from the API.", response.content)
+
+    def test_api_failures_answer_502(self):
+        self.upstream.fail_next(3)
+        response = self.client.get("/api/forecast/", {"lat": 51.5, "lon": -0.12, "days": 2})
+        self.assertEqual(response.status_code, 502)
+        self.assertTrue(json.loads(response.content)["error"].startswith("Could not retrieve weather data"))
+
+        self.use_unparseable_upstream()
+        response = self.client.get("/api/compare/", {"cities": "London,Paris", "days": 2})
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(json.loads(response.content), {"error": "Could not parse weather data from the API."})
+
+    def test_compare_page_shows_the_error(self):
+        self.use_unparseable_upstream()
+        response = self.client.get("/compare/", {"cities": "London,Paris", "days": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Could not parse weather data from the API.", response.content)
+
+    async def test_async_view_renders_the_error_page(self):
+        self.upstream.fail_next(3)
+        response = await forecast_view_async(RequestFactory().get("/forecast/Paris/2/"), city="Paris", days=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Could not retrieve weather data", response.content)
+        self.assertIn("no-cache", response.headers["Cache-Control"])
@@ -0,0 +1,152 @@
+"""
+Forecasts for arbitrary coordinates, shared per grid tile.
+
+Open-Meteo answers from a model grid, so two points a few hundred metres
+apart get the same forecast. ``TileCache`` snaps every requested coordinate
+to the nearest point of a regular latitude/longitude grid and caches the
+forecast of that grid point: nearby requests (map clicks, geolocation)
+share one tile and one upstream fetch. The grid step is chosen per request
+from named snap levels, and hits and misses are counted per level.
+"""
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+from . import metrics
+from .cache import DEFAULT_CACHE_SETTINGS, ForecastCache, build_backend
+from .catalogue import get_catalogue
+from .client import forecast_params
+
+DEFAULT_TILE_SETTINGS = {
+    # Grid step in degrees of each snap level; 0.1 is about the resolution of
+    # the global weather models behind Open-Meteo's default forecast.
+    "LEVELS": {"model": 0.1, "regional": 0.25, "coarse": 0.5},
+    "DEFAULT_LEVEL": "model",
+    "BACKEND": "memory",  # "memory" or "django"
+    "MAX_ENTRIES": 4096,  # LRU bounds of the in-process backend
+    "MAX_BYTES": 64 * 1024 * 1024,
+    "CACHE_ALIAS": "default",
+    "KEY_PREFIX": "myweather:tile",
+}
+
+# A tile is named after a catalogue city this close to its grid point.
+NEAR_CITY_KM = 25.0
+
+
+def _options():
+    return {**DEFAULT_TILE_SETTINGS, **getattr(settings, "WEATHER_TILE_CACHE", {})}
+
+
+def snap(latitude, longitude, step):
+    """Returns the point of a ``step``-degree grid nearest to a coordinate, longitude wrapped to [-180, 180)."""
+    latitude = min(90.0, max(-90.0, round(latitude / step) * step))
+    longitude = round(((longitude + 180.0) % 360.0 - 180.0) / step) * step
+    if longitude >= 180.0:
+        longitude -= 360.0
+    return round(latitude, 4) + 0.0, round(longitude, 4) + 0.0
+
+
+@dataclass(frozen=True)
+class Tile:
+    latitude: float
+    longitude: float
+    level: str
+    step: float
+
+    @property
+    def name(self):
+        """Unique display name: the grid point, with the nearest catalogue city when there is one close by."""
+        point = f"{self.latitude:g}, {self.longitude:g}"
+        matches = get_catalogue().nearest(self.latitude, self.longitude, 1)
+        if matches and matches[0][1] <= NEAR_CITY_KM:
+            return f"{matches[0][0].name} area ({point})"
+        return point
+
+
+class TileCache:
+    """
+    Forecast cache keyed by grid tile instead of exact coordinate.
+
+    ``levels`` maps snap level names to grid steps in degrees. Entries live
+    in their own ``ForecastCache`` (same TTL and stale window as the forecast
+    cache) so a flood of map clicks cannot evict the city forecasts.
+    """
+
+    def __init__(self, cache, levels, default_level):
+        if default_level not in levels:
+            raise ValueError(f"Unknown default snap level: {default_level!r}")
+        self.cache = cache
+        self.levels = dict(levels)
+        self.default_level = default_level
+        self._counters = {level: {"hits": 0, "misses": 0} for level in self.levels}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = _options()
+        forecast_options = {**DEFAULT_CACHE_SETTINGS, **getattr(settings, "WEATHER_FORECAST_CACHE", {})}
+        backend = build_backend(
+            options, forecast_options["TTL"] + forecast_options["STALE_TTL"],
+            sizeof=lambda entry: entry.value.nbytes,
+        )
+        cache = ForecastCache(backend, forecast_options["TTL"], forecast_options["STALE_TTL"])
+        return cls(cache, options["LEVELS"], options["DEFAULT_LEVEL"])
+
+    def tile(self, latitude, longitude, level=None):
+        """Returns the ``Tile`` a coordinate falls in at snap ``level`` (the default level if None)."""
+        level = level or self.default_level
+        if level not in self.levels:
+            raise ValueError(f"Unknown snap level: {level!r}")
+        step = self.levels[level]
+        return Tile(*snap(latitude, longitude, step), level=level, step=step)
+
+    def get_entry(self, tile, days, fetch):
+        """Returns the ``CacheEntry`` of ``tile``'s forecast over ``days`` days, calling ``fetch(params)`` on a miss."""
+        entry, outcome = self.cache.lookup(forecast_params(tile.latitude, tile.longitude, days), fetch)
+        hit = outcome != "miss"  # stale entries are served too, like ForecastCache.stats counts them
+        with self._lock:
+            self._counters[tile.level]["hits" if hit else "misses"] += 1
+        metrics.count_lookup(f"tile_{tile.level}", hit)
+        return entry
+
+    def stats(self):
+        """Returns hits, misses and hit ratio per snap level."""
+        with self._lock:
+            counters = {level: dict(counts) for level, counts in self._counters.items()}
+        for counts in counters.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_ratio"] = counts["hits"] / lookups if lookups else 0.0
+        return counters
+
+    def clear(self):
+        self.cache.clear()
+        with self._lock:
+            for counts in self._counters.values():
+                counts["hits"] = counts["misses"] = 0
+
+
+_tile_cache = None
+_tile_cache_lock = threading.Lock()
+
+
+def get_tile_cache():
+    """Returns the process-wide tile cache, building it from settings on first use."""
+    global _tile_cache
+    if _tile_cache is None:
+        with _tile_cache_lock:
+            if _tile_cache is None:
+                _tile_cache = TileCache.from_settings()
+    return _tile_cache
+
+
+def _settings_changed(setting, **kwargs):
+    # Rebuilt from the new settings on next use, e.g. inside override_settings.
+    global _tile_cache
+    if setting in ("WEATHER_TILE_CACHE", "WEATHER_FORECAST_CACHE"):
+        with _tile_cache_lock:
+            _tile_cache = None
+
+
+setting_changed.connect(_settings_changed)
@@ -1,6 +1,21 @@
-from django.urls import path
-from .views import weather_view
+from django.conf import settings
+from django.urls import path, re_path
+from .metrics import metrics_view
+from .views import (
+    chart_view, compare_api, compare_view, forecast_api, forecast_view, forecast_view_async, point_forecast_view,
+    weather_view,
+)
+
+# Under ASGI the async forecast view waits on Open-Meteo without holding a thread
+forecast = forecast_view_async if getattr(settings, 'WEATHER_ASYNC_VIEWS', False) else forecast_view
 
 urlpatterns = [
     path('', weather_view, name='weather'),
-]
\ No newline at end of file
+    path('forecast/<path:city>/<int:days>/', forecast, name='forecast'),
+    path('forecast/point/', point_forecast_view, name='point_forecast'),
+    path('compare/', compare_view, name='compare'),
+    path('api/compare/', compare_api, name='compare_api'),
+    path('api/forecast/', forecast_api, name='forecast_api'),
+    path('metrics', metrics_view, name='metrics'),
+    re_path(r'^charts/(?P<key>[0-9a-f]{32}\.(?:png|svg))$', chart_view, name='chart'),
+]
@@ -1,204 +1,556 @@
-import base64
-import io
-from datetime import datetime, timedelta
+import hashlib
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
-import matplotlib
-import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
+import numpy as np
 import requests
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.template.loader import render_to_string
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.log import log_response
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_safe
 
-from .utils import cities, weather_codes
+from . import metrics
+from .alerts import evaluate, rules_from_settings, summarize
+from .cache import CacheEntry, get_forecast_cache, get_page_cache
+from .catalogue import get_catalogue
+from .charts import (
+    CHART_TYPES, CONTENT_TYPES, RenderQueueFull, chart_series, get_chart_store, get_render_queue, hour_interval_for,
+)
+from .client import forecast_params, get_async_forecast_client, get_forecast_client
+from .compare import DEFAULT_VARIABLES, compare, comparison_json
+from .frame import HOURLY_VARIABLES, ForecastFrame, json_column, to_python
+from .hourly import hourly_days
+from .snapshots import afetch_through_store, fetch_through_store
+from .tiles import get_tile_cache
+from .utils import weather_codes
 
-matplotlib.use("Agg")
-matplotlib.rcParams["font.family"] = "Segoe UI Emoji"
+# Chart URLs are content hashes, so the images never change.
+CHART_MAX_AGE = 365 * 24 * 3600
 
+# Context variable the template reads for each chart type
+CHART_CONTEXT_NAMES = {
+    "temperature": "temp_plot",
+    "rain": "rain_plot",
+    "cloud": "cloud_plot",
+    "wind": "wind_plot",
+}
 
-def plot_to_base64(fig):
-    """Converts a Matplotlib figure to a base64 encoded string."""
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png')
-    buf.seek(0)
-    image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close(fig)
-    return image_base64
 
+def fetch_forecast(params):
+    """Requests a forecast from the Open-Meteo API and returns the decoded JSON."""
+    return get_forecast_client().fetch(params)
 
-def _shade_night(ax, daily_sunrise, daily_sunset):
-    """Adds a shaded background to the plot during nighttime hours."""
-    sunrises = [datetime.fromisoformat(t) for t in daily_sunrise]
-    sunsets = [datetime.fromisoformat(t) for t in daily_sunset]
-    for sr, ss in zip(sunrises, sunsets):
-        day_start = sr.replace(hour=0, minute=0, second=0, microsecond=0)
-        ax.axvspan(day_start, sr, color="grey", alpha=0.2, zorder=0)
-        ax.axvspan(ss, day_start + timedelta(days=1), color="grey", alpha=0.2, zorder=0)
 
+def fetch_forecast_frame(params, read_store=True):
+    """
+    Returns the forecast for ``params`` as a ``CacheEntry`` holding a ``ForecastFrame``.
 
-def _setup_plot_axes(ax, hour_interval, daily_sunrise, daily_sunset):
-    """Configures the common elements for all weather plots."""
-    _shade_night(ax, daily_sunrise, daily_sunset)
-    # Configure bottom axis for hours
-    ax.xaxis.set_major_locator(mdates.HourLocator(interval=hour_interval))
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-    ax.tick_params(axis='x', rotation=90)
-    ax.set_xlabel("Hour of Day", fontsize=12)
+    A fresh snapshot from the database is used when there is one, otherwise
+    the forecast is requested from Open-Meteo and stored.
+    """
+    def fetch_frames(params_list):
+        return [ForecastFrame.from_response(fetch_forecast(params_list[0]))]
 
-    # Configure top axis for days
-    ax_top = ax.secondary_xaxis('top')
-    ax_top.xaxis.set_major_locator(mdates.DayLocator())
-    ax_top.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
-    ax_top.set_xlabel("Day", fontsize=12)
+    return fetch_through_store([params], fetch_frames, read_store)[0]
 
 
-def weather_view(request):
-    days_options = [(i, f"{i} Day{'s' if i > 1 else ''}") for i in range(1, 8)]
+async def afetch_forecast_frame(params, read_store=True):
+    """Async ``fetch_forecast_frame``: the upstream request does not block the event loop."""
+    async def fetch_frames(params_list):
+        return [ForecastFrame.from_response(await get_async_forecast_client().fetch(params_list[0]))]
+
+    return (await afetch_through_store([params], fetch_frames, read_store))[0]
+
 
+def _days_options():
+    return [(i, f"{i} Day{'s' if i > 1 else ''}") for i in range(1, 8)]
+
+
+def _form_context(search="", selected_days=2):
+    catalogue = get_catalogue()
     context = {
-        "cities": sorted(cities, key=lambda c: c["name"].lower()),
-        "search": request.POST.get("search", "").strip(),
-        "days_options": days_options,
-        "selected_days": 2,  # Default value
+        "search": search,
+        "days_options": _days_options(),
+        "selected_days": selected_days,
     }
 
     # Filter cities based on search term
-    if context["search"]:
-        search_term = context["search"].lower()
-        context["cities"] = [
-            c for c in context["cities"] if search_term in c["name"].lower()
-        ]
+    list_limit = getattr(settings, "WEATHER_CITY_LIST_LIMIT", 500)
+    if search:
+        context["cities"] = catalogue.search(search, limit=list_limit)
+    else:
+        context["cities"] = catalogue.cities[:list_limit]
+    return context
+
+
+def forecast_context(frame):
+    """Builds the template variables of a forecast's page shell: current conditions and alerts."""
+    context = {
+        "weather": frame.current,
+        "weather_codes": weather_codes,
+        "current_hour": {
+            "cloudcover": to_python(frame["cloudcover"][0]),
+            "pressure": to_python(frame["pressure_msl"][0]),
+            "uv_index": to_python(frame["uv_index"][0]),
+            "sunrise": frame.hhmm("sunrise"),
+            "sunset": frame.hhmm("sunset"),
+        },
+    }
+
+    # --- Alerts over the whole forecast horizon ---
+    with metrics.stage("alerts"):
+        context["alerts"] = summarize(evaluate(frame, rules_from_settings()))
+    return context
+
+
+def chart_context(frame, selected_days):
+    """Returns the chart template variables, rendering each distinct series once (served from /charts/)."""
+    hour_interval = hour_interval_for(selected_days)
+    series_list = [chart_series(kind, frame, hour_interval) for kind in CHART_TYPES]
+    chart_keys = get_chart_store().get_or_render_many(series_list)
+    return {CHART_CONTEXT_NAMES[kind]: key for kind, key in zip(CHART_TYPES, chart_keys)}
+
+
+@csrf_exempt  # only redirects; the pages it leads to are shared and cached
+def weather_view(request):
+    """Shows the city form; submitting it redirects to the city's forecast URL."""
+    context = _form_context(search=request.POST.get("search", "").strip())
 
     if request.method == "POST":
-        city_name = request.POST.get("city")
-        selected_days = int(request.POST.get("days", 2))
-        context["selected_days"] = selected_days
-
-        city = next((c for c in context["cities"] if c["name"].lower() == city_name.lower()), None)
-
-        if city:
-            context["city"] = city_name
-            try:
-                # --- API Data Fetching ---
-                now = datetime.utcnow()
-                params = {
-                    "latitude": city["latitude"],
-                    "longitude": city["longitude"],
-                    "current_weather": "true",
-                    "hourly": "temperature_2m,cloudcover,rain,precipitation_probability,windspeed_10m,windgusts_10m,pressure_msl,uv_index",
-                    "daily": "sunrise,sunset",
-                    "start_date": now.strftime("%Y-%m-%d"),
-                    "end_date": (now + timedelta(days=selected_days)).strftime("%Y-%m-%d"),
-                    "timezone": "auto",
-                }
-                url = "https://api.open-meteo.com/v1/forecast"
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-
-                # --- Data Extraction and Processing ---
-                hourly_data = data["hourly"]
-                daily_data = data["daily"]
-
-                plot_times = [datetime.fromisoformat(t) for t in hourly_data["time"]]
-                temps = hourly_data["temperature_2m"]
-                clouds = hourly_data["cloudcover"]
-                rain = hourly_data["rain"]
-                rain_prob = hourly_data["precipitation_probability"]
-                wind_speed = hourly_data["windspeed_10m"]
-                wind_gusts = hourly_data["windgusts_10m"]
-                
-                context.update({
-                    "weather": data.get("current_weather", {}),
-                    "weather_codes": weather_codes,
-                    "daily_sunrise": daily_data["sunrise"],
-                    "daily_sunset": daily_data["sunset"],
-                    "clouds": clouds,
-                    "pressure": hourly_data["pressure_msl"],
-                    "uv_index": hourly_data["uv_index"],
-                })
-
-                # --- Plotting Configuration ---
-                if selected_days <= 2:
-                    hour_interval = 1
-                elif selected_days <= 5:
-                    hour_interval = 2
-                else:
-                    hour_interval = 4
-                
-
-                #Alerts 
-                for i in range(0,25):
-                    if rain_prob[i] > 50 and rain[i] > 0.2:
-                        context["alert"] = "It's likely to rain today. Don't forget your umbrella!"
-                        break
-                    if wind_gusts[i] > 40:
-                        context["alert"] = "Strong winds expected today. Stay safe!"
-                        break
-                    if temps[i] > 30:
-                        context["alert"] = "High temperatures expected today. Stay hydrated!"
-                        break
-                    if temps[i] < 0:
-                        context["alert"] = "Freezing temperatures expected today. Dress warmly!"
-                        break
-
-                # --- Temperature Plot ---
-                fig1, ax1 = plt.subplots(figsize=(13, 5))
-                plt.grid(visible=True, which='major', axis='y', linestyle='--', alpha=0.7)
-                plt.grid(visible=True, which='major', axis='x', linestyle='--', alpha=0.7)
-                ax1.plot(plot_times, temps, color='crimson', marker='o', linewidth=2, markersize=6, alpha=0.8)
-                ax1.set_ylabel("Temperature (°C)", fontsize=12)
-                _setup_plot_axes(ax1, hour_interval, daily_data["sunrise"], daily_data["sunset"])
-                fig1.tight_layout()
-                context["temp_plot"] = plot_to_base64(fig1)
-
-                # --- Rain & Rain Probability Plot ---
-                fig2, ax2 = plt.subplots(figsize=(13, 5))
-                plt.grid(visible=True, which='major', axis='y', linestyle='--', alpha=0.7)
-                plt.grid(visible=True, which='major', axis='x', linestyle='--', alpha=0.7)
-                ax2.bar(plot_times, rain, color='royalblue', alpha=0.6, label='Rain (mm)', width=0.05)
-                ax2.set_ylabel("Rain (mm)", fontsize=12, color='royalblue')
-                ax2.tick_params(axis='y', labelcolor='royalblue')
-                ax2.set_ylim(0, max(rain) * 1.2 if max(rain) > 0 else 1)
-
-                ax2_twin = ax2.twinx()
-                ax2_twin.plot(plot_times, rain_prob, color='seagreen', marker='x', linewidth=2, markersize=6, alpha=0.8, label='Rain Probability (%)')
-                ax2_twin.set_ylabel("Rain Probability (%)", fontsize=12, color='seagreen')
-                ax2_twin.tick_params(axis='y', labelcolor='seagreen')
-                ax2_twin.set_ylim(0, 100)
-                
-                _setup_plot_axes(ax2, hour_interval, daily_data["sunrise"], daily_data["sunset"])
-                fig2.suptitle("Rain & Rain Probability", fontsize=16, fontweight="bold", y=1.05)
-                fig2.legend(loc='upper left', frameon=True, fontsize=12)
-                fig2.tight_layout()
-                context["rain_plot"] = plot_to_base64(fig2)
-
-                # --- Cloud Cover Plot ---
-                fig3, ax3 = plt.subplots(figsize=(13, 5))
-                plt.grid(visible=True, which='major', axis='y', linestyle='--', alpha=0.7)
-                plt.grid(visible=True, which='major', axis='x', linestyle='--', alpha=0.7)
-                ax3.plot(plot_times, clouds, color='dimgray', marker='D', linewidth=2, markersize=5, alpha=0.8)
-                ax3.set_ylabel("Cloud Cover (%)", fontsize=12)
-                ax3.set_ylim(0, 100)
-                _setup_plot_axes(ax3, hour_interval, daily_data["sunrise"], daily_data["sunset"])
-                fig3.tight_layout()
-                context["cloud_plot"] = plot_to_base64(fig3)
-
-                # --- Wind Speed and Gusts Plot ---
-                fig4, ax4 = plt.subplots(figsize=(13, 5))
-                plt.grid(visible=True, which='major', axis='y', linestyle='--', alpha=0.7)
-                gust_difference = [max(0, g - s) for g, s in zip(wind_gusts, wind_speed)]
-                ax4.bar(plot_times, wind_speed, color='royalblue', alpha=0.7, label='Wind Speed (km/h)', width=0.05)
-                ax4.bar(plot_times, gust_difference, bottom=wind_speed, color='lightcoral', alpha=0.7, label='Wind Gust (km/h)', width=0.05)
-                ax4.set_ylabel("Wind Speed (km/h)", fontsize=12)
-                
-                _setup_plot_axes(ax4, hour_interval, daily_data["sunrise"], daily_data["sunset"])
-                fig4.suptitle("Wind Speed and Gusts", fontsize=16, fontweight="bold", y=1.05)
-                fig4.legend(loc='upper left', frameon=True, fontsize=12)
-                fig4.tight_layout()
-                context["wind_plot"] = plot_to_base64(fig4)
-
-            except requests.exceptions.RequestException as e:
-                context["error"] = f"Could not retrieve weather data: {e}"
-            except (KeyError, TypeError):
-                context["error"] = "Could not parse weather data from the API."
-
-    return render(request, "myweather/weather.html", context)
\ No newline at end of file
+        city = get_catalogue().get(request.POST.get("city"))
+        try:
+            selected_days = int(request.POST.get("days", 2))
+        except ValueError:
+            selected_days = 0
+        if city and 1 <= selected_days <= len(context["days_options"]):
+            return redirect("forecast", city=city.name, days=selected_days)
+        context["error"] = "Please choose a city and a forecast length from the lists."
+
+    return render(request, "myweather/weather.html", context)
+
+
+def _page_validators(city, days, entry):
+    """Returns the ETag and Last-Modified timestamp of a forecast page."""
+    version = f"{city.name}|{days}|{entry.fetched_at!r}|{getattr(settings, 'WEATHER_CHART_BACKEND', 'matplotlib')}"
+    return quote_etag(hashlib.sha1(version.encode("utf-8")).hexdigest()), int(entry.fetched_at)
+
+
+def _add_page_headers(response, etag, last_modified, fetched_at):
+    forecast_cache = get_forecast_cache()
+    age = max(0, time.time() - fetched_at)
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=int(max(0, forecast_cache.ttl - age)),
+        stale_while_revalidate=int(max(0, forecast_cache.ttl + forecast_cache.stale_ttl - max(age, forecast_cache.ttl))),
+    )
+    return response
+
+
+def _cached_page(page):
+    """Returns the HTML of a page cache entry, or None when missing or its charts are gone."""
+    hit = page is not None and all(key in get_chart_store() for key in page.value[1])
+    metrics.count_lookup("page", hit)
+    return page.value[0] if hit else None
+
+
+def _render_shell(city, days, entry, request):
+    """Renders the page around the charts and hourly table; returns its parts before, between and after them."""
+    context = _form_context(selected_days=days)
+    context["city"] = city.name
+    context.update(forecast_context(entry.value))
+    with metrics.stage("template"):
+        return (
+            render_to_string("myweather/forecast.html", context, request),
+            render_to_string("myweather/forecast_middle.html"),
+            render_to_string("myweather/forecast_end.html"),
+        )
+
+
+def _stream_page(city, days, entry, shell, charts=None):
+    """
+    Yields the forecast page in chunks: the shell up to the charts, the chart
+    cards, the shell up to the hourly table, one table per day and the rest.
+
+    Charts not given are rendered after the first chunk is sent. The page is
+    cached once the last chunk has been produced.
+    """
+    head, middle, tail = shell
+    chunks = [head]
+    yield head
+    if charts is None:
+        charts = chart_context(entry.value, days)
+    with metrics.stage("template"):
+        chunks.append(render_to_string("myweather/chart_cards.html", charts))
+    yield chunks[-1]
+    chunks.append(middle)
+    yield middle
+    for day in hourly_days(entry.value):
+        with metrics.stage("hourly_table"):
+            chunks.append(render_to_string("myweather/hourly_day.html", {"day": day, "weather_codes": weather_codes}))
+        yield chunks[-1]
+    chunks.append(tail)
+    yield tail
+    page = CacheEntry(value=("".join(chunks), tuple(charts.values())), fetched_at=entry.fetched_at)
+    get_page_cache().set((city.name, days, entry.fetched_at), page)
+
+
+def forecast_page_stream(city, days, entry, request=None):
+    """
+    Returns the forecast page for ``entry``, a forecast cache entry: the HTML
+    of a cached page, or else an iterator rendering it chunk by chunk.
+
+    Pages are cached per city, days and forecast fetch time. A cached page
+    is only reused while the chart store still holds its images. The page
+    shell is rendered before returning, so parse errors surface before a
+    response has started.
+    """
+    content = _cached_page(get_page_cache().get((city.name, days, entry.fetched_at)))
+    if content is not None:
+        return content
+    return _stream_page(city, days, entry, _render_shell(city, days, entry, request))
+
+
+def forecast_page(city, days, entry, request=None):
+    """Returns the whole rendered forecast page for ``entry``, caching it like ``forecast_page_stream``."""
+    page = forecast_page_stream(city, days, entry, request)
+    return page if isinstance(page, str) else "".join(page)
+
+
+def _render_shell_and_charts(city, days, entry, request):
+    return _render_shell(city, days, entry, request), chart_context(entry.value, days)
+
+
+async def _aiterate(chunks):
+    """Iterates a synchronous chunk iterator without blocking the event loop."""
+    next_chunk = sync_to_async(next, thread_sensitive=False)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def aforecast_page_stream(city, days, entry, request=None):
+    """
+    Async ``forecast_page_stream``: cache hits are answered on the event loop
+    and the shell and charts are rendered on the render queue, so a full
+    queue still means a 503 rather than a broken stream. Only the hourly
+    tables are rendered after the response has started.
+    """
+    content = _cached_page(await get_page_cache().aget((city.name, days, entry.fetched_at)))
+    if content is not None:
+        return content
+    shell, charts = await get_render_queue().run(_render_shell_and_charts, city, days, entry, request)
+    return _aiterate(_stream_page(city, days, entry, shell, charts))
+
+
+class UpstreamError(Exception):
+    """Open-Meteo failed or sent something unparseable; the message is shown to the user."""
+
+
+@contextmanager
+def _upstream_errors():
+    """Turns a failed or unparseable forecast inside the block into an ``UpstreamError``."""
+    try:
+        yield
+    except requests.exceptions.RequestException as e:
+        raise UpstreamError(f"Could not retrieve weather data: {e}") from e
+    except (KeyError, TypeError, ValueError) as e:
+        raise UpstreamError("Could not parse weather data from the API.") from e
+
+
+def _catalogue_city(city, days):
+    """Returns the catalogue city of a forecast URL, or a permanent redirect to its canonical spelling."""
+    catalogue_city = get_catalogue().get(city)
+    if catalogue_city is None or not 1 <= days <= len(_days_options()):
+        raise Http404("Unknown city or forecast length.")
+    if catalogue_city.name != city:
+        return redirect("forecast", city=catalogue_city.name, days=days, permanent=True)
+    return catalogue_city
+
+
+def _not_modified(request, city, days, entry):
+    """Returns the 304 response for a matching revalidation, else None."""
+    etag, last_modified = _page_validators(city, days, entry)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _add_page_headers(not_modified, etag, last_modified, entry.fetched_at)
+    return None
+
+
+def _page_response(city, days, entry, page):
+    """Wraps a page from ``forecast_page_stream``: cached HTML as is, a fresh render streamed."""
+    etag, last_modified = _page_validators(city, days, entry)
+    response = HttpResponse(page) if isinstance(page, str) else StreamingHttpResponse(page)
+    return _add_page_headers(response, etag, last_modified, entry.fetched_at)
+
+
+@require_safe
+def forecast_view(request, city, days):
+    """
+    Forecast page for one city at a canonical, cacheable GET URL.
+
+    The rendered page is cached for as long as the forecast it was built
+    from, and carries an ETag and Last-Modified derived from the forecast's
+    fetch time, so revalidations answer 304 without rendering anything.
+    A fresh render is streamed: the form, current weather and alerts go out
+    first, then the charts and the hourly table, one day at a time.
+    """
+    city = _catalogue_city(city, days)
+    if isinstance(city, HttpResponse):
+        return city
+
+    params = forecast_params(city.latitude, city.longitude, days)
+    try:
+        with _upstream_errors():
+            entry = get_forecast_cache().get_entry(params, fetch_forecast_frame)
+            not_modified = _not_modified(request, city, days, entry)
+            if not_modified is not None:
+                return not_modified
+            page = forecast_page_stream(city, days, entry, request)
+    except UpstreamError as e:
+        return _error_page(request, city, days, str(e))
+    return _page_response(city, days, entry, page)
+
+
+async def forecast_view_async(request, city, days):
+    """
+    ``forecast_view`` for ASGI servers, with the same responses.
+
+    Waiting on Open-Meteo does not hold a thread, and pages are rendered on
+    the bounded render queue. While that queue is full the view answers
+    503 with a Retry-After header instead of queueing more work.
+    """
+    if request.method not in ("GET", "HEAD"):
+        response = HttpResponseNotAllowed(["GET", "HEAD"])
+        log_response("Method Not Allowed (%s): %s", request.method, request.path, response=response, request=request)
+        return response
+
+    city = _catalogue_city(city, days)
+    if isinstance(city, HttpResponse):
+        return city
+
+    params = forecast_params(city.latitude, city.longitude, days)
+    try:
+        try:
+            with _upstream_errors():
+                entry = await get_forecast_cache().aget_entry(params, afetch_forecast_frame)
+                not_modified = _not_modified(request, city, days, entry)
+                if not_modified is not None:
+                    return not_modified
+                page = await aforecast_page_stream(city, days, entry, request)
+        except UpstreamError as e:
+            return await get_render_queue().run(_error_page, request, city, days, str(e))
+    except RenderQueueFull:
+        return _busy_response(get_render_queue().retry_after)
+    return _page_response(city, days, entry, page)
+
+
+def _busy_response(retry_after):
+    response = HttpResponse("The server is busy, please try again shortly.", status=503,
+                            content_type="text/plain; charset=utf-8")
+    response.headers["Retry-After"] = str(retry_after)
+    add_never_cache_headers(response)
+    return response
+
+
+def _error_page(request, city, days, message):
+    context = _form_context(selected_days=days)
+    context.update({"city": city.name, "error": message})
+    response = render(request, "myweather/weather.html", context)
+    add_never_cache_headers(response)
+    return response
+
+
+def _split_list(query, name):
+    """Reads a list parameter given as repeated and/or comma-separated values."""
+    return [item.strip() for value in query.getlist(name) for item in value.split(",") if item.strip()]
+
+
+def _parse_comparison(query):
+    """Returns ``(cities, days, variables, error)`` for a comparison request."""
+    catalogue = get_catalogue()
+    cities, unknown = [], []
+    for name in dict.fromkeys(_split_list(query, "cities")):
+        city = catalogue.get(name)
+        if city is None:
+            unknown.append(name)
+        elif city not in cities:
+            cities.append(city)
+    variables = tuple(_split_list(query, "variables")) or DEFAULT_VARIABLES
+    max_cities = getattr(settings, "WEATHER_COMPARE_MAX_CITIES", 50)
+    try:
+        days = int(query.get("days", 2))
+    except ValueError:
+        days = 0
+
+    if unknown:
+        error = f"Unknown cities: {', '.join(unknown)}."
+    elif len(cities) > max_cities:
+        error = f"At most {max_cities} cities can be compared at once."
+    elif not 1 <= days <= len(_days_options()):
+        error = "days must be between 1 and 7."
+    elif not set(variables) <= set(HOURLY_VARIABLES):
+        error = f"variables must be among: {', '.join(HOURLY_VARIABLES)}."
+    else:
+        error = None
+    return cities, days, variables, error
+
+
+def compare_view(request):
+    """Compares the forecasts of several cities on one overlay chart."""
+    cities, days, variables, error = _parse_comparison(request.GET)
+    context = _form_context(
+        search=request.GET.get("search", "").strip(),
+        selected_days=days if 1 <= days <= len(_days_options()) else 2,
+    )
+    # The selected cities stay listed (and selected) whatever the filter.
+    listed = {city.name for city in context["cities"]}
+    context["cities"] = [city for city in cities if city.name not in listed] + list(context["cities"])
+    context["selected"] = {city.name for city in cities}
+    if error:
+        context["error"] = error
+    elif cities:
+        try:
+            with _upstream_errors():
+                context["comparison"] = compare(cities, days, variables)
+        except UpstreamError as e:
+            context["error"] = str(e)
+    return render(request, "myweather/compare.html", context)
+
+
+def compare_api(request):
+    """
+    JSON comparison of several cities.
+
+    ``?cities=London,Paris&days=3&variables=temperature_2m,rain`` returns the
+    shared time axis, every city's aligned series, a summary, its alerts
+    and the URL of an overlay temperature chart.
+    """
+    cities, days, variables, error = _parse_comparison(request.GET)
+    if not error and not cities:
+        error = "Pass at least one city in ?cities=."
+    if error:
+        return JsonResponse({"error": error}, status=400)
+    try:
+        with _upstream_errors():
+            comparison = compare(cities, days, variables)
+    except UpstreamError as e:
+        return JsonResponse({"error": str(e)}, status=502)
+    data = comparison_json(comparison)
+    data["chart"] = reverse("chart", args=[comparison["chart"]]) if comparison["chart"] else None
+    return JsonResponse(data)
+
+
+def _parse_point(query):
+    """Returns ``(latitude, longitude, tile, days, error)`` for a coordinate forecast request."""
+    tile_cache = get_tile_cache()
+    try:
+        latitude, longitude = float(query.get("lat", "")), float(query.get("lon", ""))
+    except ValueError:
+        return None, None, None, 0, "lat and lon must be numbers."
+    try:
+        days = int(query.get("days", 2))
+    except ValueError:
+        days = 0
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return latitude, longitude, None, days, "lat must be within -90..90 and lon within -180..180."
+    if not 1 <= days <= len(_days_options()):
+        return latitude, longitude, None, days, "days must be between 1 and 7."
+    if query.get("snap", tile_cache.default_level) not in tile_cache.levels:
+        return latitude, longitude, None, days, f"snap must be one of: {', '.join(tile_cache.levels)}."
+    return latitude, longitude, tile_cache.tile(latitude, longitude, query.get("snap")), days, None
+
+
+@require_safe
+def point_forecast_view(request):
+    """
+    Forecast page for any coordinate (``?lat=&lon=&days=&snap=``), e.g. from a map click.
+
+    The point is snapped to its forecast tile, so every point of a tile
+    shares one cached forecast, page and set of validators.
+    """
+    _, _, tile, days, error = _parse_point(request.GET)
+    if error:
+        context = _form_context(selected_days=days if 1 <= days <= len(_days_options()) else 2)
+        context["error"] = error
+        response = render(request, "myweather/weather.html", context, status=400)
+        add_never_cache_headers(response)
+        return response
+
+    try:
+        with _upstream_errors():
+            entry = get_tile_cache().get_entry(tile, days, fetch_forecast_frame)
+            not_modified = _not_modified(request, tile, days, entry)
+            if not_modified is not None:
+                return not_modified
+            page = forecast_page_stream(tile, days, entry, request)
+    except UpstreamError as e:
+        return _error_page(request, tile, days, str(e))
+    return _page_response(tile, days, entry, page)
+
+
+@require_safe
+def forecast_api(request):
+    """
+    JSON forecast for any coordinate.
+
+    ``?lat=51.51&lon=-0.13&days=3&snap=model`` returns the forecast tile the
+    point was snapped to, when its forecast was fetched, the current
+    weather, every hourly series and the alerts.
+    """
+    latitude, longitude, tile, days, error = _parse_point(request.GET)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+    try:
+        with _upstream_errors():
+            entry = get_tile_cache().get_entry(tile, days, fetch_forecast_frame)
+    except UpstreamError as e:
+        return JsonResponse({"error": str(e)}, status=502)
+
+    not_modified = _not_modified(request, tile, days, entry)
+    if not_modified is not None:
+        return not_modified
+    frame = entry.value
+    response = JsonResponse({
+        "latitude": latitude,
+        "longitude": longitude,
+        "tile": {
+            "latitude": tile.latitude,
+            "longitude": tile.longitude,
+            "level": tile.level,
+            "step": tile.step,
+            "name": tile.name,
+        },
+        "days": days,
+        "fetched_at": datetime.fromtimestamp(entry.fetched_at, timezone.utc).isoformat(timespec="seconds"),
+        "current": frame.current,
+        "time": np.datetime_as_string(frame.time, unit="m").tolist(),
+        "hourly": {name: json_column(column) for name, column in frame.hourly.items()},
+        "alerts": summarize(evaluate(frame, rules_from_settings())),
+    })
+    etag, last_modified = _page_validators(tile, days, entry)
+    return _add_page_headers(response, etag, last_modified, entry.fetched_at)
+
+
+@cache_control(public=True, max_age=CHART_MAX_AGE, immutable=True)
+@condition(etag_func=lambda request, key: key)
+def chart_view(request, key):
+    """Serves a rendered chart image by its content-hash file name."""
+    image = get_chart_store().get(key)
+    if image is None:
+        raise Http404("Chart not found.")
+    return HttpResponse(image, content_type=CONTENT_TYPES[key.rsplit(".", 1)[1]])
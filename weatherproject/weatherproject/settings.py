@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myweather.metrics.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -123,3 +124,142 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Forecast cache in front of the Open-Meteo API
+# BACKEND is "memory" (per-process LRU) or "django" (uses CACHES[CACHE_ALIAS])
+
+WEATHER_FORECAST_CACHE = {
+    'BACKEND': 'memory',
+    'TTL': 600,
+    'STALE_TTL': 3600,
+    'MAX_ENTRIES': 512,
+}
+
+# HTTP client used for Open-Meteo (timeouts in seconds)
+
+WEATHER_FORECAST_CLIENT = {
+    'BASE_URL': os.environ.get('OPEN_METEO_URL', 'https://api.open-meteo.com/v1/forecast'),
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'RETRIES': 2,
+    'BREAKER_FAILURES': 5,
+    'BREAKER_RESET': 30,
+    'BULK_SIZE': 25,
+}
+
+# How the four forecast charts are rendered: "serial", "thread" or "process"
+
+WEATHER_CHART_RENDERING = 'thread'
+
+WEATHER_CHART_WORKERS = 4
+
+# Reuse pre-built chart figures per chart type and horizon (max idle figures
+# per worker; 0 builds a new figure for every chart)
+
+WEATHER_CHART_FIGURE_POOL = 16
+
+# City catalogue: a .json/.csv file or a GeoNames dump (e.g. cities500.txt);
+# None uses the built-in list in myweather/utils.py
+
+WEATHER_CITY_DATA = os.environ.get('WEATHER_CITY_DATA') or None
+
+# Most cities listed in the city dropdown
+
+WEATHER_CITY_LIST_LIMIT = 500
+
+# Chart backend: "matplotlib" (PNG) or "svg" (native SVG, no Matplotlib)
+
+WEATHER_CHART_BACKEND = 'matplotlib'
+
+# Chart fonts, first installed one wins; run the warm-up in AppConfig.ready
+# (useful with a pre-forking server such as gunicorn --preload)
+
+WEATHER_CHART_FONTS = ['Segoe UI Emoji', 'DejaVu Sans']
+
+WEATHER_WARM_UP = False
+
+# Rendered forecast pages behind /forecast/<city>/<days>/, kept as long as the
+# forecast they were built from
+
+WEATHER_PAGE_CACHE = {
+    'BACKEND': 'memory',
+    'MAX_ENTRIES': 256,
+}
+
+# Rendered chart images behind /charts/<hash>.<ext>. With several worker
+# processes every worker must reach every image: "file" (the default) shares
+# one directory between the workers of a host, "django" with a shared cache
+# such as Redis serves several hosts, "memory" only suits a single process
+
+WEATHER_CHART_STORE = {
+    'BACKEND': 'file',
+    'DIRECTORY': os.environ.get('WEATHER_CHART_DIR') or None,
+    'MAX_BYTES': 256 * 1024 * 1024,
+}
+
+# Background prefetch: refresh these cities (None = whole catalogue) for each
+# forecast length every INTERVAL seconds, at most RATE upstream requests per
+# second. IN_PROCESS runs it in a thread of every serving process (started by
+# its first request, never by other manage.py commands); a separate
+# manage.py prefetch process only helps when WEATHER_FORECAST_CACHE,
+# WEATHER_PAGE_CACHE and WEATHER_CHART_STORE use the 'django' backend on a
+# shared cache such as Redis, and refuses to run otherwise
+
+WEATHER_PREFETCH = {
+    'INTERVAL': 300,
+    'JITTER': 0.1,
+    'DAYS': [1, 2, 3, 7],
+    'CITIES': None,
+    'WORKERS': 4,
+    'RATE': 5.0,
+    'RENDER': True,
+    'IN_PROCESS': False,
+}
+
+# Most cities /compare/ and /api/compare/ accept; they are fetched from
+# Open-Meteo WEATHER_FORECAST_CLIENT['BULK_SIZE'] locations per request
+
+WEATHER_COMPARE_MAX_CITIES = 50
+
+# Forecast snapshots stored in the database: served while younger than the
+# forecast cache TTL and as a fallback while Open-Meteo is unreachable.
+# manage.py prune_snapshots drops snapshots that ended RETENTION_DAYS ago and
+# all but the newest KEEP per forecast request
+
+WEATHER_SNAPSHOT_STORE = {
+    'ENABLED': True,
+    'RETENTION_DAYS': 7,
+    'KEEP': 1,
+}
+
+# Stage timers, Server-Timing headers and the Prometheus endpoint at /metrics
+# (False skips all of it). /metrics answers only the addresses or networks in
+# WEATHER_METRICS_ALLOWED_IPS; behind a proxy REMOTE_ADDR is the proxy's, so
+# scrape the app server directly.
+
+WEATHER_METRICS = False
+WEATHER_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Serve /forecast/<city>/<days>/ with the async view (for ASGI servers; uses
+# httpx when installed). Its pages render on a pool of WORKERS threads; past
+# MAX_PENDING queued renders it answers 503 with Retry-After
+
+WEATHER_ASYNC_VIEWS = os.environ.get('WEATHER_ASYNC_VIEWS') == '1'
+
+WEATHER_RENDER_QUEUE = {
+    'WORKERS': 4,
+    'MAX_PENDING': 32,
+    'RETRY_AFTER': 5,
+}
+
+# Forecasts for any coordinate (/forecast/point/ and /api/forecast/): points are
+# snapped to a grid (step in degrees per snap level, chosen with ?snap=) and
+# nearby points share one cached forecast tile
+
+WEATHER_TILE_CACHE = {
+    'LEVELS': {'model': 0.1, 'regional': 0.25, 'coarse': 0.5},
+    'DEFAULT_LEVEL': 'model',
+    'BACKEND': 'memory',
+    'MAX_ENTRIES': 4096,
+    'MAX_BYTES': 64 * 1024 * 1024,
+}